@@ -0,0 +1,253 @@
+# tkinter is imported where it is used: run_jobs imports this module for headless batch jobs
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+# The helpers shared with VideoTools (mediacommon/) live at the repo root
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_DIR not in sys.path:
+    sys.path.append(_REPO_DIR)
+from duration_cache import get_cached_durations, get_cached_streams, update_duration_cache, update_stream_cache
+from mediacommon.ffmpeg_progress import FFmpegCancelled
+from mediacommon.stream_compat import probe_all, signature_from_json
+from video_combiner import (
+    logger, setup_logging, check_ffmpeg, get_next_output_filename, write_playlist_manifest,
+    concatenate_videos, create_progress_window, PLAYLIST_MANIFEST_EXTENSION, VIDEO_EXTENSIONS,
+)
+
+# --- Configuration ---
+# Share of the target runtime taken from each bucket (shares are normalized, so they need not sum to 1).
+# 05_VIDS_LONG is left out on purpose: it holds the long source videos that segment_extractor cuts into
+# 02-04, so picking from it as well would repeat the same footage in one compilation.
+BUCKET_MIX = {
+    "01_IMAGES_VIDS": 0.4,
+    "02_VIDS_10s": 0.3,
+    "03_VIDS_20s": 0.2,
+    "04_VIDS_30s": 0.1,
+}
+# Resolution of the subset-sum search in seconds
+DURATION_RESOLUTION = 0.1
+# Probe clips that are missing from the duration cache (and add them to it) instead of ignoring them
+PROBE_UNCACHED_CLIPS = True
+# Clips of different buckets come from different sources, so the concat pre-flight is always run (with the
+# stream signatures kept in the duration cache, each clip is only probed once)
+NORMALIZE_BEFORE_CONCAT = True
+SHUFFLE_SEED = None
+
+# --- Helper Functions ---
+
+def parse_runtime(text):
+    """Parses a runtime like '60', '90s', '10min', '1h30m' or '1:30:00' into seconds."""
+    text = text.strip().lower()
+    if ":" in text:
+        seconds = 0.0
+        for part in text.split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    units = {"h": 3600, "hr": 3600, "hour": 3600, "hours": 3600,
+             "m": 60, "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+             "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1, "": 1}
+    parts = re.findall(r"(\d+(?:\.\d+)?)\s*([a-z]*)", text)
+    if not parts or re.sub(r"[\d.\sa-z]", "", text):
+        raise ValueError(f"Invalid runtime: {text!r}")
+    seconds = 0.0
+    for value, unit in parts:
+        if unit not in units:
+            raise ValueError(f"Unknown time unit {unit!r} in {text!r}")
+        seconds += float(value) * units[unit]
+    return seconds
+
+
+def probe_duration(path):
+    """Reads a clip's duration from the container header with ffprobe (no decoding)."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=nw=1:nk=1', path],
+        capture_output=True, text=True, creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        logger.warning(f"Could not probe duration of {path}")
+        return None
+
+
+def collect_bucket_durations(project_folder, buckets, probe_uncached=PROBE_UNCACHED_CLIPS):
+    """Returns {bucket: {clip path: duration}} using the cache, optionally probing (and caching) the rest."""
+    result = {}
+    newly_probed = {}
+    for bucket in buckets:
+        durations = get_cached_durations(project_folder, bucket)
+        folder = os.path.join(project_folder, bucket)
+        if probe_uncached and os.path.isdir(folder):
+            with os.scandir(folder) as entries:
+                uncached = [e.path for e in entries if e.is_file() and e.path not in durations
+                            and e.name.lower().endswith(VIDEO_EXTENSIONS)]
+            for path in uncached:
+                duration = probe_duration(path)
+                if duration:
+                    durations[path] = duration
+                    newly_probed[path] = duration
+        logger.info(f"Bucket {bucket}: {len(durations)} clips with known duration")
+        result[bucket] = durations
+    if newly_probed:
+        update_duration_cache(project_folder, newly_probed)
+    return result
+
+
+def fill_gap_subset_sum(candidates, gap, resolution=DURATION_RESOLUTION):
+    """Picks the subset of candidates [(path, duration)] whose total is as close to gap as possible without exceeding it.
+
+    Classic subset-sum over durations quantized to `resolution`, using a Python int as the reachability bitset.
+    Durations are rounded up and the gap down, so the real total of the chosen clips never exceeds gap.
+    """
+    # round() first so float noise (0.3 / 0.1 = 2.9999999999999996) does not cost or add a step
+    capacity = math.floor(round(gap / resolution, 6))
+    if capacity <= 0 or not candidates:
+        return []
+    mask = (1 << (capacity + 1)) - 1
+    reachable = 1
+    parent = {0: None} # sum -> (previous sum, candidate index)
+    for index, (_, duration) in enumerate(candidates):
+        weight = max(1, math.ceil(round(duration / resolution, 6)))
+        if weight > capacity:
+            continue
+        new_bits = ((reachable << weight) & mask) & ~reachable
+        while new_bits:
+            low_bit = new_bits & -new_bits
+            total = low_bit.bit_length() - 1
+            parent[total] = (total - weight, index)
+            new_bits ^= low_bit
+        reachable |= (reachable << weight) & mask
+        if reachable >> capacity & 1:
+            break # Exact fit found
+
+    best = reachable.bit_length() - 1
+    chosen = []
+    while parent[best] is not None:
+        best, index = parent[best]
+        chosen.append(candidates[index][0])
+    return chosen
+
+
+def select_clips(bucket_durations, target_seconds, bucket_mix=BUCKET_MIX, seed=None):
+    """Chooses clips so the total runtime gets as close as possible to target_seconds without exceeding it.
+
+    Each bucket is first filled greedily (in shuffled order) up to its share of the target; the remaining
+    gap is then closed with a subset-sum search over all clips that were not picked yet.
+    Returns (list of clip paths in playback order, total duration).
+    """
+    rng = random.Random(seed)
+    total_share = sum(share for bucket, share in bucket_mix.items() if bucket_durations.get(bucket))
+    selected = []
+    total = 0.0
+    leftovers = []
+    for bucket, share in bucket_mix.items():
+        clips = list(bucket_durations.get(bucket, {}).items())
+        if not clips:
+            continue
+        rng.shuffle(clips)
+        budget = target_seconds * share / total_share
+        used = 0.0
+        for path, duration in clips:
+            if used + duration <= budget and total + duration <= target_seconds:
+                selected.append(path)
+                used += duration
+                total += duration
+            else:
+                leftovers.append((path, duration))
+
+    gap = target_seconds - total
+    if gap > 0 and leftovers:
+        rng.shuffle(leftovers)
+        lookup = dict(leftovers)
+        for path in fill_gap_subset_sum(leftovers, gap):
+            selected.append(path)
+            total += lookup[path]
+
+    rng.shuffle(selected)
+    return selected, total
+
+
+def collect_stream_signatures(project_folder, playlist):
+    """Returns {clip path: StreamSignature} for the playlist, probing only the clips without a cached signature."""
+    signatures = {path: signature_from_json(data) for path, data in get_cached_streams(project_folder, playlist).items()}
+    missing = [path for path in playlist if path not in signatures]
+    if missing:
+        logger.info(f"Probing stream signatures of {len(missing)} uncached clips")
+        probed = probe_all(missing)
+        update_stream_cache(project_folder, probed)
+        signatures.update((path, sig) for path, sig in probed.items() if sig is not None)
+    return signatures
+
+# --- Main Logic ---
+
+def main():
+    import tkinter as tk
+    from tkinter import filedialog, simpledialog, messagebox
+
+    if not check_ffmpeg():
+        return
+
+    root = tk.Tk()
+    root.withdraw()
+
+    logger.info("Compilation Builder started.")
+
+    project_folder = filedialog.askdirectory(title="Select Project Folder Containing '01_IMAGES_VIDS', '02_VIDS_10s', ...")
+    if not project_folder:
+        messagebox.showinfo("Cancelled", "Operation cancelled.")
+        return
+
+    runtime_text = simpledialog.askstring("Target Runtime", "Enter the target runtime (e.g. 60s, 10min, 1:30:00):", parent=root)
+    if not runtime_text:
+        messagebox.showinfo("Cancelled", "Operation cancelled.")
+        return
+    try:
+        target_seconds = parse_runtime(runtime_text)
+    except ValueError as e:
+        messagebox.showerror("Error", str(e))
+        return
+
+    start_time = time.time()
+    bucket_durations = collect_bucket_durations(project_folder, BUCKET_MIX)
+    seed = SHUFFLE_SEED if SHUFFLE_SEED is not None else random.randrange(2**32)
+    playlist, total = select_clips(bucket_durations, target_seconds, BUCKET_MIX, seed)
+    if not playlist:
+        messagebox.showwarning("Warning", "No clips with a known duration were found in the selected buckets.")
+        return
+    logger.info(f"Selected {len(playlist)} clips totalling {total:.1f}s for a target of {target_seconds:.1f}s (seed: {seed})")
+
+    output_video_path = get_next_output_filename(project_folder)
+    if not output_video_path:
+        return
+    progress_window, on_progress = create_progress_window(root, "Building Compilation (FFmpeg)")
+    try:
+        success = concatenate_videos(
+            playlist, output_video_path, normalize=NORMALIZE_BEFORE_CONCAT, total_duration=total, on_progress=on_progress,
+            signatures=collect_stream_signatures(project_folder, playlist) if NORMALIZE_BEFORE_CONCAT else None,
+        )
+    except FFmpegCancelled:
+        messagebox.showinfo("Cancelled", "Building the compilation was cancelled.")
+        return
+    finally:
+        progress_window.destroy()
+    duration_secs = time.time() - start_time
+    if success:
+        # Only an output that exists gets a manifest
+        manifest_path = os.path.splitext(output_video_path)[0] + PLAYLIST_MANIFEST_EXTENSION
+        try:
+            write_playlist_manifest(manifest_path, seed, playlist, project_folder)
+        except Exception as e:
+            logger.warning(f"Could not write playlist manifest {manifest_path}: {e}")
+        messagebox.showinfo("Success", f"Built a {total:.1f}s compilation from {len(playlist)} clips.\n\nOutput saved as:\n{output_video_path}\n\nTotal time: {duration_secs:.2f} seconds.")
+    else:
+        messagebox.showerror("Failed", "Building the compilation failed. Please check the log file 'video_combiner.log' for details.")
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -0,0 +1,129 @@
+"""Clip duration cache shared by the organizer (writer) and the compilation builder (reader).
+
+The cache lives in the project folder (the folder holding 01_IMAGES_VIDS, 02_VIDS_10s, ...) as
+clip_durations.json and maps each clip's path relative to that folder to its duration. File size
+and modification time are stored alongside so stale entries are detected without probing. The
+compilation builder also stores each selected clip's stream signature (see
+mediacommon.stream_compat) there, so its concat pre-flight does not probe the clips again.
+"""
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DURATION_CACHE_FILENAME = "clip_durations.json"
+
+
+def _stat_key(path):
+    """Returns the (size, mtime_ns) pair used to detect changed files."""
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def load_duration_cache(project_folder):
+    """Loads the raw cache dict for a project folder ({} if missing or unreadable)."""
+    cache_path = os.path.join(project_folder, DURATION_CACHE_FILENAME)
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read duration cache {cache_path}: {e}")
+        return {}
+
+
+def _rel_path(project_folder, path):
+    return os.path.relpath(path, project_folder).replace("\\", "/")
+
+
+def _save_cache(project_folder, cache):
+    cache_path = os.path.join(project_folder, DURATION_CACHE_FILENAME)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def update_duration_cache(project_folder, durations):
+    """Merges {absolute clip path: duration in seconds} into the project's cache file."""
+    if not durations:
+        return
+    cache = load_duration_cache(project_folder)
+    for path, duration in durations.items():
+        try:
+            size, mtime_ns = _stat_key(path)
+        except OSError as e:
+            logger.warning(f"Not caching duration for {path}: {e}")
+            continue
+        rel_path = _rel_path(project_folder, path)
+        record = {"duration": round(float(duration), 3), "size": size, "mtime_ns": mtime_ns}
+        old = cache.get(rel_path)
+        if old and old.get("streams") and (old.get("size"), old.get("mtime_ns")) == (size, mtime_ns):
+            record["streams"] = old["streams"] # Same file, the stream signature is still valid
+        cache[rel_path] = record
+
+    cache_path = _save_cache(project_folder, cache)
+    logger.info(f"Updated duration cache with {len(durations)} entries: {cache_path}")
+
+
+def get_cached_streams(project_folder, paths):
+    """Returns {absolute clip path: stream signature as stored (JSON lists)} for the paths with a valid entry."""
+    cache = load_duration_cache(project_folder)
+    streams = {}
+    for path in paths:
+        record = cache.get(_rel_path(project_folder, path))
+        if not record or not record.get("streams"):
+            continue
+        try:
+            if (record.get("size"), record.get("mtime_ns")) == _stat_key(path):
+                streams[path] = record["streams"]
+        except OSError:
+            continue
+    return streams
+
+
+def update_stream_cache(project_folder, streams):
+    """Stores {absolute clip path: stream signature} on the clips' cache entries (clips without one are skipped)."""
+    cache = load_duration_cache(project_folder)
+    updated = 0
+    for path, signature in streams.items():
+        record = cache.get(_rel_path(project_folder, path))
+        if signature is None or record is None:
+            continue
+        try:
+            if (record.get("size"), record.get("mtime_ns")) != _stat_key(path):
+                continue # Stale entry, the duration is re-probed first
+        except OSError:
+            continue
+        record["streams"] = signature
+        updated += 1
+    if updated:
+        cache_path = _save_cache(project_folder, cache)
+        logger.info(f"Cached stream signatures of {updated} clips: {cache_path}")
+
+
+def get_cached_durations(project_folder, subfolder):
+    """Returns {absolute clip path: duration} for the still-valid cached clips in one subfolder.
+
+    Only a directory listing and a stat per file are needed; entries for files that were changed,
+    moved or deleted since they were cached are skipped.
+    """
+    cache = load_duration_cache(project_folder)
+    folder = os.path.join(project_folder, subfolder)
+    durations = {}
+    if not os.path.isdir(folder):
+        return durations
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            record = cache.get(f"{subfolder}/{entry.name}")
+            if record is None:
+                continue
+            st = entry.stat()
+            if record.get("size") == st.st_size and record.get("mtime_ns") == st.st_mtime_ns:
+                durations[entry.path] = record["duration"]
+    return durations
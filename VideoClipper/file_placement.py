@@ -0,0 +1,260 @@
+"""Fast placement of media files into the WORKING tree.
+
+shutil.move silently degrades to a serial copy + delete when source and destination are on different
+filesystems. place_files() instead groups the work by device:
+
+- same device: a plain rename (or, in "hardlink"/"reflink" mode, a link/clone that keeps the source),
+  which is a metadata-only operation regardless of file size;
+- different device: the files are copied in parallel with copy_file_range/sendfile (kernel-side, no
+  userspace buffers) into "<dest>.part" files. Data is fsynced in batches, and only after a batch is
+  durable are the .part files renamed into place and the sources deleted.
+
+Sources kept by "hardlink"/"reflink" placement stay in the source folder. Callers that scan that folder
+again (the organizer, the watch daemon) record them in a placed-sources ledger and skip them next time.
+"""
+import errno
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# How files are placed:
+#   "move"     - rename on the same device, parallel copy + delete across devices
+#   "hardlink" - keep the source and hardlink it into place (copy across devices)
+#   "reflink"  - keep the source and clone it copy-on-write (btrfs/XFS/APFS-style filesystems; copy otherwise)
+PLACEMENT_MODE = "move"
+# Parallel copies across devices (I/O bound)
+COPY_WORKERS = 4
+# Copied bytes after which the pending copies are fsynced and committed (sources deleted)
+FSYNC_BATCH_BYTES = 2 * 1024 ** 3
+PART_SUFFIX = ".part"
+PLACED_LEDGER_FILENAME = ".placed_sources.json"
+
+_CHUNK_SIZE = 64 * 1024 ** 2
+# ioctl request number of FICLONE from <linux/fs.h>
+_FICLONE = 0x40049409
+# Errors meaning "this copy primitive is not supported here", after which the next one is tried
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+def same_device(src_path, dest_path):
+    """True when src_path and the folder of dest_path live on the same filesystem (rename/link possible)."""
+    return os.stat(src_path).st_dev == os.stat(os.path.dirname(os.path.abspath(dest_path))).st_dev
+
+
+def _reflink(src_path, dest_path):
+    """Clones src_path to dest_path copy-on-write; raises OSError where unsupported."""
+    import fcntl # POSIX only; ImportError on Windows is reported as "unsupported" by the caller
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        fcntl.ioctl(dest.fileno(), _FICLONE, src.fileno())
+
+
+def _copy_data(src_fd, dest_fd, size):
+    """Copies size bytes between two file descriptors, preferring in-kernel copies."""
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(src_fd, dest_fd, min(_CHUNK_SIZE, size - offset))
+                if copied == 0:
+                    break
+                offset += copied
+            return offset
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+    if hasattr(os, "sendfile"):
+        try:
+            while offset < size:
+                copied = os.sendfile(dest_fd, src_fd, offset, min(_CHUNK_SIZE, size - offset))
+                if copied == 0:
+                    break
+                offset += copied
+            return offset
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    os.lseek(dest_fd, offset, os.SEEK_SET)
+    while True:
+        chunk = os.read(src_fd, _CHUNK_SIZE)
+        if not chunk:
+            return offset
+        os.write(dest_fd, chunk)
+        offset += len(chunk)
+
+
+def _copy_to_part(src_path, dest_path):
+    """Copies src_path to dest_path + PART_SUFFIX (data and timestamps/permissions). Returns the bytes copied."""
+    part_path = dest_path + PART_SUFFIX
+    src_fd = os.open(src_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        dest_fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            copied = _copy_data(src_fd, dest_fd, os.fstat(src_fd).st_size)
+        finally:
+            os.close(dest_fd)
+    finally:
+        os.close(src_fd)
+    shutil.copystat(src_path, part_path)
+    return copied
+
+
+def _fsync_path(path, directory=False):
+    """fsyncs a file or directory.
+
+    Files are opened read-write: on Windows fsync (FlushFileBuffers) fails with EBADF on a read-only
+    handle. Directories cannot be opened there at all, so their fsync is skipped on Windows.
+    """
+    if directory:
+        if os.name == "nt":
+            return
+        flags = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0)
+    else:
+        flags = os.O_RDWR | getattr(os, "O_BINARY", 0)
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _place_locally(src_path, dest_path, mode):
+    """Same-device placement. Returns False when the mode is unsupported here and a copy is needed instead."""
+    if mode == "move":
+        os.replace(src_path, dest_path)
+        return True
+    # Link/clone under a temporary name, then replace, so an existing destination is overwritten like a move
+    part_path = dest_path + PART_SUFFIX
+    try:
+        if mode == "hardlink":
+            os.link(src_path, part_path)
+        else:
+            _reflink(src_path, part_path)
+    except (OSError, ImportError) as e:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        logger.debug(f"{mode} not possible for {src_path} ({e}); copying instead.")
+        return False
+    os.replace(part_path, dest_path)
+    return True
+
+
+def place_files(pairs, mode=PLACEMENT_MODE, max_workers=COPY_WORKERS):
+    """Places each source file at its destination path.
+
+    pairs is an iterable of (source path, destination path). In "move" mode the sources are gone
+    afterwards; in "hardlink"/"reflink" mode they are kept. Returns {source path: True/False}.
+    """
+    if mode not in ("move", "hardlink", "reflink"):
+        raise ValueError(f"Unknown placement mode: {mode}")
+    results = {}
+    to_copy = []
+    for src_path, dest_path in pairs:
+        try:
+            if same_device(src_path, dest_path) and _place_locally(src_path, dest_path, mode):
+                results[src_path] = True
+            else:
+                to_copy.append((src_path, dest_path))
+        except OSError as e:
+            logger.error(f"Could not place {src_path} -> {dest_path}: {e}")
+            results[src_path] = False
+
+    if not to_copy:
+        return results
+    logger.info(f"Copying {len(to_copy)} file(s) with {max_workers} worker(s) (rename/link not possible)...")
+
+    batch = []
+    batch_bytes = 0
+
+    def commit(batch):
+        # Data first, then the renames, then the directory entries; sources are only deleted once durable
+        committed = []
+        for src_path, dest_path in batch:
+            try:
+                _fsync_path(dest_path + PART_SUFFIX)
+                os.replace(dest_path + PART_SUFFIX, dest_path)
+                committed.append((src_path, dest_path))
+            except OSError as e:
+                logger.error(f"Could not commit copy of {src_path}: {e}")
+                results[src_path] = False
+        for folder in {os.path.dirname(os.path.abspath(dest_path)) for _, dest_path in committed}:
+            _fsync_path(folder, directory=True)
+        for src_path, _ in committed:
+            results[src_path] = True
+            if mode == "move":
+                try:
+                    os.remove(src_path)
+                except OSError as e:
+                    logger.warning(f"Copied but could not remove source {src_path}: {e}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [(src_path, dest_path, executor.submit(_copy_to_part, src_path, dest_path))
+                   for src_path, dest_path in to_copy]
+        for src_path, dest_path, future in futures:
+            try:
+                batch_bytes += future.result()
+                batch.append((src_path, dest_path))
+            except OSError as e:
+                logger.error(f"Could not copy {src_path} -> {dest_path}: {e}")
+                results[src_path] = False
+                try:
+                    os.remove(dest_path + PART_SUFFIX)
+                except OSError:
+                    pass
+                continue
+            if batch_bytes >= FSYNC_BATCH_BYTES:
+                commit(batch)
+                batch, batch_bytes = [], 0
+    commit(batch)
+    return results
+
+
+def place_file(src_path, dest_path, mode=PLACEMENT_MODE):
+    """Places a single file (see place_files). Raises OSError when it could not be placed."""
+    if not place_files([(src_path, dest_path)], mode, max_workers=1)[src_path]:
+        raise OSError(f"Could not place {src_path} -> {dest_path}")
+
+
+def load_placed_ledger(ledger_path):
+    """Loads a placed-sources ledger: {source file name: [size, mtime_ns]} ({} if missing or unreadable)."""
+    try:
+        with open(ledger_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read placed-sources ledger {ledger_path}: {e}")
+        return {}
+
+
+def is_placed(ledger, src_path):
+    """True if src_path was placed before and has not changed since (the ledger covers one source folder)."""
+    record = ledger.get(os.path.basename(src_path))
+    if record is None:
+        return False
+    try:
+        st = os.stat(src_path)
+    except OSError:
+        return False
+    return record == [st.st_size, st.st_mtime_ns]
+
+
+def record_placed(ledger, src_path):
+    """Adds a placed source to the ledger (in memory; write it with save_placed_ledger)."""
+    try:
+        st = os.stat(src_path)
+    except OSError:
+        return # The source is gone, nothing to skip next time
+    ledger[os.path.basename(src_path)] = [st.st_size, st.st_mtime_ns]
+
+
+def save_placed_ledger(ledger_path, ledger):
+    """Writes the ledger atomically."""
+    tmp_path = ledger_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(ledger, f, sort_keys=True)
+    os.replace(tmp_path, ledger_path)
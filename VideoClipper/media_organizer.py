@@ -1,17 +1,29 @@
-import tkinter as tk
-from tkinter import filedialog, simpledialog, messagebox
+import argparse
 import os
-import shutil
-# MoviePy imports are still needed for get_video_duration
-from moviepy import VideoFileClip 
-# Removed ImageClip, CompositeVideoClip, ColorClip as they are no longer used for image->video
-from PIL import Image
+import sys
+import random
+# tkinter and MoviePy are imported where they are used: the watch daemon, the benchmarks and the
+# render workers import this module and need neither (MoviePy alone costs about a second of startup)
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import time
 import traceback
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import itertools
+import queue
+import threading
+import shutil
 import subprocess # Re-added for FFmpeg
+import tempfile
+
+# The helpers shared with VideoTools (mediacommon/) live at the repo root
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_DIR not in sys.path:
+    sys.path.append(_REPO_DIR)
+from duration_cache import update_duration_cache
+from file_placement import PLACED_LEDGER_FILENAME, is_placed, load_placed_ledger, place_files, record_placed, save_placed_ledger
+from mediacommon.ffmpeg_progress import FFmpegCancelled, enable_metrics, format_snapshot, run_ffmpeg
 
 # --- Configuration ---
 TARGET_VIDEO_WIDTH = 1920
@@ -28,28 +40,99 @@ VIDEO_FPS = 25 # Use 25 FPS for smoother Ken Burns effect
 VIDEO_PRESET = "veryfast" # FFmpeg preset (ultrafast might reduce quality too much with zoom)
 ZOOM_SPEED = 0.001 # Speed factor for Ken Burns zoom (smaller is slower)
 MAX_ZOOM = 1.2 # Maximum zoom factor (e.g., 1.2 means zoom in by 20%)
+MAX_IN_FLIGHT_PER_PROCESS = 2 # Conversion tasks queued per worker process (bounds memory for huge folders)
+PROGRESS_UPDATE_INTERVAL_MS = 250 # How often the progress window refreshes (completions in between are coalesced)
+# How files get into WORKING: "move", "hardlink" or "reflink" (the latter two keep the originals, which are
+# recorded in WORKING/.placed_sources.json so later runs and the watch daemon do not ingest them again)
+FILE_PLACEMENT_MODE = "move"
+# How moved images are rendered:
+#   "clips"     - one 7 second MP4 per image in 01_IMAGES_VIDS (input for video_combiner)
+#   "slideshow" - the shuffled images are rendered straight into one compilation (single encode, no intermediate clips)
+IMAGE_RENDER_MODE = "clips"
+SLIDESHOW_CROSSFADE = 0.0 # Crossfade between images in seconds for "slideshow" mode (0 = hard cuts)
+# Images per filtergraph in "slideshow" mode. Every image of a graph is a movie= source opened when the
+# graph is initialized, so a graph is bounded; the graphs run one after another and stream raw frames
+# into a single x264 encoder (one encode, no intermediate files).
+SLIDESHOW_BATCH_SIZE = 20
+# Fallback: encode each batch to a part file and join the parts with a stream-copy concat
+SLIDESHOW_ENCODE_PARTS = False
+SLIDESHOW_OUTPUT_PREFIX = "slideshow_compilation_"
+# Render a low-res proxy and a contact sheet per clip into <project>/_previews after organizing (see preview_generator)
+GENERATE_PREVIEWS = False
+# Project subfolders (key -> folder name inside WORKING/<project>)
+PROJECT_SUBFOLDERS = {
+    "images": "00_IMAGES",
+    "img_vids": "01_IMAGES_VIDS",
+    "vids_10s": "02_VIDS_10s",
+    "vids_20s": "03_VIDS_20s",
+    "vids_30s": "04_VIDS_30s",
+    "vids_long": "05_VIDS_LONG",
+}
 
-# --- Logging Setup ---
-log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-log_handler_file = logging.FileHandler("media_organizer.log", mode='a')
-log_handler_file.setFormatter(log_formatter)
-log_handler_console = logging.StreamHandler()
-log_handler_console.setFormatter(log_formatter)
+LOG_FILE = "media_organizer.log"
+# Log the full FFmpeg command line of every render (noisy for large folders; normally only one summary line per job)
+LOG_FFMPEG_COMMANDS = False
 
+# --- Logging Setup ---
+# Only the parent process writes the log file and console. Worker processes send their records
+# through a multiprocessing queue to a single QueueListener (see setup_logging / init_worker_logging),
+# so there is one file handle and no interleaved writes.
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-# Clear existing handlers to avoid duplicates
-if logger.handlers:
-    for handler in logger.handlers:
+_log_queue = None
+
+
+def _replace_root_handlers(*handlers):
+    """Installs handlers as the only handlers of the root logger."""
+    for handler in list(logger.handlers):
         logger.removeHandler(handler)
-logger.addHandler(log_handler_file)
-logger.addHandler(log_handler_console)
+    for handler in handlers:
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def setup_logging(log_file=LOG_FILE, mp_context=None):
+    """Configures logging in the parent process and starts the listener. Returns the listener (call stop() on exit).
+
+    Pass the mp_context the worker pools will use (the log queue must come from the same context).
+    """
+    global _log_queue
+    log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(processName)s - %(message)s')
+    log_handler_file = logging.FileHandler(log_file, mode='a')
+    log_handler_file.setFormatter(log_formatter)
+    log_handler_console = logging.StreamHandler()
+    log_handler_console.setFormatter(log_formatter)
+
+    _log_queue = (mp_context or multiprocessing).Queue(-1)
+    listener = QueueListener(_log_queue, log_handler_file, log_handler_console, respect_handler_level=True)
+    listener.start()
+    _replace_root_handlers(QueueHandler(_log_queue))
+    return listener
+
+
+def init_worker_logging(log_queue):
+    """ProcessPoolExecutor initializer: routes the worker's log records to the parent's listener."""
+    _replace_root_handlers(QueueHandler(log_queue))
+    # Per-render progress lines would flood the shared log; the metrics file (if enabled) still receives them
+    logging.getLogger("mediacommon.ffmpeg_progress").setLevel(logging.WARNING)
+
+
+def create_process_pool(max_workers, log_queue=None, mp_context=None):
+    """ProcessPoolExecutor whose workers log through the parent's listener (when setup_logging was called).
+
+    Multithreaded callers should pass a "spawn" mp_context, since forking a process with running threads is unsafe.
+    """
+    log_queue = log_queue or _log_queue
+    if log_queue is None:
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                               initializer=init_worker_logging, initargs=(log_queue,))
 
 
 # --- Helper Functions ---
 
 def get_video_duration(filepath):
     """Gets the duration of a video file."""
+    from moviepy import VideoFileClip
     clip = None
     try:
         clip = VideoFileClip(filepath)
@@ -77,35 +160,60 @@ def create_folder_if_not_exists(folder_path):
             return False
     return True
 
+def get_project_folders(dest_base_path):
+    """Returns the project subfolder paths keyed like PROJECT_SUBFOLDERS."""
+    return {key: os.path.join(dest_base_path, name) for key, name in PROJECT_SUBFOLDERS.items()}
+
+
+def get_video_bucket(duration):
+    """Returns the PROJECT_SUBFOLDERS key of the bucket a video of the given duration belongs in."""
+    if duration <= 10:
+        return "vids_10s"
+    elif duration <= 20:
+        return "vids_20s"
+    elif duration <= 30:
+        return "vids_30s"
+    return "vids_long"
+
 # Removed create_video_from_image_optimized function
 
+def build_kenburns_chain(duration_frames):
+    """Returns the FFmpeg filter chain (without pad labels) that turns one image into a Ken Burns clip."""
+    # 1. Scale the image slightly larger than the target to allow zooming in without black borders appearing at edges
+    # 2. Pad to the max zoom dimensions
+    # 3. Intermediate upscale significantly to improve zoompan smoothness
+    # 4. Apply zoompan
+    return (
+        f"scale=w='if(gte(iw/ih,{TARGET_ASPECT_RATIO}),{TARGET_VIDEO_WIDTH}*{MAX_ZOOM},-2)':h='if(lt(iw/ih,{TARGET_ASPECT_RATIO}),{TARGET_VIDEO_HEIGHT}*{MAX_ZOOM},-2)'," # Scale maintaining aspect ratio to cover zoomed area
+        f"pad=w={TARGET_VIDEO_WIDTH}*{MAX_ZOOM}:h={TARGET_VIDEO_HEIGHT}*{MAX_ZOOM}:x='(ow-iw)/2':y='(oh-ih)/2':color=black," # Pad to the max zoom dimensions
+        f"setsar=1," # Ensure square pixels
+        f"scale=8000:-1," # Intermediate upscale for smoothness
+        f"zoompan=z='min(zoom+{ZOOM_SPEED},{MAX_ZOOM})':" # Zoom expression
+        f"x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':" # Center the zoom
+        f"d={duration_frames}:" # Duration in frames
+        f"s={TARGET_VIDEO_WIDTH}x{TARGET_VIDEO_HEIGHT}:" # Output size
+        f"fps={VIDEO_FPS}" # Output frame rate
+    )
+
+
+def escape_ffmpeg_filter_path(path):
+    """Escapes a file path so it can be used as an option value inside a filtergraph (e.g. movie=...)."""
+    # FFmpeg accepts forward slashes on every platform, which avoids backslash escaping issues on Windows
+    path = path.replace("\\", "/")
+    # First level: option value escaping (':' separates options, "'" is special)
+    path = path.replace("'", "\\'").replace(":", "\\:")
+    # Second level: quote for the filtergraph parser (a quote inside quotes is written as '\'')
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
 def create_video_with_ffmpeg_kenburns(image_path, output_path):
     """Creates a video from an image using direct FFmpeg command with Ken Burns effect."""
     try:
         # Calculate zoom duration in frames
         duration_frames = int(IMAGE_VIDEO_DURATION * VIDEO_FPS)
 
-        # Build the complex filter string for scaling, padding, and zoompan
-        # 1. Scale the image slightly larger than the target to allow zooming in without black borders appearing at edges
-        #    We need to maintain aspect ratio while ensuring it covers the MAX_ZOOM area.
-        #    Scale to fit within TARGET_WIDTH*MAX_ZOOM x TARGET_HEIGHT*MAX_ZOOM, then pad to that size.
-        # 2. Apply zoompan
         # Build the complex filter string for scaling, padding, intermediate scaling (for smoothness), and zoompan
-        # 1. Scale the image slightly larger than the target to allow zooming in without black borders appearing at edges
-        # 2. Pad to the max zoom dimensions
-        # 3. Intermediate upscale significantly to improve zoompan smoothness
-        # 4. Apply zoompan
-        filter_complex = (
-            f"[0:v]scale=w='if(gte(iw/ih,{TARGET_ASPECT_RATIO}),{TARGET_VIDEO_WIDTH}*{MAX_ZOOM},-2)':h='if(lt(iw/ih,{TARGET_ASPECT_RATIO}),{TARGET_VIDEO_HEIGHT}*{MAX_ZOOM},-2)'," # Scale maintaining aspect ratio to cover zoomed area
-            f"pad=w={TARGET_VIDEO_WIDTH}*{MAX_ZOOM}:h={TARGET_VIDEO_HEIGHT}*{MAX_ZOOM}:x='(ow-iw)/2':y='(oh-ih)/2':color=black," # Pad to the max zoom dimensions
-            f"setsar=1," # Ensure square pixels
-            f"scale=8000:-1," # Intermediate upscale for smoothness
-            f"zoompan=z='min(zoom+{ZOOM_SPEED},{MAX_ZOOM})':" # Zoom expression
-            f"x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)':" # Center the zoom
-            f"d={duration_frames}:" # Duration in frames
-            f"s={TARGET_VIDEO_WIDTH}x{TARGET_VIDEO_HEIGHT}:" # Output size
-            f"fps={VIDEO_FPS}[v]" # Output frame rate
-        )
+        filter_complex = f"[0:v]{build_kenburns_chain(duration_frames)}[v]"
 
         # Build the full ffmpeg command
         cmd = [
@@ -126,26 +234,18 @@ def create_video_with_ffmpeg_kenburns(image_path, output_path):
             output_path  # Output file path
         ]
 
-        logger.info(f"Running FFmpeg for {image_path}: {' '.join(cmd)}")
+        if LOG_FFMPEG_COMMANDS:
+            logger.info(f"Running FFmpeg for {image_path}: {' '.join(cmd)}")
 
         # Run the command
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0 # Hide console window on Windows
-        )
-        stdout, stderr = process.communicate()
-
-        if process.returncode != 0:
-            logger.error(f"FFmpeg error creating video for {image_path}. Return code: {process.returncode}")
-            logger.error(f"FFmpeg stderr:\n{stderr.decode(errors='ignore')}")
-            # Attempt to log stdout as well, might contain useful info
-            if stdout:
-                 logger.error(f"FFmpeg stdout:\n{stdout.decode(errors='ignore')}")
+        # Progress is parsed from FFmpeg's -progress output; only the tail of stderr is kept
+        returncode, stderr_tail = run_ffmpeg(cmd, label=os.path.basename(image_path), total_duration=IMAGE_VIDEO_DURATION)
+
+        if returncode != 0:
+            logger.error(f"FFmpeg error creating video for {image_path}. Return code: {returncode}")
+            logger.error(f"FFmpeg stderr:\n{stderr_tail}")
             return False
         else:
-            logger.info(f"Successfully created video with Ken Burns effect: {output_path}")
             return True
 
     except FileNotFoundError:
@@ -158,22 +258,521 @@ def create_video_with_ffmpeg_kenburns(image_path, output_path):
 
 
 def process_image_to_video(args):
-    """Process a single image to video using FFmpeg Ken Burns (for parallel processing)."""
+    """Process a single image to video using FFmpeg Ken Burns (for parallel processing).
+
+    Logs one summary line per job (image, status, elapsed time, output).
+    """
     img_path, output_path = args
+    started = time.time()
     try:
         # Use the FFmpeg Ken Burns method
         success = create_video_with_ffmpeg_kenburns(img_path, output_path)
-        return img_path, success
     except Exception as e:
-        # Log error from the worker process
-        # Note: Logging setup might need adjustments for multiprocessing if issues arise
         logger.error(f"Error in worker process for {img_path}: {e}\n{traceback.format_exc()}")
-        return img_path, False
+        success = False
+    logger.info(
+        f"job=kenburns image={os.path.basename(img_path)} status={'ok' if success else 'failed'} "
+        f"elapsed={time.time() - started:.2f}s output={output_path}"
+    )
+    return img_path, success
+
+
+def build_slideshow_filter_script(image_paths, crossfade=0.0, trim_head=False, trim_tail=False):
+    """Builds the filtergraph rendering images as one Ken Burns slideshow, optionally joined with crossfades.
+
+    trim_head / trim_tail drop the first / last `crossfade` seconds of the first / last image: those
+    frames are rendered separately as the crossfade into the neighbouring batch (see build_transition_filter_script).
+    """
+    duration_frames = int(IMAGE_VIDEO_DURATION * VIDEO_FPS)
+    fade_frames = int(round(crossfade * VIDEO_FPS))
+    lines = []
+    lengths = [] # Length of each branch in seconds
+    for i, img_path in enumerate(image_paths):
+        start_frame = fade_frames if trim_head and i == 0 else 0
+        end_frame = duration_frames - fade_frames if trim_tail and i == len(image_paths) - 1 else duration_frames
+        # movie= reads a single frame and zoompan expands it to duration_frames frames. All movie= sources
+        # are opened when the graph is initialized, which is why a graph only covers one batch of images.
+        lines.append(
+            f"movie={escape_ffmpeg_filter_path(img_path)},{build_kenburns_chain(duration_frames)},"
+            f"trim=start_frame={start_frame}:end_frame={end_frame},setpts=PTS-STARTPTS,format=yuv420p[v{i}];"
+        )
+        lengths.append((end_frame - start_frame) / VIDEO_FPS)
+
+    if len(image_paths) == 1:
+        lines.append("[v0]null[v]")
+    elif crossfade > 0:
+        # Each xfade starts 'crossfade' seconds before the end of the accumulated stream
+        accumulated = lengths[0]
+        previous = "v0"
+        for i in range(1, len(image_paths)):
+            current = "v" if i == len(image_paths) - 1 else f"x{i}"
+            lines.append(
+                f"[{previous}][v{i}]xfade=transition=fade:duration={crossfade}:offset={accumulated - crossfade:.3f}[{current}]"
+                + (";" if current != "v" else "")
+            )
+            accumulated += lengths[i] - crossfade
+            previous = current
+    else:
+        lines.append("".join(f"[v{i}]" for i in range(len(image_paths))) + f"concat=n={len(image_paths)}:v=1:a=0[v]")
+
+    return "\n".join(lines)
+
+
+def build_transition_filter_script(previous_image, next_image, crossfade):
+    """Builds the filtergraph of the crossfade between two batches: the last `crossfade` seconds of
+    previous_image blended into the first `crossfade` seconds of next_image."""
+    duration_frames = int(IMAGE_VIDEO_DURATION * VIDEO_FPS)
+    fade_frames = int(round(crossfade * VIDEO_FPS))
+    chain = build_kenburns_chain(duration_frames)
+    return (
+        f"movie={escape_ffmpeg_filter_path(previous_image)},{chain},"
+        f"trim=start_frame={duration_frames - fade_frames}:end_frame={duration_frames},setpts=PTS-STARTPTS,format=yuv420p[a];\n"
+        f"movie={escape_ffmpeg_filter_path(next_image)},{chain},"
+        f"trim=end_frame={fade_frames},setpts=PTS-STARTPTS,format=yuv420p[b];\n"
+        f"[a][b]xfade=transition=fade:duration={crossfade}:offset=0[v]"
+    )
+
+
+def plan_slideshow_batches(image_paths, batch_size=SLIDESHOW_BATCH_SIZE):
+    """Splits the images into evenly sized batches of at most batch_size (at least two images each when
+    there are two or more, so trimming a crossfade off both ends never leaves an image shorter than the fade)."""
+    batch_size = max(2, batch_size)
+    count = -(-len(image_paths) // batch_size)
+    size, extra = divmod(len(image_paths), count)
+    batches, start = [], 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        batches.append(image_paths[start:end])
+        start = end
+    return batches
+
+
+def get_next_slideshow_filename(output_folder):
+    """Finds the next available slideshow output filename (e.g., slideshow_compilation_00X.mp4)."""
+    max_num = 0
+    for filename in os.listdir(output_folder):
+        if filename.startswith(SLIDESHOW_OUTPUT_PREFIX) and filename.endswith(".mp4"):
+            number = filename[len(SLIDESHOW_OUTPUT_PREFIX):-len(".mp4")]
+            if number.isdigit():
+                max_num = max(max_num, int(number))
+    return os.path.join(output_folder, f"{SLIDESHOW_OUTPUT_PREFIX}{max_num + 1:03d}.mp4")
+
+
+def _slideshow_encoder_args(output_path):
+    """Encoder options shared by every slideshow render (one x264 session per output)."""
+    return [
+        '-c:v', 'libx264',  # Video codec
+        '-preset', VIDEO_PRESET,  # Encoding speed/quality preset
+        '-tune', 'stillimage', # Optimize for static source
+        '-pix_fmt', 'yuv420p',  # Pixel format for compatibility
+        '-r', str(VIDEO_FPS), # Output frame rate
+        '-movflags', '+faststart', # Optimize for web streaming
+        '-an',  # No audio
+        output_path  # Output file path
+    ]
+
+
+def _write_filter_script(filter_script, script_path):
+    # The filtergraph references every image of the batch, so it goes into a script file instead of
+    # the command line (avoids the Windows command line length limit)
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(filter_script)
+    return script_path
+
+
+def _render_slideshow_part(filter_script, output_path, script_path, total_duration, on_progress):
+    """Renders one filtergraph (output label [v]) with the slideshow encoder settings. Returns True on success."""
+    cmd = [
+        'ffmpeg',
+        '-y',  # Overwrite output file if it exists
+        '-filter_complex_script', _write_filter_script(filter_script, script_path), # Sources are movie= filters
+        '-map', '[v]', # Map the video stream from the filter complex
+    ] + _slideshow_encoder_args(output_path)
+    returncode, stderr_tail = run_ffmpeg(
+        cmd, label=os.path.basename(output_path), total_duration=total_duration, on_progress=on_progress
+    )
+    if returncode != 0:
+        logger.error(f"FFmpeg error rendering {output_path}. Return code: {returncode}")
+        logger.error(f"FFmpeg stderr:\n{stderr_tail}")
+        return False
+    return True
+
+
+def _render_slideshow_piped(parts, output_path, work_dir, total_duration, on_progress):
+    """Renders the filtergraphs one after another as raw frames into a pipe read by a single x264 encoder.
+
+    Only one graph (one batch of images) is open at a time and nothing but the output is written.
+    Returns True on success.
+    """
+    read_fd, write_fd = os.pipe()
+    stop = threading.Event()
+    state = {"process": None, "error": None}
+
+    def feed_frames():
+        # Runs the graphs in order, each writing straight into the pipe; closing the write end ends the encoder's input
+        try:
+            for i, (filter_script, _) in enumerate(parts):
+                if stop.is_set():
+                    return
+                script_path = _write_filter_script(filter_script, os.path.join(work_dir, f"part_{i:04d}.filter.txt"))
+                cmd = ['ffmpeg', '-v', 'error', '-filter_complex_script', script_path, '-map', '[v]',
+                       '-f', 'rawvideo', '-pix_fmt', 'yuv420p', '-r', str(VIDEO_FPS), '-']
+                process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=write_fd, stderr=subprocess.PIPE)
+                state["process"] = process
+                # With -v error stderr stays small; the frames go to the pipe, not through Python
+                _, stderr = process.communicate()
+                if process.returncode != 0:
+                    if not stop.is_set():
+                        state["error"] = f"Return code {process.returncode}\n{stderr.decode(errors='ignore')}"
+                    return
+        except Exception as e:
+            state["error"] = str(e)
+        finally:
+            os.close(write_fd)
+
+    cmd = [
+        'ffmpeg',
+        '-y',  # Overwrite output file if it exists
+        '-f', 'rawvideo', '-pix_fmt', 'yuv420p', '-s', f"{TARGET_VIDEO_WIDTH}x{TARGET_VIDEO_HEIGHT}",
+        '-r', str(VIDEO_FPS), '-i', '-', # Frames of all batches, in order
+    ] + _slideshow_encoder_args(output_path)
+    feeder = threading.Thread(target=feed_frames, daemon=True)
+    feeder.start()
+    try:
+        returncode, stderr_tail = run_ffmpeg(cmd, label=os.path.basename(output_path), total_duration=total_duration,
+                                             on_progress=on_progress, stdin=read_fd)
+    finally:
+        # E.g. cancelled or the encoder failed: without a reader, a graph still writing gets a broken pipe
+        stop.set()
+        os.close(read_fd)
+        if state["process"] and state["process"].poll() is None:
+            state["process"].kill()
+        feeder.join()
+    if state["error"]:
+        logger.error(f"FFmpeg error rendering the slideshow frames: {state['error']}")
+        return False
+    if returncode != 0:
+        logger.error(f"FFmpeg error rendering {output_path}. Return code: {returncode}")
+        logger.error(f"FFmpeg stderr:\n{stderr_tail}")
+        return False
+    return True
+
+
+def _render_slideshow_parts(parts, output_path, work_dir, total_duration, on_progress):
+    """Fallback (SLIDESHOW_ENCODE_PARTS): encodes each filtergraph to a part file and joins the parts
+    with a stream-copy concat. Returns True on success."""
+    part_paths = []
+    rendered_duration = 0.0
+    for i, (filter_script, duration) in enumerate(parts):
+        part_path = os.path.join(work_dir, f"part_{i:04d}.mp4")
+
+        def report(snapshot, offset=rendered_duration):
+            # Percent and ETA over the whole compilation rather than this part
+            out_time = offset + (snapshot["out_time"] or 0.0)
+            snapshot = dict(snapshot, out_time=out_time, percent=min(100.0, out_time / total_duration * 100))
+            if snapshot["speed"]:
+                snapshot["eta"] = (total_duration - out_time) / snapshot["speed"]
+            on_progress(snapshot)
+
+        if not _render_slideshow_part(filter_script, part_path, part_path + ".filter.txt", duration,
+                                      report if on_progress else None):
+            return False
+        part_paths.append(part_path)
+        rendered_duration += duration
+
+    list_path = os.path.join(work_dir, "parts.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for part_path in part_paths:
+            f.write("file '{}'\n".format(part_path.replace("\\", "/").replace("'", "'\\''")))
+    returncode, stderr_tail = run_ffmpeg(
+        ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', '-movflags', '+faststart',
+         output_path], label=os.path.basename(output_path)
+    )
+    if returncode != 0:
+        logger.error(f"FFmpeg error joining the slideshow parts. Return code: {returncode}")
+        logger.error(f"FFmpeg stderr:\n{stderr_tail}")
+        return False
+    return True
+
+
+def render_slideshow_compilation(image_paths, output_path, crossfade=SLIDESHOW_CROSSFADE, on_progress=None,
+                                 batch_size=SLIDESHOW_BATCH_SIZE, encode_parts=SLIDESHOW_ENCODE_PARTS):
+    """Renders the images into one compilation video with a single x264 encode.
+
+    The images are rendered in batches of at most batch_size (one filtergraph each); with a
+    crossfade, the fade between two batches is its own short graph. The graphs run one after
+    another and their raw frames are piped into one encoder, so only one batch of images is open at
+    a time and no intermediate files are written. encode_parts instead encodes each graph to a part
+    file and joins the parts with a stream-copy concat. on_progress is called with each FFmpeg
+    progress snapshot (see mediacommon.ffmpeg_progress.run_ffmpeg), with percent and ETA over the
+    whole compilation.
+    """
+    if not image_paths:
+        logger.warning("No images provided for slideshow rendering.")
+        return False
+    if crossfade >= IMAGE_VIDEO_DURATION:
+        logger.error(f"Crossfade ({crossfade}s) must be shorter than the image duration ({IMAGE_VIDEO_DURATION}s).")
+        return False
+
+    batches = plan_slideshow_batches(image_paths, batch_size)
+    parts = [] # (filtergraph, duration in seconds)
+    for i, batch in enumerate(batches):
+        trim_head = crossfade > 0 and i > 0
+        trim_tail = crossfade > 0 and i < len(batches) - 1
+        duration = (len(batch) * IMAGE_VIDEO_DURATION - (len(batch) - 1) * crossfade
+                    - crossfade * (trim_head + trim_tail))
+        if i > 0 and crossfade > 0:
+            parts.append((build_transition_filter_script(batches[i - 1][-1], batch[0], crossfade), crossfade))
+        parts.append((build_slideshow_filter_script(batch, crossfade, trim_head, trim_tail), duration))
+    total_duration = sum(duration for _, duration in parts)
+
+    logger.info(f"Rendering slideshow of {len(image_paths)} images in {len(batches)} batch(es) to {output_path} "
+                f"(crossfade: {crossfade}s)")
+    # Only the filter scripts (and the fallback's part files) go here, never next to the output
+    work_dir = tempfile.mkdtemp(prefix="slideshow_")
+    try:
+        if len(parts) == 1:
+            filter_script, duration = parts[0]
+            success = _render_slideshow_part(filter_script, output_path, os.path.join(work_dir, "slideshow.filter.txt"),
+                                             duration, on_progress)
+        elif encode_parts:
+            success = _render_slideshow_parts(parts, output_path, work_dir, total_duration, on_progress)
+        else:
+            success = _render_slideshow_piped(parts, output_path, work_dir, total_duration, on_progress)
+        if not success:
+            if os.path.exists(output_path):
+                os.remove(output_path) # Incomplete
+            return False
+        logger.info(f"Successfully rendered slideshow compilation: {output_path}")
+        return True
+
+    except FileNotFoundError:
+        logger.critical("FFmpeg command not found. Please ensure FFmpeg is installed and in your system's PATH.")
+        raise
+    except FFmpegCancelled:
+        logger.warning(f"Slideshow rendering cancelled: {output_path}")
+        if os.path.exists(output_path):
+            os.remove(output_path) # Partly written by the killed FFmpeg
+        return False
+    except Exception as e:
+        logger.error(f"Error rendering slideshow compilation: {e}\n{traceback.format_exc()}")
+        return False
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def iter_bounded_results(executor, fn, tasks, max_in_flight):
+    """Submits fn(task) for each task while keeping at most max_in_flight futures pending.
+
+    Yields (task, future) as futures complete; new tasks are only submitted when a slot frees up,
+    so memory stays constant no matter how many tasks there are.
+    """
+    task_iter = iter(tasks)
+    in_flight = {}
+    for task in itertools.islice(task_iter, max_in_flight):
+        in_flight[executor.submit(fn, task)] = task
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            task = in_flight.pop(future)
+            next_task = next(task_iter, None)
+            if next_task is not None:
+                in_flight[executor.submit(fn, next_task)] = next_task
+            yield task, future
+
+
+def run_conversions_in_background(conversion_tasks, num_processes, results_queue, cancel_event=None):
+    """Converts the images on a process pool and reports (img_path, success) on results_queue, then None.
+
+    Once cancel_event is set no new conversions are started; the ones already running are finished.
+    """
+    if cancel_event is not None:
+        conversion_tasks = itertools.takewhile(lambda _: not cancel_event.is_set(), conversion_tasks)
+    try:
+        with create_process_pool(num_processes) as executor:
+            max_in_flight = num_processes * MAX_IN_FLIGHT_PER_PROCESS
+            for task, future in iter_bounded_results(executor, process_image_to_video, conversion_tasks, max_in_flight):
+                try:
+                    img_path, success = future.result()
+                except Exception as exc:
+                    # Catch errors from the future itself (e.g., if the worker process died)
+                    logger.error(f"Error processing future for task {task[0]}: {exc}")
+                    img_path, success = task[0], False
+                results_queue.put((img_path, success))
+    except Exception as e:
+        logger.error(f"Image conversion pool failed: {e}\n{traceback.format_exc()}")
+    finally:
+        results_queue.put(None)
+
+
+def run_slideshow_in_background(image_paths, output_path, results_queue, cancel_event=None):
+    """Renders a slideshow compilation, reporting ("progress", snapshot) and finally ("done", success) on results_queue.
+
+    Setting cancel_event stops the render (FFmpeg is killed at its next progress report).
+    """
+    def report(snapshot):
+        if cancel_event is not None and cancel_event.is_set():
+            raise FFmpegCancelled()
+        results_queue.put(("progress", snapshot))
+
+    success = False
+    try:
+        success = render_slideshow_compilation(image_paths, output_path, on_progress=report)
+    except Exception as e:
+        logger.error(f"Slideshow rendering failed: {e}\n{traceback.format_exc()}")
+    finally:
+        results_queue.put(("done", success))
+
+
+def run_previews_in_background(project_folder, results_queue, cancel_event=None):
+    """Generates the project previews, reporting ("progress", (done, total)) and finally ("done", failures)."""
+    from preview_generator import generate_project_previews
+    failures = 0
+    try:
+        _, _, failures = generate_project_previews(
+            project_folder, on_progress=lambda done, total: results_queue.put(("progress", (done, total))),
+            cancel_event=cancel_event
+        )
+    except Exception as e:
+        logger.error(f"Preview generation failed: {e}\n{traceback.format_exc()}")
+        failures = 1
+    finally:
+        results_queue.put(("done", failures))
+
+
+def drain_queue(results_queue):
+    """Returns the items left on a queue (after its producer thread has finished)."""
+    items = []
+    while True:
+        try:
+            items.append(results_queue.get_nowait())
+        except queue.Empty:
+            return items
+
+
+def request_cancel(progress_window, status_label, cancel_event):
+    """Close handler of the progress windows: asks the background work to stop and keeps the window until it has."""
+    if not cancel_event.is_set():
+        logger.info("Cancel requested from the progress window.")
+        cancel_event.set()
+        status_label.config(text="Cancelling, waiting for the running FFmpeg jobs...")
+
+
+def placed_ledger_path(source_folder):
+    """The ledger of the originals kept in source_folder by "hardlink"/"reflink" placement."""
+    return os.path.join(source_folder, WORKING_SUBDIR, PLACED_LEDGER_FILENAME)
+
+
+def create_project_folders(source_folder, project_name):
+    """Creates WORKING/<project_name> and its subfolders inside source_folder (headless callers).
+
+    Returns (project folder, subfolders dict). Raises OSError if a folder cannot be created.
+    """
+    dest_base_path = os.path.join(source_folder, WORKING_SUBDIR, project_name)
+    folders = get_project_folders(dest_base_path)
+    for path in [dest_base_path] + list(folders.values()):
+        if not create_folder_if_not_exists(path):
+            raise OSError(f"Could not create project folder {path}")
+    return dest_base_path, folders
+
+
+def organize_files(source_folder, folders):
+    """Moves the media files of source_folder into the project folders (images, duration buckets).
+
+    Returns (moved image paths, {clip path: duration}, number of files placed, whether errors occurred).
+    Raises OSError if the source folder cannot be read.
+    """
+    moved_images = []
+    clip_durations = {} # Durations of the clips placed in the buckets, cached for the compilation builder
+    processed_files = 0
+    errors_occurred = False
+
+    logger.info(f"Scanning source folder for files: {source_folder}")
+    with os.scandir(source_folder) as entries:
+        items_to_process = [entry.name for entry in entries if entry.is_file()]
+    logger.info(f"Found {len(items_to_process)} files to process in the source folder.")
+
+    keeps_sources = FILE_PLACEMENT_MODE != "move"
+    if keeps_sources:
+        ledger_path = placed_ledger_path(source_folder)
+        ledger = load_placed_ledger(ledger_path)
+        remaining = [item for item in items_to_process if not is_placed(ledger, os.path.join(source_folder, item))]
+        if len(remaining) < len(items_to_process):
+            logger.info(f"Skipping {len(items_to_process) - len(remaining)} file(s) placed by an earlier run.")
+        items_to_process = remaining
+
+    # Work out every destination first, then place all files in one batch (renames on the same device,
+    # parallel copies across devices; see file_placement)
+    placements = [] # (source path, destination path, duration or None for images)
+    for item in items_to_process:
+        source_item_path = os.path.join(source_folder, item)
+        _, ext = os.path.splitext(item)
+        ext = ext.lower()
+
+        # --- Images ---
+        if ext in IMAGE_EXTENSIONS:
+            placements.append((source_item_path, os.path.join(folders["images"], item), None))
+
+        # --- Videos ---
+        elif ext in VIDEO_EXTENSIONS:
+            duration = get_video_duration(source_item_path)
+            if duration is None:
+                logger.warning(f"Could not get duration for video {item}. Skipping move.")
+                errors_occurred = True
+                continue
+
+            target_folder_key = get_video_bucket(duration)
+            placements.append((source_item_path, os.path.join(folders[target_folder_key], item), duration))
+
+    logger.info(f"Placing {len(placements)} files into {os.path.dirname(folders['images'])} (mode: {FILE_PLACEMENT_MODE})")
+    placed = place_files([(src, dest) for src, dest, _ in placements], mode=FILE_PLACEMENT_MODE)
+    for source_item_path, dest_path, duration in placements:
+        item = os.path.basename(source_item_path)
+        if not placed.get(source_item_path):
+            logger.error(f"Error moving {item} to {os.path.dirname(dest_path)}")
+            errors_occurred = True
+            continue
+        processed_files += 1
+        if duration is None:
+            logger.info(f"Moved image: {item} to {folders['images']}")
+            moved_images.append(dest_path)
+        else:
+            logger.info(f"Moved video: {item} (Duration: {duration:.2f}s) to {os.path.dirname(dest_path)}")
+            clip_durations[dest_path] = duration
+        if keeps_sources:
+            record_placed(ledger, source_item_path)
+
+    if keeps_sources and processed_files:
+        try:
+            save_placed_ledger(ledger_path, ledger)
+        except OSError as e:
+            logger.warning(f"Could not write placed-sources ledger {ledger_path}: {e}")
+
+    return moved_images, clip_durations, processed_files, errors_occurred
+
+
+def build_conversion_tasks(image_paths, output_folder):
+    """(image path, output clip path) render tasks, skipping images whose clip already exists."""
+    conversion_tasks = []
+    for img_path in image_paths:
+        base_name, _ = os.path.splitext(os.path.basename(img_path))
+        output_video_path = os.path.join(output_folder, f"{base_name}.mp4")
+
+        # Skip if video already exists
+        if os.path.exists(output_video_path):
+            logger.warning(f"Output video already exists, skipping: {output_video_path}")
+            continue
+
+        conversion_tasks.append((img_path, output_video_path))
+    return conversion_tasks
 
 
 # --- Main Logic ---
 
 def main():
+    import tkinter as tk
+    from tkinter import filedialog, simpledialog, messagebox
+
     root = tk.Tk()
     root.withdraw()  # Hide the main tkinter window
 
@@ -225,14 +824,7 @@ def main():
 
     # 3. Create Destination Folders
     dest_base_path = os.path.join(working_folder_base, dest_folder_name)
-    folders_to_create = {
-        "images": os.path.join(dest_base_path, "00_IMAGES"),
-        "img_vids": os.path.join(dest_base_path, "01_IMAGES_VIDS"),
-        "vids_10s": os.path.join(dest_base_path, "02_VIDS_10s"),
-        "vids_20s": os.path.join(dest_base_path, "03_VIDS_20s"),
-        "vids_30s": os.path.join(dest_base_path, "04_VIDS_30s"),
-        "vids_long": os.path.join(dest_base_path, "05_VIDS_LONG"),
-    }
+    folders_to_create = get_project_folders(dest_base_path)
 
     # Create base destination folder first
     if os.path.exists(dest_base_path):
@@ -254,88 +846,98 @@ def main():
         return
 
     # 4. Process Files
-    moved_images = []
-    processed_files = 0
-    errors_occurred = False
     start_time = time.time()
 
-    logger.info(f"Scanning source folder for files: {source_folder}")
     try:
-        items_in_source = os.listdir(source_folder)
-    except Exception as e:
+        moved_images, clip_durations, processed_files, errors_occurred = organize_files(source_folder, folders_to_create)
+    except OSError as e:
         messagebox.showerror("Error", f"Could not read source folder: {source_folder}\n{e}")
         logger.error(f"Failed to list directory: {source_folder}: {e}")
         return
 
-    items_to_process = [
-        item for item in items_in_source
-        if os.path.isfile(os.path.join(source_folder, item))
-    ]
-    logger.info(f"Found {len(items_to_process)} files to process in the source folder.")
+    # 5. Convert Moved Images to Videos using parallel processing with FFmpeg
+    slideshow_path = None
+    cancelled_images = 0 # Images left unrendered because the progress window was closed
+    if moved_images and IMAGE_RENDER_MODE == "slideshow":
+        # Single-pass mode: shuffle the images and render the compilation directly, no per-image clips
+        img_video_count = 0
+        conversion_errors = 0
+        shuffled_images = list(moved_images)
+        random.shuffle(shuffled_images)
+        slideshow_path = get_next_slideshow_filename(dest_base_path)
 
-    for item in items_to_process:
-        source_item_path = os.path.join(source_folder, item)
-        _, ext = os.path.splitext(item)
-        ext = ext.lower()
+        progress_window = tk.Toplevel(root)
+        progress_window.title("Rendering Slideshow Compilation (FFmpeg)")
+        progress_window.geometry("400x150")
+        progress_window.resizable(False, False)
+        progress_label = tk.Label(progress_window, text=f"Rendering {len(shuffled_images)} images...")
+        progress_label.pack(pady=10)
+        progress_var = tk.DoubleVar()
+        progress_bar = tk.Scale(progress_window, variable=progress_var, orient="horizontal",
+                               length=350, from_=0, to=100, state="disabled")
+        progress_bar.pack(pady=10)
+        status_label = tk.Label(progress_window, text="Starting FFmpeg...")
+        status_label.pack(pady=10)
+        progress_window.update()
 
-        # --- Move Images ---
-        if ext in IMAGE_EXTENSIONS:
-            dest_img_path = os.path.join(folders_to_create["images"], item)
-            try:
-                logger.info(f"Moving image: {source_item_path} -> {dest_img_path}")
-                shutil.move(source_item_path, dest_img_path)
-                logger.info(f"Moved image: {item} to {folders_to_create['images']}")
-                moved_images.append(dest_img_path)
-                processed_files += 1
-            except Exception as e:
-                logger.error(f"Error moving image {item}: {e}\n{traceback.format_exc()}")
-                errors_occurred = True
-
-        # --- Move Videos ---
-        elif ext in VIDEO_EXTENSIONS:
-            duration = get_video_duration(source_item_path)
-            if duration is None:
-                logger.warning(f"Could not get duration for video {item}. Skipping move.")
-                errors_occurred = True
-                continue
+        # Rendered on a background thread; the Tk thread only shows the latest progress snapshot on a timer.
+        # Closing the window cancels the render.
+        results_queue = queue.Queue()
+        cancel_event = threading.Event()
+        slideshow_thread = threading.Thread(
+            target=run_slideshow_in_background, args=(shuffled_images, slideshow_path, results_queue, cancel_event),
+            daemon=True
+        )
+        slideshow_thread.start()
+        progress_window.protocol("WM_DELETE_WINDOW", lambda: request_cancel(progress_window, status_label, cancel_event))
+        slideshow_ok = False
 
-            target_folder_key = None
-            if duration <= 10:
-                target_folder_key = "vids_10s"
-            elif duration <= 20:
-                target_folder_key = "vids_20s"
-            elif duration <= 30:
-                target_folder_key = "vids_30s"
-            else:
-                target_folder_key = "vids_long"
-
-            dest_vid_path = os.path.join(folders_to_create[target_folder_key], item)
+        def poll_slideshow_progress():
+            nonlocal slideshow_ok
+            snapshot = None
+            while True:
+                try:
+                    kind, value = results_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "done":
+                    slideshow_ok = value
+                    progress_window.destroy()
+                    return
+                snapshot = value
             try:
-                logger.info(f"Moving video: {source_item_path} -> {dest_vid_path}")
-                shutil.move(source_item_path, dest_vid_path)
-                logger.info(f"Moved video: {item} (Duration: {duration:.2f}s) to {folders_to_create[target_folder_key]}")
-                processed_files += 1
-            except Exception as e:
-                logger.error(f"Error moving video {item}: {e}\n{traceback.format_exc()}")
-                errors_occurred = True
+                if snapshot is not None and not cancel_event.is_set():
+                    if snapshot["percent"] is not None:
+                        progress_var.set(snapshot["percent"])
+                    status_label.config(text=format_snapshot(snapshot))
+                progress_window.after(PROGRESS_UPDATE_INTERVAL_MS, poll_slideshow_progress)
+            except tk.TclError:
+                pass # The window was destroyed; the result is collected below
 
-    # 5. Convert Moved Images to Videos using parallel processing with FFmpeg
-    if moved_images:
+        progress_window.after(PROGRESS_UPDATE_INTERVAL_MS, poll_slideshow_progress)
+        # Runs the Tk event loop until poll_slideshow_progress destroys the window
+        progress_window.wait_window()
+        if slideshow_thread.is_alive():
+            cancel_event.set() # The window went away without the render finishing
+        slideshow_thread.join()
+        for kind, value in drain_queue(results_queue):
+            if kind == "done":
+                slideshow_ok = value
+        if slideshow_ok:
+            img_video_count = 1
+        elif cancel_event.is_set():
+            slideshow_path = None
+            cancelled_images = len(shuffled_images)
+        else:
+            slideshow_path = None
+            conversion_errors = 1
+            errors_occurred = True
+    elif moved_images:
         logger.info(f"Starting parallel image-to-video conversion for {len(moved_images)} images using FFmpeg...")
+        img_video_count = 0
+        conversion_errors = 0
 
-        # Prepare the tasks
-        conversion_tasks = []
-        for img_path in moved_images:
-            base_name, _ = os.path.splitext(os.path.basename(img_path))
-            output_video_name = f"{base_name}.mp4"
-            output_video_path = os.path.join(folders_to_create["img_vids"], output_video_name)
-
-            # Skip if video already exists
-            if os.path.exists(output_video_path):
-                logger.warning(f"Output video already exists, skipping: {output_video_path}")
-                continue
-
-            conversion_tasks.append((img_path, output_video_path))
+        conversion_tasks = build_conversion_tasks(moved_images, folders_to_create["img_vids"])
 
         if not conversion_tasks:
              logger.info("No new images to convert.")
@@ -347,10 +949,6 @@ def main():
                 num_processes = max(1, multiprocessing.cpu_count() - 1)
             logger.info(f"Using {num_processes} parallel processes for FFmpeg video conversion")
 
-            # Process the images in parallel
-            img_video_count = 0
-            conversion_errors = 0
-
             # Show a progress dialog
             progress_window = tk.Toplevel(root)
             progress_window.title("Converting Images to Videos (FFmpeg)")
@@ -374,41 +972,138 @@ def main():
             # Update the UI
             progress_window.update()
 
-            # Process the images in parallel
-            with ProcessPoolExecutor(max_workers=num_processes) as executor:
-                # Submit all tasks
-                future_to_path = {executor.submit(process_image_to_video, task): task[0] for task in conversion_tasks}
+            output_for_image = dict(conversion_tasks)
+            conversion_start = time.time()
+            total_tasks = len(conversion_tasks)
+            completed_tasks = 0
+
+            # The pool is driven from a background thread with a bounded submission window; the Tk
+            # thread only drains the results queue on a timer, coalescing all completions since the last tick.
+            # Closing the window stops starting new conversions.
+            results_queue = queue.Queue()
+            cancel_event = threading.Event()
+            conversion_thread = threading.Thread(
+                target=run_conversions_in_background,
+                args=(conversion_tasks, num_processes, results_queue, cancel_event),
+                daemon=True
+            )
+            conversion_thread.start()
+            progress_window.protocol("WM_DELETE_WINDOW", lambda: request_cancel(progress_window, status_label, cancel_event))
 
-                # Process results as they complete
-                for i, future in enumerate(as_completed(future_to_path)):
+            def record_conversion(img_path, success):
+                nonlocal img_video_count, conversion_errors, errors_occurred, completed_tasks
+                completed_tasks += 1
+                if success:
+                    img_video_count += 1
+                    clip_durations[output_for_image[img_path]] = IMAGE_VIDEO_DURATION
+                else:
+                    conversion_errors += 1
+                    errors_occurred = True
+
+            def poll_conversion_results():
+                last_img_path = None
+                while True:
                     try:
-                        img_path, success = future.result()
-                        if success:
-                            img_video_count += 1
-                        else:
-                            conversion_errors += 1
-                            errors_occurred = True
-                    except Exception as exc:
-                         # Catch errors from the future itself (e.g., if the worker process died)
-                         logger.error(f"Error processing future for task {future_to_path[future]}: {exc}")
-                         conversion_errors += 1
-                         errors_occurred = True
-                         img_path = future_to_path[future] # Get path for status update
-
-                    # Update progress
-                    progress_percent = (i + 1) / len(conversion_tasks) * 100
-                    progress_var.set(progress_percent)
-                    progress_label.config(text=f"Converting {i+1}/{len(conversion_tasks)} images...")
-                    status_label.config(text=f"Processed: {os.path.basename(img_path)}")
-                    progress_window.update()
-
-            # Close progress window
-            progress_window.destroy()
+                        item = results_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None: # Sentinel: the background thread has finished
+                        progress_window.destroy()
+                        return
+                    record_conversion(*item)
+                    last_img_path = item[0]
+
+                try:
+                    if last_img_path is not None:
+                        # Update progress (with throughput and ETA over the whole batch)
+                        progress_percent = completed_tasks / total_tasks * 100
+                        elapsed = time.time() - conversion_start
+                        rate = completed_tasks / elapsed if elapsed > 0 else 0
+                        eta = (total_tasks - completed_tasks) / rate if rate > 0 else 0
+                        progress_var.set(progress_percent)
+                        progress_label.config(text=f"Converting {completed_tasks}/{total_tasks} images... ({rate:.2f} images/s, ETA {eta:.0f}s)")
+                        if not cancel_event.is_set():
+                            status_label.config(text=f"Processed: {os.path.basename(last_img_path)}")
+                    progress_window.after(PROGRESS_UPDATE_INTERVAL_MS, poll_conversion_results)
+                except tk.TclError:
+                    pass # The window was destroyed; the remaining results are collected below
+
+            progress_window.after(PROGRESS_UPDATE_INTERVAL_MS, poll_conversion_results)
+            # Runs the Tk event loop until poll_conversion_results destroys the window
+            progress_window.wait_window()
+            if conversion_thread.is_alive():
+                cancel_event.set() # The window went away without the conversions finishing
+            conversion_thread.join()
+            for item in drain_queue(results_queue):
+                if item is not None:
+                    record_conversion(*item)
+            cancelled_images = total_tasks - completed_tasks
     else:
         img_video_count = 0
         conversion_errors = 0
         logger.info("No images to convert to videos.")
 
+    try:
+        update_duration_cache(dest_base_path, clip_durations)
+    except Exception as e:
+        logger.warning(f"Could not update the clip duration cache: {e}")
+
+    preview_failures = 0
+    if GENERATE_PREVIEWS:
+        # Same pattern as the renders above: previews on a background thread, the Tk thread polls
+        progress_window = tk.Toplevel(root)
+        progress_window.title("Generating Previews (FFmpeg)")
+        progress_window.geometry("400x120")
+        progress_window.resizable(False, False)
+        progress_var = tk.DoubleVar()
+        progress_bar = tk.Scale(progress_window, variable=progress_var, orient="horizontal",
+                               length=350, from_=0, to=100, state="disabled")
+        progress_bar.pack(pady=10)
+        status_label = tk.Label(progress_window, text="Scanning clips...")
+        status_label.pack(pady=10)
+        progress_window.update()
+
+        results_queue = queue.Queue()
+        cancel_event = threading.Event()
+        preview_thread = threading.Thread(
+            target=run_previews_in_background, args=(dest_base_path, results_queue, cancel_event), daemon=True
+        )
+        preview_thread.start()
+        progress_window.protocol("WM_DELETE_WINDOW", lambda: request_cancel(progress_window, status_label, cancel_event))
+
+        def poll_preview_progress():
+            nonlocal preview_failures
+            progress = None
+            while True:
+                try:
+                    kind, value = results_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "done":
+                    preview_failures = value
+                    progress_window.destroy()
+                    return
+                progress = value
+            try:
+                if progress is not None:
+                    done, total = progress
+                    progress_var.set(done / total * 100)
+                    if not cancel_event.is_set():
+                        status_label.config(text=f"Previewed {done}/{total} clips...")
+                progress_window.after(PROGRESS_UPDATE_INTERVAL_MS, poll_preview_progress)
+            except tk.TclError:
+                pass # The window was destroyed; the result is collected below
+
+        progress_window.after(PROGRESS_UPDATE_INTERVAL_MS, poll_preview_progress)
+        progress_window.wait_window()
+        if preview_thread.is_alive():
+            cancel_event.set()
+        preview_thread.join()
+        for kind, value in drain_queue(results_queue):
+            if kind == "done":
+                preview_failures = value
+        errors_occurred = errors_occurred or preview_failures > 0
+
     end_time = time.time()
     duration_secs = end_time - start_time
 
@@ -419,9 +1114,18 @@ def main():
         f"Videos created from images: {img_video_count}\n"
     )
 
+    if slideshow_path:
+        completion_message += f"Slideshow compilation: {os.path.basename(slideshow_path)}\n"
+
     if conversion_errors > 0:
         completion_message += f"Failed conversions: {conversion_errors}\n\n"
 
+    if cancelled_images > 0:
+        completion_message += f"Rendering cancelled: {cancelled_images} image(s) in {folders_to_create['images']} were not rendered.\n\n"
+
+    if preview_failures > 0:
+        completion_message += f"Failed previews: {preview_failures}\n\n"
+
     completion_message += (
         f"Results saved in:\n{dest_base_path}\n\n"
         f"Total time: {duration_secs:.2f} seconds."
@@ -439,13 +1143,34 @@ def main():
 if __name__ == "__main__":
     # Ensure multiprocessing works correctly when packaged (e.g., with PyInstaller)
     multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="Organize media into duration buckets and render images to Ken Burns clips.")
+    parser.add_argument("--watch", nargs="+", metavar="SOURCE_FOLDER",
+                        help="Run headless: watch these folders and ingest new media continuously")
+    parser.add_argument("--project", help="Project folder name inside WORKING (required with --watch)")
+    parser.add_argument("--ffmpeg-metrics", metavar="PATH",
+                        help="Append FFmpeg progress/throughput records of all renders to this JSON-lines file")
+    args = parser.parse_args()
+    if args.watch and not args.project:
+        parser.error("--project is required with --watch")
+    if args.ffmpeg_metrics:
+        enable_metrics(args.ffmpeg_metrics)
+
+    log_listener = setup_logging()
     try:
-        main()
+        if args.watch:
+            from watch_daemon import run_daemon
+            run_daemon(args.watch, args.project, log_queue=_log_queue)
+        else:
+            main()
     except Exception as e:
+        from tkinter import messagebox
         # Catch potential critical errors like FFmpeg not found after the initial check
         if isinstance(e, FileNotFoundError):
              logger.critical(f"FFmpeg command failed during execution. Ensure it's correctly installed and in PATH.")
              messagebox.showerror("Critical Error", f"FFmpeg failed during execution. Please check installation and PATH.\nError: {e}")
         else:
              logger.critical(f"An unexpected critical error occurred: {e}\n{traceback.format_exc()}")
-             messagebox.showerror("Critical Error", f"A critical error occurred:\n{e}\n\nPlease check 'media_organizer.log'.")
\ No newline at end of file
+             messagebox.showerror("Critical Error", f"A critical error occurred:\n{e}\n\nPlease check 'media_organizer.log'.")
+    finally:
+        log_listener.stop()
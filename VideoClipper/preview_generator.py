@@ -0,0 +1,276 @@
+"""Review previews (proxy + contact sheet) for the clips of an organized project.
+
+Each clip is decoded once: the split filter feeds the decoded frames to two outputs, a small
+low-resolution proxy (H.264, scrubs instantly) and a contact sheet (a grid of frames sampled evenly
+over the whole clip). The renders run in parallel below normal CPU priority and are stored in the
+project's _previews folder under the clip's content hash, so unchanged clips are never rendered
+twice, even after being renamed or moved to another bucket. _previews/index.html lists the sheets
+of every bucket, each linked to its proxy.
+"""
+# tkinter is imported where it is used: run_jobs imports this module for headless batch jobs
+import hashlib
+import html
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# The helpers shared with VideoTools (mediacommon/) live at the repo root
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_DIR not in sys.path:
+    sys.path.append(_REPO_DIR)
+from duration_cache import get_cached_durations
+from mediacommon.ffmpeg_progress import run_ffmpeg
+from mediacommon.smart_trim import probe_media
+
+# --- Configuration ---
+PREVIEW_SUBDIR = "_previews"
+PREVIEW_BUCKETS = ("01_IMAGES_VIDS", "02_VIDS_10s", "03_VIDS_20s", "04_VIDS_30s", "05_VIDS_LONG")
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv')
+PROXY_HEIGHT = 360
+PROXY_PRESET = "veryfast"
+PROXY_CRF = 30
+SHEET_COLUMNS = 4
+SHEET_ROWS = 4
+SHEET_TILE_WIDTH = 320
+# Number of clips rendered in parallel (0 = auto). The renders run at low priority, so they yield to interactive work.
+PREVIEW_WORKERS = 0
+# {clip path relative to the project: size, mtime_ns, content hash}, so unchanged clips are not re-hashed
+HASH_INDEX_FILENAME = "content_hashes.json"
+INDEX_HTML_FILENAME = "index.html"
+
+_HASH_CHUNK_SIZE = 4 * 1024 ** 2
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(log_file="preview_generator.log"):
+    """Logs to the console and log_file (called when run as a script, not at import)."""
+    log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    log_handler_file = logging.FileHandler(log_file, mode='a')
+    log_handler_file.setFormatter(log_formatter)
+    log_handler_console = logging.StreamHandler()
+    log_handler_console.setFormatter(log_formatter)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(log_handler_file)
+    root_logger.addHandler(log_handler_console)
+
+
+def content_hash(path):
+    """BLAKE2b digest (hex, 32 chars) of the file contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_hash_index(preview_folder):
+    """Loads the content hash index ({} if missing or unreadable)."""
+    index_path = os.path.join(preview_folder, HASH_INDEX_FILENAME)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read preview hash index {index_path}: {e}")
+        return {}
+
+
+def save_hash_index(preview_folder, index):
+    index_path = os.path.join(preview_folder, HASH_INDEX_FILENAME)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, index_path)
+
+
+def preview_paths(preview_folder, digest):
+    """(proxy path, contact sheet path) of the clip with the given content hash."""
+    return (os.path.join(preview_folder, f"{digest}_proxy.mp4"),
+            os.path.join(preview_folder, f"{digest}_sheet.jpg"))
+
+
+def build_preview_command(clip_path, duration, proxy_path, sheet_path):
+    """FFmpeg command rendering the proxy and the contact sheet from a single decode of clip_path."""
+    frames = SHEET_COLUMNS * SHEET_ROWS
+    # Sample the sheet frames evenly over the clip; fps gets a rate, so guard against zero/unknown durations
+    sample_rate = frames / max(duration or 0.0, 0.1)
+    filter_graph = (
+        f"[0:v]split=2[proxy_in][sheet_in];"
+        f"[proxy_in]scale=-2:{PROXY_HEIGHT},format=yuv420p[proxy];"
+        f"[sheet_in]fps={sample_rate:.6f},scale={SHEET_TILE_WIDTH}:-2,tile={SHEET_COLUMNS}x{SHEET_ROWS}[sheet]"
+    )
+    return [
+        'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error',
+        '-i', clip_path,
+        '-filter_complex', filter_graph,
+        '-map', '[proxy]', '-map', '0:a?',
+        '-c:v', 'libx264', '-preset', PROXY_PRESET, '-crf', str(PROXY_CRF),
+        '-c:a', 'aac', '-b:a', '64k', '-ac', '2',
+        '-movflags', '+faststart', '-f', 'mp4', proxy_path,
+        '-map', '[sheet]', '-frames:v', '1', '-q:v', '4', '-f', 'image2', sheet_path,
+    ]
+
+
+def render_preview(clip_path, digest, duration, preview_folder):
+    """Renders the proxy and sheet of one clip unless they are cached. Returns "cached" or "rendered"; raises RuntimeError."""
+    proxy_path, sheet_path = preview_paths(preview_folder, digest)
+    if os.path.exists(proxy_path) and os.path.exists(sheet_path):
+        return "cached"
+    if duration is None:
+        duration = probe_media(clip_path)[0]
+
+    # Render under temporary names so an interrupted run never leaves a truncated preview in the cache
+    proxy_part, sheet_part = proxy_path + ".part", sheet_path + ".part"
+    cmd = build_preview_command(clip_path, duration, proxy_part, sheet_part)
+    try:
+        returncode, stderr_tail = run_ffmpeg(cmd, label=f"preview {os.path.basename(clip_path)}",
+                                             total_duration=duration, low_priority=True)
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr_tail}")
+        os.replace(sheet_part, sheet_path)
+        os.replace(proxy_part, proxy_path)
+    finally:
+        for part in (proxy_part, sheet_part):
+            if os.path.exists(part):
+                os.remove(part)
+    return "rendered"
+
+
+def write_index_html(preview_folder, clips_by_bucket):
+    """Writes index.html with one section per bucket: each clip's contact sheet, linked to its proxy."""
+    sections = []
+    for bucket, clips in clips_by_bucket.items():
+        figures = []
+        for name, digest in clips:
+            proxy_path, sheet_path = preview_paths(preview_folder, digest)
+            if not os.path.exists(sheet_path):
+                continue
+            figures.append(
+                f'<figure><a href="{os.path.basename(proxy_path)}"><img src="{os.path.basename(sheet_path)}" '
+                f'loading="lazy" width="{SHEET_TILE_WIDTH}"></a><figcaption>{html.escape(name)}</figcaption></figure>'
+            )
+        sections.append(f"<h2>{html.escape(bucket)} ({len(figures)} clips)</h2>\n" + "\n".join(figures))
+    page = (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Project previews</title>\n"
+        "<style>figure{display:inline-block;margin:6px;font:12px sans-serif}</style></head><body>\n"
+        + "\n".join(sections) + "\n</body></html>\n"
+    )
+    with open(os.path.join(preview_folder, INDEX_HTML_FILENAME), "w", encoding="utf-8") as f:
+        f.write(page)
+
+
+def generate_project_previews(project_folder, buckets=PREVIEW_BUCKETS, max_workers=PREVIEW_WORKERS,
+                              on_progress=None, cancel_event=None):
+    """Creates (or reuses) the previews of every clip in the project's buckets and writes the index page.
+
+    on_progress(clips done, total clips) is called after each clip. Once cancel_event is set, clips that
+    have not started yet are skipped (they are neither counted nor listed on the index page).
+    Returns (number rendered, number reused from the cache, number failed).
+    """
+    preview_folder = os.path.join(project_folder, PREVIEW_SUBDIR)
+    os.makedirs(preview_folder, exist_ok=True)
+    hash_index = load_hash_index(preview_folder)
+
+    clips = [] # (bucket, clip path, stat result, cached duration or None)
+    for bucket in buckets:
+        folder = os.path.join(project_folder, bucket)
+        if not os.path.isdir(folder):
+            continue
+        durations = get_cached_durations(project_folder, bucket)
+        with os.scandir(folder) as entries:
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS):
+                    clips.append((bucket, entry.path, entry.stat(), durations.get(entry.path)))
+    logger.info(f"Generating previews for {len(clips)} clips in {project_folder}")
+
+    # Identical clips share one preview; render each content hash only once
+    digest_locks = {}
+    digest_locks_guard = threading.Lock()
+
+    def process(clip):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        bucket, path, st, duration = clip
+        rel_path = os.path.relpath(path, project_folder).replace("\\", "/")
+        record = hash_index.get(rel_path)
+        if record and record.get("size") == st.st_size and record.get("mtime_ns") == st.st_mtime_ns:
+            digest = record["hash"]
+        else:
+            digest = content_hash(path)
+        with digest_locks_guard:
+            digest_lock = digest_locks.setdefault(digest, threading.Lock())
+        with digest_lock:
+            return rel_path, digest, render_preview(path, digest, duration, preview_folder)
+
+    num_workers = max_workers if max_workers > 0 else max(1, multiprocessing.cpu_count() // 2)
+    counts = {"rendered": 0, "cached": 0}
+    failures = 0
+    new_index = {}
+    clips_by_bucket = {bucket: [] for bucket in buckets}
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        future_to_clip = {executor.submit(process, clip): clip for clip in clips}
+        for done, future in enumerate(as_completed(future_to_clip), start=1):
+            if on_progress:
+                on_progress(done, len(clips))
+            bucket, path, st, _ = future_to_clip[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Preview failed for {path}: {e}")
+                failures += 1
+                continue
+            if result is None:
+                continue # Skipped after a cancel
+            rel_path, digest, status = result
+            counts[status] += 1
+            new_index[rel_path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+            clips_by_bucket[bucket].append((os.path.basename(path), digest))
+
+    # Entries for clips that no longer exist are dropped; their previews stay reusable by content hash
+    save_hash_index(preview_folder, new_index)
+    for bucket_clips in clips_by_bucket.values():
+        bucket_clips.sort()
+    write_index_html(preview_folder, clips_by_bucket)
+    logger.info(f"Previews: {counts['rendered']} rendered, {counts['cached']} cached, {failures} failed")
+    return counts["rendered"], counts["cached"], failures
+
+
+def main():
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
+    root = tk.Tk()
+    root.withdraw()
+
+    project_folder = filedialog.askdirectory(title="Select Project Folder Containing '01_IMAGES_VIDS', '02_VIDS_10s', ...")
+    if not project_folder:
+        messagebox.showinfo("Cancelled", "Operation cancelled.")
+        return
+
+    start_time = time.time()
+    rendered, cached, failures = generate_project_previews(project_folder)
+    duration_secs = time.time() - start_time
+
+    message = (f"Rendered {rendered} preview(s), reused {cached} from the cache.\n\n"
+               f"Open {os.path.join(project_folder, PREVIEW_SUBDIR, INDEX_HTML_FILENAME)} to review.\n\n"
+               f"Total time: {duration_secs:.2f} seconds.")
+    if failures:
+        messagebox.showwarning("Completed with Errors", message + f"\n\n{failures} clip(s) failed. Check 'preview_generator.log'.")
+    else:
+        messagebox.showinfo("Success", message)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
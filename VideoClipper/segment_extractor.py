@@ -0,0 +1,131 @@
+# tkinter is imported where it is used: run_jobs imports this module for headless batch jobs
+import os
+import sys
+import logging
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# The helpers shared with VideoTools (mediacommon/) live at the repo root
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_DIR not in sys.path:
+    sys.path.append(_REPO_DIR)
+from duration_cache import update_duration_cache
+from mediacommon.smart_trim import extract_segments
+
+# --- Configuration ---
+SOURCE_SUBFOLDER = "05_VIDS_LONG"
+# Bucket that receives the segments for each supported segment length
+SEGMENT_BUCKETS = {
+    10: "02_VIDS_10s",
+    20: "03_VIDS_20s",
+    30: "04_VIDS_30s",
+}
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv')
+# Maximum number of segments carved from each long video (None = as many as fit)
+MAX_SEGMENTS_PER_VIDEO = None
+# Number of videos processed in parallel (0 = auto). Most of the work is stream copy, so this is I/O bound.
+PARALLEL_FILES = 0
+
+# --- Logging Setup ---
+logger = logging.getLogger()
+
+def setup_logging(log_file="segment_extractor.log"):
+    """Logs to the console and log_file (called when run as a script, not at import)."""
+    log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    log_handler_file = logging.FileHandler(log_file, mode='a')
+    log_handler_file.setFormatter(log_formatter)
+    log_handler_console = logging.StreamHandler()
+    log_handler_console.setFormatter(log_formatter)
+
+    logger.setLevel(logging.INFO)
+    # Clear existing handlers to avoid duplicates
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(log_handler_file)
+    logger.addHandler(log_handler_console)
+
+# --- Main Logic ---
+
+def extract_project_segments(project_folder, segment_length, max_segments=MAX_SEGMENTS_PER_VIDEO):
+    """Carves segment_length-second clips from every video in 05_VIDS_LONG into the matching bucket.
+
+    Returns (number of clips created, number of source videos that failed). A video fails if it
+    cannot be read or if any of its cuts fails (the cuts that succeeded are kept).
+    """
+    source_folder = os.path.join(project_folder, SOURCE_SUBFOLDER)
+    output_folder = os.path.join(project_folder, SEGMENT_BUCKETS[segment_length])
+    os.makedirs(output_folder, exist_ok=True)
+
+    with os.scandir(source_folder) as entries:
+        videos = sorted(e.path for e in entries if e.is_file() and e.name.lower().endswith(VIDEO_EXTENSIONS))
+    logger.info(f"Extracting {segment_length}s segments from {len(videos)} videos in {source_folder}")
+
+    num_workers = PARALLEL_FILES if PARALLEL_FILES > 0 else max(1, multiprocessing.cpu_count() // 2)
+    created = {}
+    failures = 0
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        future_to_path = {
+            executor.submit(extract_segments, path, output_folder, segment_length, max_segments): path
+            for path in videos
+        }
+        for future in as_completed(future_to_path):
+            try:
+                segments, failed_cuts = future.result()
+                created.update(segments)
+                logger.info(f"{os.path.basename(future_to_path[future])}: {len(segments)} segment(s)")
+                if failed_cuts:
+                    logger.error(f"{len(failed_cuts)} segment(s) of {future_to_path[future]} could not be cut: "
+                                 + ", ".join(f"{start:.2f}-{end:.2f}s" for start, end in failed_cuts))
+                    failures += 1
+            except Exception as e:
+                logger.error(f"Segment extraction failed for {future_to_path[future]}: {e}")
+                failures += 1
+
+    # The segments land in the organizer's buckets, so make them available to the compilation builder
+    try:
+        update_duration_cache(project_folder, created)
+    except Exception as e:
+        logger.warning(f"Could not update the clip duration cache: {e}")
+    return len(created), failures
+
+
+def main():
+    import tkinter as tk
+    from tkinter import filedialog, simpledialog, messagebox
+
+    root = tk.Tk()
+    root.withdraw()
+
+    project_folder = filedialog.askdirectory(title=f"Select Project Folder Containing '{SOURCE_SUBFOLDER}'")
+    if not project_folder:
+        messagebox.showinfo("Cancelled", "Operation cancelled.")
+        return
+    if not os.path.isdir(os.path.join(project_folder, SOURCE_SUBFOLDER)):
+        messagebox.showerror("Error", f"The required subfolder '{SOURCE_SUBFOLDER}' was not found in the selected directory.")
+        return
+
+    lengths = ", ".join(str(length) for length in SEGMENT_BUCKETS)
+    segment_length = simpledialog.askinteger("Segment Length", f"Segment length in seconds ({lengths}):", parent=root)
+    if segment_length is None:
+        messagebox.showinfo("Cancelled", "Operation cancelled.")
+        return
+    if segment_length not in SEGMENT_BUCKETS:
+        messagebox.showerror("Error", f"Unsupported segment length: {segment_length}. Choose one of: {lengths}.")
+        return
+
+    start_time = time.time()
+    created, failures = extract_project_segments(project_folder, segment_length)
+    duration_secs = time.time() - start_time
+
+    message = (f"Created {created} segment(s) of {segment_length}s in '{SEGMENT_BUCKETS[segment_length]}'.\n\n"
+               f"Total time: {duration_secs:.2f} seconds.")
+    if failures:
+        messagebox.showwarning("Completed with Errors", message + f"\n\n{failures} video(s) failed. Check 'segment_extractor.log'.")
+    else:
+        messagebox.showinfo("Success", message)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
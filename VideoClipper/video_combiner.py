@@ -1,36 +1,67 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
+# tkinter is imported where it is used: run_jobs imports this module for headless batch jobs
+import argparse
+import json
 import os
+import sys
 import random
-import shutil
 import subprocess
 import re
 import logging
 import time
 
+# The helpers shared with VideoTools (mediacommon/) live at the repo root
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_DIR not in sys.path:
+    sys.path.append(_REPO_DIR)
+from duration_cache import get_cached_durations
+from file_placement import place_files
+from mediacommon.ffmpeg_progress import FFmpegCancelled, run_ffmpeg, format_snapshot
+from mediacommon.stream_compat import prepare_clips_for_concat, cleanup_normalized
+
 # --- Configuration ---
 TARGET_SUBFOLDER = "01_IMAGES_VIDS"
 OUTPUT_PREFIX = "combined_video_"
 OUTPUT_EXTENSION = ".mp4"
 TEMP_RENAME_DIR = "temp_rename_combiner"
 FFMPEG_CONCAT_LIST_FILE = "ffmpeg_concat_list.txt"
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv')
+# Shuffle seed for the playlist (None = pick a new random seed each run; it is recorded in the manifest)
+SHUFFLE_SEED = None
+# Physically rename the clips to 001.ext, 002.ext, ... in playlist order (old behaviour, opt-in)
+RENAME_FILES = False
+PLAYLIST_MANIFEST_EXTENSION = ".playlist.json"
+# Probe all clips before the `-c copy` concat and re-encode only those that differ from the majority profile.
+# Off by default: probing every clip delays the start of the concat on large folders; turn it on for
+# folders with mixed sources (the organizer's own renders already share one profile)
+NORMALIZE_BEFORE_CONCAT = False
+
+# Message boxes for errors in the helper functions (batch jobs turn them off and rely on the log/result)
+SHOW_DIALOGS = True
 
 # --- Logging Setup ---
-log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-# Use a different log file for this script
-log_handler_file = logging.FileHandler("video_combiner.log", mode='a') 
-log_handler_file.setFormatter(log_formatter)
-log_handler_console = logging.StreamHandler()
-log_handler_console.setFormatter(log_formatter)
-
-logger = logging.getLogger(__name__) # Use specific logger name
-logger.setLevel(logging.INFO)
-# Clear existing handlers to avoid duplicates if script is run multiple times in same session
-if logger.handlers:
-    for handler in logger.handlers:
+# Configure the root logger so messages from the helper modules (mediacommon, ...) are captured too
+logger = logging.getLogger()
+
+def setup_logging(log_file="video_combiner.log"):
+    """Logs to the console and log_file (called by the GUI entry points, not at import)."""
+    log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    log_handler_file = logging.FileHandler(log_file, mode='a')
+    log_handler_file.setFormatter(log_formatter)
+    log_handler_console = logging.StreamHandler()
+    log_handler_console.setFormatter(log_formatter)
+
+    logger.setLevel(logging.INFO)
+    # Clear existing handlers to avoid duplicates if script is run multiple times in same session
+    for handler in list(logger.handlers):
         logger.removeHandler(handler)
-logger.addHandler(log_handler_file)
-logger.addHandler(log_handler_console)
+    logger.addHandler(log_handler_file)
+    logger.addHandler(log_handler_console)
+
+def show_message(kind, title, message):
+    """Shows a message box (kind: 'info', 'warning' or 'error') unless SHOW_DIALOGS is off."""
+    if SHOW_DIALOGS:
+        from tkinter import messagebox
+        getattr(messagebox, f"show{kind}")(title, message)
 
 # --- Helper Functions ---
 
@@ -42,26 +73,80 @@ def check_ffmpeg():
         return True
     except (FileNotFoundError, subprocess.CalledProcessError):
         logger.critical("FFmpeg command not found or failed to execute.")
-        messagebox.showerror("Error", "FFmpeg not found. Please install FFmpeg and ensure it's in your system's PATH.")
+        show_message("error", "Error", "FFmpeg not found. Please install FFmpeg and ensure it's in your system's PATH.")
         return False
 
-def randomize_and_rename_videos(target_folder):
-    """Randomizes and renames video files within the target folder."""
+def list_video_files(target_folder):
+    """Returns the sorted names of the video files directly inside target_folder."""
+    with os.scandir(target_folder) as entries:
+        return sorted(
+            entry.name for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS)
+        )
+
+def shuffle_files(files, seed):
+    """Returns a new list with the files shuffled reproducibly for the given seed."""
+    shuffled = list(files)
+    random.Random(seed).shuffle(shuffled)
+    return shuffled
+
+def build_shuffled_playlist(target_folder, seed=None):
+    """Builds a seeded, shuffled playlist of the videos in target_folder without touching the files.
+
+    Returns (seed, list of full paths), or (seed, None) if the folder could not be read.
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    logger.info(f"Building shuffled playlist for {target_folder} (seed: {seed})")
+    try:
+        files = list_video_files(target_folder)
+    except Exception as e:
+        logger.error(f"Error reading target folder {target_folder}: {e}")
+        show_message("error", "Error", f"Could not read files from '{TARGET_SUBFOLDER}'.\nError: {e}")
+        return seed, None
+
+    if not files:
+        logger.warning(f"No video files found in {target_folder}.")
+        show_message("warning", "Warning", f"No video files found in '{TARGET_SUBFOLDER}'.")
+        return seed, []
+
+    playlist = [os.path.join(target_folder, f) for f in shuffle_files(files, seed)]
+    logger.info(f"Playlist contains {len(playlist)} videos.")
+    return seed, playlist
+
+def write_playlist_manifest(manifest_path, seed, playlist, target_folder):
+    """Writes the playlist manifest so a compilation can be reproduced or audited later."""
+    manifest = {
+        "seed": seed,
+        "source_folder": target_folder,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "files": [os.path.relpath(path, target_folder) for path in playlist],
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Wrote playlist manifest: {manifest_path}")
+
+def load_playlist_manifest(manifest_path):
+    """Loads a playlist manifest and returns (seed, list of full paths, source folder)."""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    target_folder = manifest["source_folder"]
+    return manifest["seed"], [os.path.join(target_folder, name) for name in manifest["files"]], target_folder
+
+def randomize_and_rename_videos(target_folder, seed=None):
+    """Randomizes and renames video files within the target folder (opt-in, see RENAME_FILES)."""
     logger.info(f"Starting randomization and renaming in: {target_folder}")
-    
-    # Get video files (assuming common video extensions)
-    video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv')
+
     try:
-        files = [f for f in os.listdir(target_folder) 
-                 if os.path.isfile(os.path.join(target_folder, f)) and f.lower().endswith(video_extensions)]
+        files = list_video_files(target_folder)
     except Exception as e:
         logger.error(f"Error reading target folder {target_folder}: {e}")
-        messagebox.showerror("Error", f"Could not read files from '{TARGET_SUBFOLDER}'.\nError: {e}")
+        show_message("error", "Error", f"Could not read files from '{TARGET_SUBFOLDER}'.\nError: {e}")
         return None # Indicate failure
 
     if not files:
         logger.warning(f"No video files found in {target_folder}.")
-        messagebox.showwarning("Warning", f"No video files found in '{TARGET_SUBFOLDER}'.")
+        show_message("warning", "Warning", f"No video files found in '{TARGET_SUBFOLDER}'.")
         return [] # Return empty list, maybe concatenation shouldn't proceed
 
     # Create temp directory inside the target folder
@@ -70,50 +155,36 @@ def randomize_and_rename_videos(target_folder):
         os.makedirs(temp_dir, exist_ok=True)
     except Exception as e:
         logger.error(f"Error creating temp directory {temp_dir}: {e}")
-        messagebox.showerror("Error", f"Could not create temporary directory.\nError: {e}")
+        show_message("error", "Error", f"Could not create temporary directory.\nError: {e}")
         return None
 
     # Move all files to temp directory first
     logger.info(f"Moving {len(files)} files to temporary directory: {temp_dir}")
-    for filename in files:
-        try:
-            shutil.move(
-                os.path.join(target_folder, filename),
-                os.path.join(temp_dir, filename)
-            )
-        except Exception as e:
-            logger.error(f"Error moving {filename} to temp directory: {e}")
-            messagebox.showerror("Error", f"Error moving files for renaming.\nError: {e}")
-            # Attempt cleanup? Maybe too risky.
-            return None
-            
-    # Shuffle the files randomly
-    random.shuffle(files)
+    placed = place_files([(os.path.join(target_folder, f), os.path.join(temp_dir, f)) for f in files])
+    failed = [f for f in files if not placed[os.path.join(target_folder, f)]]
+    if failed:
+        logger.error(f"Error moving {len(failed)} file(s) to temp directory, e.g. {failed[0]}")
+        show_message("error", "Error", f"Error moving files for renaming ({len(failed)} failed). Check the log.")
+        # Attempt cleanup? Maybe too risky.
+        return None
+
+    # Shuffle the files (reproducible when a seed is given)
+    files = shuffle_files(files, seed)
     logger.info("Shuffled file order.")
 
-    renamed_files_paths = []
-    # Rename files with sequential numbers and move back
+    # Rename files with sequential numbers (3-digit, original extension) and move back
     logger.info("Renaming and moving files back...")
-    for i, filename in enumerate(files, start=1):
-        # Get file extension
-        _ , ext = os.path.splitext(filename)
-        
-        # Create new filename with 3-digit number
-        new_name = f"{i:03d}{ext}"
-        
-        # Construct paths
-        old_path = os.path.join(temp_dir, filename)
-        new_path = os.path.join(target_folder, new_name)
-        
-        # Rename the file by moving
-        try:
-            shutil.move(old_path, new_path)
-            logger.debug(f"Renamed: {filename} -> {new_name}")
-            renamed_files_paths.append(new_path) # Store full path of renamed file
-        except Exception as e:
-            logger.error(f"Error renaming {filename} to {new_name}: {e}")
-            messagebox.showerror("Error", f"Error renaming file '{filename}'.\nError: {e}")
-            return None # Indicate failure
+    renames = [
+        (os.path.join(temp_dir, filename), os.path.join(target_folder, f"{i:03d}{os.path.splitext(filename)[1]}"))
+        for i, filename in enumerate(files, start=1)
+    ]
+    placed = place_files(renames)
+    renamed_files_paths = [new_path for old_path, new_path in renames if placed[old_path]]
+    if len(renamed_files_paths) != len(renames):
+        failed = len(renames) - len(renamed_files_paths)
+        logger.error(f"Error renaming {failed} file(s); they are still in {temp_dir}")
+        show_message("error", "Error", f"Error renaming {failed} file(s). They are still in '{TEMP_RENAME_DIR}'.")
+        return None # Indicate failure
 
     # Remove temp directory
     try:
@@ -141,7 +212,7 @@ def get_next_output_filename(output_folder):
                     found = True
     except Exception as e:
         logger.error(f"Error scanning output folder {output_folder}: {e}")
-        messagebox.showerror("Error", f"Could not scan output folder for existing files.\nError: {e}")
+        show_message("error", "Error", f"Could not scan output folder for existing files.\nError: {e}")
         return None
 
     next_num = max_num + 1
@@ -150,8 +221,14 @@ def get_next_output_filename(output_folder):
     logger.info(f"Next output filename determined as: {output_path}")
     return output_path
 
-def concatenate_videos(video_files, output_path):
-    """Concatenates a list of video files using FFmpeg concat demuxer."""
+def concatenate_videos(video_files, output_path, normalize=NORMALIZE_BEFORE_CONCAT, total_duration=None, on_progress=None,
+                       signatures=None):
+    """Concatenates a list of video files using FFmpeg concat demuxer.
+
+    total_duration (seconds, if known) enables percent/ETA reporting; on_progress receives each
+    FFmpeg progress snapshot (see mediacommon.ffmpeg_progress.run_ffmpeg). signatures are the known
+    stream signatures of the clips, passed to the normalize pre-flight so it does not probe them again.
+    """
     if not video_files:
         logger.warning("No video files provided for concatenation.")
         return False
@@ -160,8 +237,18 @@ def concatenate_videos(video_files, output_path):
     
     # Create the temporary list file in the same directory as the output for simplicity
     list_file_path = os.path.join(os.path.dirname(output_path), FFMPEG_CONCAT_LIST_FILE)
+    normalized_dir = None
     
     try:
+        # Pre-flight: make sure the clips can be joined with stream copy
+        if normalize:
+            video_files, normalized_dir = prepare_clips_for_concat(
+                video_files, os.path.dirname(output_path), signatures=signatures
+            )
+            if video_files is None:
+                show_message("error", "Error", "Some clips could not be probed or normalized for concatenation.\nCheck logs for details.")
+                return False
+
         with open(list_file_path, 'w') as f:
             for video_path in video_files:
                 # FFmpeg requires forward slashes and proper escaping
@@ -182,31 +269,31 @@ def concatenate_videos(video_files, output_path):
 
         logger.info(f"Running FFmpeg concatenation: {' '.join(cmd)}")
 
-        # Run the command
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+        # Run the command, reporting progress from FFmpeg's -progress output
+        returncode, stderr_tail = run_ffmpeg(
+            cmd, label=os.path.basename(output_path), total_duration=total_duration, on_progress=on_progress
         )
-        stdout, stderr = process.communicate()
-
-        if process.returncode != 0:
-            logger.error(f"FFmpeg concatenation failed. Return code: {process.returncode}")
-            logger.error(f"FFmpeg stderr:\n{stderr.decode(errors='ignore')}")
-            if stdout:
-                 logger.error(f"FFmpeg stdout:\n{stdout.decode(errors='ignore')}")
-            messagebox.showerror("Error", f"FFmpeg failed during video concatenation.\nCheck logs for details.")
+
+        if returncode != 0:
+            logger.error(f"FFmpeg concatenation failed. Return code: {returncode}")
+            logger.error(f"FFmpeg stderr:\n{stderr_tail}")
+            show_message("error", "Error", f"FFmpeg failed during video concatenation.\nCheck logs for details.")
             return False
         else:
             logger.info(f"Successfully concatenated videos to: {output_path}")
             return True
 
+    except FFmpegCancelled:
+        logger.warning(f"Concatenation cancelled: {output_path}")
+        if os.path.exists(output_path):
+            os.remove(output_path) # Partly written by the killed FFmpeg
+        raise
     except Exception as e:
         logger.error(f"Error during video concatenation process: {e}")
-        messagebox.showerror("Error", f"An error occurred during concatenation.\nError: {e}")
+        show_message("error", "Error", f"An error occurred during concatenation.\nError: {e}")
         return False
     finally:
+        cleanup_normalized(normalized_dir)
         # Clean up the temporary list file
         if os.path.exists(list_file_path):
             try:
@@ -215,9 +302,64 @@ def concatenate_videos(video_files, output_path):
             except Exception as e:
                 logger.warning(f"Could not remove temporary list file {list_file_path}: {e}")
 
+def get_playlist_duration(root_folder, video_paths):
+    """Sums the cached durations of the playlist clips, or returns None if any clip is not cached."""
+    durations = {}
+    for folder in {os.path.dirname(path) for path in video_paths}:
+        durations.update(get_cached_durations(root_folder, os.path.relpath(folder, root_folder).replace("\\", "/")))
+    if not all(path in durations for path in video_paths):
+        return None
+    return sum(durations[path] for path in video_paths)
+
+def create_progress_window(root, title):
+    """Shows a small progress window and returns (window, callback for FFmpeg progress snapshots).
+
+    The callback keeps the window responsive. Once the window has been closed it raises FFmpegCancelled,
+    which stops FFmpeg; concatenate_videos passes that on to the caller.
+    """
+    import tkinter as tk
+    window = tk.Toplevel(root)
+    window.title(title)
+    window.geometry("400x120")
+    window.resizable(False, False)
+    progress_var = tk.DoubleVar()
+    progress_bar = tk.Scale(window, variable=progress_var, orient="horizontal",
+                            length=350, from_=0, to=100, state="disabled")
+    progress_bar.pack(pady=10)
+    status_label = tk.Label(window, text="Starting FFmpeg...")
+    status_label.pack(pady=10)
+    closed = False
+
+    def on_close():
+        nonlocal closed
+        closed = True
+        window.destroy()
+
+    window.protocol("WM_DELETE_WINDOW", on_close)
+    window.update()
+
+    def on_progress(snapshot):
+        nonlocal closed
+        if not closed:
+            try:
+                if snapshot["percent"] is not None:
+                    progress_var.set(snapshot["percent"])
+                status_label.config(text=format_snapshot(snapshot))
+                window.update() # May run on_close
+            except tk.TclError:
+                closed = True # The window was destroyed some other way
+        if closed:
+            raise FFmpegCancelled()
+
+    return window, on_progress
+
 # --- Main Logic ---
 
-def main():
+def main(manifest_path=None):
+    """Shuffles and combines the clips of a selected folder, or rebuilds the compilation of manifest_path."""
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+
     if not check_ffmpeg():
         return # Exit if FFmpeg is not available
 
@@ -225,34 +367,54 @@ def main():
     root.withdraw()  # Hide the main tkinter window
 
     logger.info("Video Combiner Script started.")
-
-    # 1. Select Root Folder
-    root_folder = filedialog.askdirectory(title="Select Root Folder Containing '01_IMAGES_VIDS'")
-    if not root_folder:
-        messagebox.showinfo("Cancelled", "Operation cancelled.")
-        logger.info("Operation cancelled by user (folder selection).")
-        return
-    logger.info(f"Selected root folder: {root_folder}")
-
-    # 2. Verify and get target subfolder path
-    target_folder_path = os.path.join(root_folder, TARGET_SUBFOLDER)
-    if not os.path.isdir(target_folder_path):
-        logger.error(f"Target subfolder '{TARGET_SUBFOLDER}' not found in '{root_folder}'.")
-        messagebox.showerror("Error", f"The required subfolder '{TARGET_SUBFOLDER}' was not found in the selected directory.")
-        return
-    logger.info(f"Found target subfolder: {target_folder_path}")
-
-    # 3. Randomize and Rename files in the target subfolder
     start_time = time.time()
-    renamed_video_paths = randomize_and_rename_videos(target_folder_path)
 
-    if renamed_video_paths is None:
-        logger.error("Renaming process failed. Aborting concatenation.")
+    if manifest_path:
+        # 1-3. Rebuild a previous compilation: same clips in the same order, output next to the manifest
+        try:
+            seed, video_paths, target_folder_path = load_playlist_manifest(manifest_path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Could not read playlist manifest {manifest_path}: {e}")
+            messagebox.showerror("Error", f"Could not read the playlist manifest.\nError: {e}")
+            return
+        root_folder = os.path.dirname(os.path.abspath(manifest_path))
+        missing = [path for path in video_paths if not os.path.isfile(path)]
+        if missing:
+            logger.error(f"{len(missing)} clip(s) of the manifest are missing, e.g. {missing[0]}")
+            messagebox.showerror("Error", f"{len(missing)} clip(s) listed in the manifest no longer exist, e.g.\n{missing[0]}")
+            return
+        logger.info(f"Rebuilding {len(video_paths)} clips from manifest {manifest_path} (seed: {seed})")
+    else:
+        # 1. Select Root Folder
+        root_folder = filedialog.askdirectory(title="Select Root Folder Containing '01_IMAGES_VIDS'")
+        if not root_folder:
+            messagebox.showinfo("Cancelled", "Operation cancelled.")
+            logger.info("Operation cancelled by user (folder selection).")
+            return
+        logger.info(f"Selected root folder: {root_folder}")
+
+        # 2. Verify and get target subfolder path
+        target_folder_path = os.path.join(root_folder, TARGET_SUBFOLDER)
+        if not os.path.isdir(target_folder_path):
+            logger.error(f"Target subfolder '{TARGET_SUBFOLDER}' not found in '{root_folder}'.")
+            messagebox.showerror("Error", f"The required subfolder '{TARGET_SUBFOLDER}' was not found in the selected directory.")
+            return
+        logger.info(f"Found target subfolder: {target_folder_path}")
+
+        # 3. Build the playlist (virtual shuffle by default, physical renaming only if requested)
+        seed = SHUFFLE_SEED if SHUFFLE_SEED is not None else random.randrange(2**32)
+        if RENAME_FILES:
+            video_paths = randomize_and_rename_videos(target_folder_path, seed)
+        else:
+            seed, video_paths = build_shuffled_playlist(target_folder_path, seed)
+
+    if video_paths is None:
+        logger.error("Building the playlist failed. Aborting concatenation.")
         # Error message already shown by the function
-        return 
-    elif not renamed_video_paths:
-         logger.warning("No videos found or renamed. Skipping concatenation.")
-         messagebox.showinfo("Finished", "No video files were found to rename or combine.")
+        return
+    elif not video_paths:
+         logger.warning("No videos found. Skipping concatenation.")
+         messagebox.showinfo("Finished", "No video files were found to combine.")
          return
 
     # 4. Determine Output Path
@@ -263,15 +425,32 @@ def main():
         return
 
     # 5. Concatenate Videos
-    logger.info("Proceeding to concatenate renamed videos.")
-    success = concatenate_videos(renamed_video_paths, output_video_path)
+    logger.info("Proceeding to concatenate videos in playlist order.")
+    progress_window, on_progress = create_progress_window(root, "Combining Videos (FFmpeg)")
+    try:
+        success = concatenate_videos(
+            video_paths, output_video_path,
+            total_duration=get_playlist_duration(root_folder, video_paths), on_progress=on_progress
+        )
+    except FFmpegCancelled:
+        messagebox.showinfo("Cancelled", "Video combination was cancelled.")
+        return
+    finally:
+        progress_window.destroy()
 
     end_time = time.time()
     duration_secs = end_time - start_time
 
     if success:
+        # Record the playlist next to the output so the compilation can be reproduced (--from-manifest).
+        # Only written for an output that exists, so a rebuild never trusts a failed run's manifest.
+        output_manifest_path = os.path.splitext(output_video_path)[0] + PLAYLIST_MANIFEST_EXTENSION
+        try:
+            write_playlist_manifest(output_manifest_path, seed, video_paths, target_folder_path)
+        except Exception as e:
+            logger.warning(f"Could not write playlist manifest {output_manifest_path}: {e}")
         logger.info(f"Successfully completed in {duration_secs:.2f} seconds.")
-        messagebox.showinfo("Success", f"Successfully randomized, renamed, and combined videos.\n\nOutput saved as:\n{output_video_path}\n\nTotal time: {duration_secs:.2f} seconds.")
+        messagebox.showinfo("Success", f"Successfully shuffled (seed {seed}) and combined videos.\n\nOutput saved as:\n{output_video_path}\n\nTotal time: {duration_secs:.2f} seconds.")
     else:
         logger.error(f"Video combination process failed after {duration_secs:.2f} seconds.")
         # Error messages should have been shown by concatenate_videos
@@ -279,4 +458,9 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Shuffle and combine the clips of a project's 01_IMAGES_VIDS folder.")
+    parser.add_argument("--from-manifest", metavar="MANIFEST",
+                        help=f"Rebuild the compilation recorded in a {PLAYLIST_MANIFEST_EXTENSION} file (same clips, same order)")
+    args = parser.parse_args()
+    setup_logging()
+    main(args.from_manifest)
\ No newline at end of file
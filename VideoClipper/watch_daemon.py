@@ -0,0 +1,260 @@
+"""Headless watch-folder ingest daemon for the media organizer.
+
+Watches one or more source folders (inotify on Linux, directory polling elsewhere), waits until each
+new file is complete (closed after write / moved in, and its size and mtime stable for a short
+period), then runs it straight through the organizer pipeline: probe -> bucket -> (for images)
+Ken Burns render on a persistent process pool. Each source folder gets its project folder at
+<source>/WORKING/<project name>, exactly as in the interactive organizer.
+
+Usage:
+    python media_organizer.py --watch <source folder> [<source folder> ...] --project <name>
+"""
+import ctypes
+import ctypes.util
+import logging
+import multiprocessing
+import os
+import queue
+import select
+import struct
+import sys
+import time
+
+from duration_cache import update_duration_cache
+from file_placement import is_placed, load_placed_ledger, place_file, record_placed, save_placed_ledger
+from media_organizer import (
+    IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, IMAGE_VIDEO_DURATION, PARALLEL_PROCESSES, FILE_PLACEMENT_MODE,
+    create_process_pool, create_project_folders, get_video_bucket, get_video_duration, placed_ledger_path,
+    process_image_to_video,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds a file's size and mtime must stay unchanged before it is considered complete
+STABLE_SECONDS = 2.0
+# Poll interval for the fallback watcher (and the debounce check interval for inotify)
+POLL_INTERVAL = 1.0
+# Seconds between duration cache flushes
+CACHE_FLUSH_INTERVAL = 10.0
+# Partial download suffixes that are never ingested (yt-dlp, browsers, our own temp files)
+IGNORED_SUFFIXES = ('.part', '.ytdl', '.tmp', '.crdownload')
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_ISDIR = 0x40000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Reports files closed after writing or moved into the watched folders (Linux only)."""
+
+    def __init__(self, folders):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+        self.folders = {}
+        for folder in folders:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+            self.folders[wd] = folder
+
+    def wait(self, timeout):
+        """Returns the paths of files completed within `timeout` seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name and not mask & IN_ISDIR and wd in self.folders:
+                paths.append(os.path.join(self.folders[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher that lists the folders every POLL_INTERVAL seconds and reports new or changed files."""
+
+    def __init__(self, folders):
+        self.folders = list(folders)
+        self.seen = {}
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        paths = []
+        for folder in self.folders:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    key = (st.st_size, st.st_mtime_ns)
+                    if self.seen.get(entry.path) != key:
+                        self.seen[entry.path] = key
+                        paths.append(entry.path)
+        return paths
+
+    def close(self):
+        pass
+
+
+def create_watcher(folders):
+    """Uses inotify where available and falls back to polling."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folders)
+        except OSError as e:
+            logger.warning(f"inotify unavailable ({e}); falling back to polling.")
+    return PollingWatcher(folders)
+
+
+def is_media_file(path):
+    """True for image/video files that are not partial downloads."""
+    name = os.path.basename(path).lower()
+    if name.startswith(".") or name.endswith(IGNORED_SUFFIXES):
+        return False
+    return name.endswith(IMAGE_EXTENSIONS) or name.endswith(VIDEO_EXTENSIONS)
+
+
+def run_daemon(source_folders, project_name, log_queue=None):
+    """Watches the source folders and ingests new media until interrupted (Ctrl+C).
+
+    log_queue is the queue of the parent's logging listener (media_organizer.setup_logging); render
+    workers send their log records there.
+    """
+    projects = {}
+    # Originals kept by "hardlink"/"reflink" placement, per source folder (see file_placement)
+    keeps_sources = FILE_PLACEMENT_MODE != "move"
+    ledgers = {}
+    dirty_ledgers = set()
+    for source in source_folders:
+        source = os.path.abspath(source)
+        dest_base_path, folders = create_project_folders(source, project_name)
+        projects[source] = (dest_base_path, folders)
+        if keeps_sources:
+            ledgers[source] = load_placed_ledger(placed_ledger_path(source))
+        logger.info(f"Watching {source} -> {dest_base_path}")
+
+    def flush_ledgers():
+        for source in dirty_ledgers:
+            try:
+                save_placed_ledger(placed_ledger_path(source), ledgers[source])
+            except OSError as e:
+                logger.warning(f"Could not write placed-sources ledger for {source}: {e}")
+        dirty_ledgers.clear()
+
+    num_processes = PARALLEL_PROCESSES if PARALLEL_PROCESSES > 0 else max(1, multiprocessing.cpu_count() - 1)
+    executor = create_process_pool(num_processes, log_queue)
+    watcher = create_watcher(projects)
+    results = queue.Queue() # (project folder, clip path, duration) from finished renders
+    pending = {} # path -> (size, mtime_ns, time the stat last changed)
+    pending_durations = {} # project folder -> {clip path: duration}
+    last_flush = time.time()
+
+    def on_render_done(future, dest_base_path, output_path):
+        try:
+            img_path, success = future.result()
+        except Exception as e:
+            logger.error(f"Render worker failed for {output_path}: {e}")
+            return
+        if success:
+            results.put((dest_base_path, output_path, IMAGE_VIDEO_DURATION))
+        else:
+            logger.error(f"Ken Burns render failed for {img_path}")
+
+    def mark_placed(source, path):
+        if keeps_sources:
+            record_placed(ledgers[source], path)
+            dirty_ledgers.add(source)
+
+    def ingest(path):
+        source = os.path.dirname(path)
+        dest_base_path, folders = projects[source]
+        name = os.path.basename(path)
+        ext = os.path.splitext(name)[1].lower()
+        if keeps_sources and is_placed(ledgers[source], path):
+            logger.debug(f"Already placed, skipping: {name}")
+            return
+        if ext in IMAGE_EXTENSIONS:
+            dest_img_path = os.path.join(folders["images"], name)
+            place_file(path, dest_img_path, FILE_PLACEMENT_MODE)
+            mark_placed(source, path)
+            output_path = os.path.join(folders["img_vids"], os.path.splitext(name)[0] + ".mp4")
+            if os.path.exists(output_path):
+                logger.warning(f"Output video already exists, skipping render: {output_path}")
+                return
+            future = executor.submit(process_image_to_video, (dest_img_path, output_path))
+            future.add_done_callback(lambda f: on_render_done(f, dest_base_path, output_path))
+            logger.info(f"Ingested image {name}; render queued.")
+        else:
+            duration = get_video_duration(path)
+            if duration is None:
+                logger.warning(f"Could not get duration for video {name}; leaving it in place.")
+                return
+            dest_vid_path = os.path.join(folders[get_video_bucket(duration)], name)
+            place_file(path, dest_vid_path, FILE_PLACEMENT_MODE)
+            mark_placed(source, path)
+            results.put((dest_base_path, dest_vid_path, duration))
+            logger.info(f"Ingested video {name} ({duration:.2f}s) -> {os.path.dirname(dest_vid_path)}")
+
+    # Files that were already waiting when the daemon started are picked up as well (except kept originals
+    # that an earlier run placed already)
+    for source in projects:
+        with os.scandir(source) as entries:
+            for entry in entries:
+                if entry.is_file() and is_media_file(entry.path) and not (keeps_sources and is_placed(ledgers[source], entry.path)):
+                    pending[entry.path] = (None, None, time.time())
+
+    try:
+        while True:
+            for path in watcher.wait(POLL_INTERVAL):
+                if is_media_file(path):
+                    pending.setdefault(path, (None, None, time.time()))
+
+            # Debounce: a file is ready once its size and mtime have been stable for STABLE_SECONDS
+            now = time.time()
+            for path, (size, mtime_ns, since) in list(pending.items()):
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    del pending[path] # Moved away or deleted before it settled
+                    continue
+                if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                    pending[path] = (st.st_size, st.st_mtime_ns, now)
+                elif now - since >= STABLE_SECONDS and st.st_size > 0:
+                    del pending[path]
+                    try:
+                        ingest(path)
+                    except Exception as e:
+                        logger.error(f"Failed to ingest {path}: {e}")
+
+            while not results.empty():
+                dest_base_path, clip_path, duration = results.get()
+                pending_durations.setdefault(dest_base_path, {})[clip_path] = duration
+            if (pending_durations or dirty_ledgers) and now - last_flush >= CACHE_FLUSH_INTERVAL:
+                for dest_base_path, durations in pending_durations.items():
+                    update_duration_cache(dest_base_path, durations)
+                pending_durations.clear()
+                flush_ledgers()
+                last_flush = now
+    except KeyboardInterrupt:
+        logger.info("Stopping watch daemon, waiting for running renders...")
+    finally:
+        watcher.close()
+        executor.shutdown(wait=True)
+        while not results.empty():
+            dest_base_path, clip_path, duration = results.get()
+            pending_durations.setdefault(dest_base_path, {})[clip_path] = duration
+        for dest_base_path, durations in pending_durations.items():
+            update_duration_cache(dest_base_path, durations)
+        flush_ledgers()
@@ -1,35 +1,90 @@
+import argparse
+import asyncio
+import functools
 import os
-import shutil
 from pathlib import Path
-import openai
-import tkinter as tk
-from tkinter import filedialog
 import subprocess
+import time
 from dotenv import load_dotenv
 import sys
 
+from chunked_transcription import extract_chunk, plan_chunks, should_chunk, stitch_transcripts, transcribe_file
+from original_media import reference_original
+import transcription_cache
+from transcription_audio import extract_transcription_audio, extraction_signature
+
 # Load environment variables
 load_dotenv()
 
 # Get API keys from environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    print("Error: OPENAI_API_KEY not found in environment variables.")
-    sys.exit(1)
-
 # --- Constants ---
 OUTPUT_BASE_DIR = "OUTPUT/TRANSCRIPTIONS"
 VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".wmv", ".flv"}
 AUDIO_EXTENSIONS = {".mp3", ".wav", ".m4a", ".aac", ".ogg", ".flac"}
-COPIED_VIDEO_FILENAME = "video_org.mp4"
-COPIED_AUDIO_FILENAME = "audio_org.mp3"
+# The original input is referenced as video_org/audio_org + its own extension (see original_media)
+ORIGINAL_VIDEO_BASENAME = "video_org"
+ORIGINAL_AUDIO_BASENAME = "audio_org"
 TRANSCRIPT_FILENAME = "audio_script.txt"
+# Audio extracted from videos for transcription (extension depends on the profile, see transcription_audio)
+EXTRACTED_AUDIO_BASENAME = "audio_org"
+# Converted upload copy of audio inputs that cannot be uploaded as they are
+UPLOAD_AUDIO_BASENAME = "audio_upload"
+
+# model="whisper-1" / "gpt-4o-transcribe" / "gpt-4o-mini-transcribe"
+TRANSCRIPTION_MODEL = "gpt-4o-mini-transcribe"
+# "text" for plain text; "srt", "vtt" and "verbose_json" (whisper-1 only) carry timestamps
+RESPONSE_FORMAT = "text"
+# ISO-639-1 code of the spoken language (e.g. "de"), or None to let the model detect it
+TRANSCRIPTION_LANGUAGE = None
+
+# Long media is split at silences and transcribed in parallel chunks; the chunking settings live in
+# chunked_transcription (shared with 03_video2translated)
+
+# --- Batch mode (python 01_audio2text.py --batch FOLDER_OR_FILE ...) ---
+# Transcription requests per minute of our quota; a token bucket keeps the batch just below it
+BATCH_REQUESTS_PER_MINUTE = 450
+# Requests that may be sent back to back before the per-minute rate applies
+BATCH_BURST = 10
+# Requests in flight at once (bounds open connections)
+BATCH_MAX_CONCURRENT_REQUESTS = 32
+# Files being extracted/uploaded at once; their audio is held in memory until the upload finishes
+BATCH_MAX_CONCURRENT_FILES = 16
+# Concurrent ffmpeg audio extractions
+BATCH_EXTRACT_WORKERS = 4
+
+_openai_client = None
+_async_openai_client = None
+
+
+def get_openai_client():
+    """Shared OpenAI client; the openai package is imported on first use to keep startup fast."""
+    global _openai_client
+    if _openai_client is None:
+        if not OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY not found in environment variables.")
+        import openai
+        _openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+def get_async_openai_client():
+    """Shared AsyncOpenAI client for the batch mode (one connection pool for all requests)."""
+    global _async_openai_client
+    if _async_openai_client is None:
+        if not OPENAI_API_KEY:
+            raise RuntimeError("OPENAI_API_KEY not found in environment variables.")
+        import openai
+        _async_openai_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _async_openai_client
 
 # --- Functions ---
 
 def select_media_file():
     """Opens a file dialog to select an audio or video file."""
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()  # Hide the main tkinter window
     file_path = filedialog.askopenfilename(
@@ -46,24 +101,43 @@ def select_media_file():
         return None
     return file_path
 
-def transcribe_audio(audio_path, output_text_file):
-    """Transcribes the audio file using OpenAI Whisper API."""
+def _request_transcription(file, response_format=RESPONSE_FORMAT):
+    """One transcription request. file is an open file or a (filename, bytes) tuple. Returns the response text."""
+    response = get_openai_client().audio.transcriptions.create(**_request_options(file, response_format))
+    return _response_text(response, response_format)
+
+def _request_options(file, response_format):
+    options = {"model": TRANSCRIPTION_MODEL, "file": file, "response_format": response_format}
+    if TRANSCRIPTION_LANGUAGE:
+        options["language"] = TRANSCRIPTION_LANGUAGE
+    return options
+
+def _response_text(response, response_format):
+    # The response itself is the transcribed text for the text formats
+    if response_format == "verbose_json":
+        return response.model_dump_json()
+    return response if isinstance(response, str) else response.text
+
+def transcribe_audio(audio_path, output_text_file, source_path=None):
+    """Transcribes the audio file using the OpenAI transcription API (in parallel chunks for long media).
+
+    Results are cached by the content of source_path (the original input the audio was extracted
+    from; audio_path itself by default), so repeated or duplicate inputs skip the API call.
+    """
+    import openai
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        print(f"Transcribing '{audio_path}' using OpenAI...")
-
-        with open(audio_path, "rb") as audio_file:
-            # Use response_format="text" for plain text output
-            response = client.audio.transcriptions.create(
-                # model="whisper-1",
-                # model="gpt-4o-transcribe",
-                model="gpt-4o-mini-transcribe",
-                file=audio_file,
-                response_format="text"
-            )
-
-        # The response itself is the transcribed text when response_format="text"
-        transcribed_text = response
+        cache_key = transcription_cache.cache_key(
+            source_path or audio_path, TRANSCRIPTION_MODEL, RESPONSE_FORMAT, TRANSCRIPTION_LANGUAGE,
+            extraction_signature() if source_path else None
+        )
+        transcribed_text = transcription_cache.get(cache_key)
+        if transcribed_text is not None:
+            print(f"Using cached transcription of '{source_path or audio_path}'")
+        else:
+            get_openai_client()
+            print(f"Transcribing '{audio_path}' using OpenAI...")
+            transcribed_text = transcribe_file(audio_path, _request_transcription, RESPONSE_FORMAT)
+            transcription_cache.put(cache_key, transcribed_text)
 
         with open(output_text_file, "w", encoding="utf-8") as f:
             f.write(transcribed_text)
@@ -78,99 +152,261 @@ def transcribe_audio(audio_path, output_text_file):
         print(f"OpenAI API request exceeded rate limit: {e}")
     except FileNotFoundError:
         print(f"Error: Audio file not found at '{audio_path}'")
+    except subprocess.CalledProcessError as e:
+        print(f"Error decoding '{audio_path}' with ffmpeg: {e.stderr.decode(errors='ignore')[-2000:]}")
     except Exception as e:
         print(f"An unexpected error occurred during transcription: {e}")
     return False
 
-def extract_audio_from_video(video_path, output_audio_path):
-    """Extracts audio from a video file using ffmpeg."""
-    print(f"Extracting audio from '{video_path}' to '{output_audio_path}'...")
+def extract_audio_from_video(media_path, output_base, reuse_input=False):
+    """Extracts the audio for transcription (16 kHz mono Opus, or a stream copy; see transcription_audio).
+
+    Returns the path of the audio to upload, or None on failure.
+    """
+    print(f"Extracting transcription audio from '{media_path}'...")
     try:
-        # Use -y to overwrite output file without asking
-        # Use -vn to disable video recording
-        # Use -acodec libmp3lame for MP3 output
-        # capture_output=True to suppress ffmpeg logs in console unless there's an error
-        result = subprocess.run(
-            ['ffmpeg', '-i', video_path, '-vn', '-acodec', 'libmp3lame', '-y', output_audio_path],
-            check=True,  # Raise CalledProcessError on failure
-            capture_output=True,
-            text=True
-        )
-        print("Audio extraction successful.")
-        return True
+        audio_path = extract_transcription_audio(media_path, output_base, reuse_input=reuse_input)
+        print(f"Audio extraction successful: '{audio_path}'")
+        return audio_path
     except FileNotFoundError:
         print("Error: ffmpeg command not found. Make sure ffmpeg is installed and in your system's PATH.")
-        return False
+        return None
     except subprocess.CalledProcessError as e:
         print(f"Error during ffmpeg execution:")
         print(f"Command: {' '.join(e.cmd)}")
         print(f"Return code: {e.returncode}")
-        print(f"Stderr: {e.stderr}")
-        return False
+        print(f"Stderr: {e.stderr.decode(errors='ignore') if isinstance(e.stderr, bytes) else e.stderr}")
+        return None
     except Exception as e:
         print(f"An unexpected error occurred during audio extraction: {e}")
-        return False
+        return None
 
 # --- Main Logic ---
 
-def main():
-    input_file_path = select_media_file()
-    if not input_file_path:
-        return # Exit if no file was selected
+def get_output_paths(input_file_path):
+    """(output directory, transcript path) of an input file."""
+    file_name_no_ext = os.path.splitext(os.path.basename(input_file_path))[0]
+    output_dir = os.path.join(OUTPUT_BASE_DIR, file_name_no_ext)
+    return output_dir, os.path.join(output_dir, TRANSCRIPT_FILENAME)
 
-    file_dir, file_name_with_ext = os.path.split(input_file_path)
-    file_name_no_ext, file_ext = os.path.splitext(file_name_with_ext)
+def prepare_media(input_file_path, extract_audio=True):
+    """References the media in its output folder and extracts the audio to upload.
+
+    Returns the audio path (the input itself when extract_audio is False), or None on failure (errors are printed).
+    """
+    file_name_with_ext = os.path.basename(input_file_path)
+    file_ext = os.path.splitext(file_name_with_ext)[1]
     file_ext_lower = file_ext.lower()
 
     # Create output directory
-    output_dir = os.path.join(OUTPUT_BASE_DIR, file_name_no_ext)
+    output_dir, _ = get_output_paths(input_file_path)
     os.makedirs(output_dir, exist_ok=True)
     print(f"Output directory created/exists: '{output_dir}'")
 
-    output_audio_path = os.path.join(output_dir, COPIED_AUDIO_FILENAME)
-    output_script_path = os.path.join(output_dir, TRANSCRIPT_FILENAME)
-    audio_source_for_transcription = None
-
     # Process based on file type
     if file_ext_lower in VIDEO_EXTENSIONS:
         print(f"Processing video file: '{file_name_with_ext}'")
-        output_video_path = os.path.join(output_dir, COPIED_VIDEO_FILENAME)
-
-        # 1. Copy original video
+        # 1. Reference the original video (link or manifest; no copy unless configured)
         try:
-            shutil.copy2(input_file_path, output_video_path) # copy2 preserves metadata
-            print(f"Video copied to '{output_video_path}'")
+            output_video_path = reference_original(input_file_path, output_dir, ORIGINAL_VIDEO_BASENAME)
+            print(f"Original video referenced as '{output_video_path}'")
         except Exception as e:
-            print(f"Error copying video file: {e}")
-            return # Stop processing if copy fails
+            print(f"Error referencing video file: {e}")
+            return None # Stop processing if this fails
+        if not extract_audio:
+            return input_file_path
 
         # 2. Extract audio
-        if extract_audio_from_video(input_file_path, output_audio_path):
-            audio_source_for_transcription = output_audio_path
-        else:
+        audio_source_for_transcription = extract_audio_from_video(
+            input_file_path, os.path.join(output_dir, EXTRACTED_AUDIO_BASENAME)
+        )
+        if not audio_source_for_transcription:
             print("Failed to extract audio. Cannot proceed with transcription.")
-            return # Stop if audio extraction fails
+            return None # Stop if audio extraction fails
+        return audio_source_for_transcription
 
     elif file_ext_lower in AUDIO_EXTENSIONS:
         print(f"Processing audio file: '{file_name_with_ext}'")
-        # 1. Copy original audio
+        # 1. Reference the original audio
         try:
-            shutil.copy2(input_file_path, output_audio_path) # copy2 preserves metadata
-            print(f"Audio copied to '{output_audio_path}'")
-            audio_source_for_transcription = output_audio_path
+            output_audio_path = reference_original(input_file_path, output_dir, ORIGINAL_AUDIO_BASENAME)
+            print(f"Original audio referenced as '{output_audio_path}'")
         except Exception as e:
-            print(f"Error copying audio file: {e}")
-            return # Stop processing if copy fails
-
-    else:
-        print(f"Error: Unsupported file type '{file_ext}'. Please select a valid video or audio file.")
-        return
-
-    # 3. Transcribe the audio (if source is determined)
-    if audio_source_for_transcription:
-        transcribe_audio(audio_source_for_transcription, output_script_path)
-    else:
-        print("Error: Could not determine audio source for transcription.")
+            print(f"Error referencing audio file: {e}")
+            return None # Stop processing if this fails
+        if not extract_audio:
+            return input_file_path
+
+        # 2. Uploaded as is when already compact, otherwise converted to the transcription profile
+        audio_source_for_transcription = extract_audio_from_video(
+            input_file_path, os.path.join(output_dir, UPLOAD_AUDIO_BASENAME), reuse_input=True
+        )
+        if not audio_source_for_transcription:
+            print("Failed to prepare the audio. Cannot proceed with transcription.")
+        return audio_source_for_transcription
+
+    print(f"Error: Unsupported file type '{file_ext}'. Please select a valid video or audio file.")
+    return None
+
+def process_media_file(input_file_path):
+    """References the media in its output folder, extracts the audio if needed and transcribes it.
+
+    Returns the transcript path, or None on failure (errors are printed).
+    """
+    audio_source_for_transcription = prepare_media(input_file_path)
+    if not audio_source_for_transcription:
+        return None
+
+    # 3. Transcribe the audio
+    _, output_script_path = get_output_paths(input_file_path)
+    if not transcribe_audio(audio_source_for_transcription, output_script_path, source_path=input_file_path):
+        return None
+    return output_script_path
+
+
+# --- Batch Mode ---
+
+class TokenBucket:
+    """Async token bucket: on average `rate` acquisitions per second, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+def find_media_files(paths, recursive=False):
+    """Media files among paths (files are taken as given, folders are scanned), sorted and de-duplicated."""
+    media_extensions = VIDEO_EXTENSIONS | AUDIO_EXTENSIONS
+    output_root = os.path.abspath(OUTPUT_BASE_DIR)
+    found = set()
+    for path in paths:
+        if os.path.isfile(path):
+            found.add(os.path.abspath(path))
+            continue
+        for folder, subfolders, files in os.walk(path):
+            # Never pick up the originals referenced in our own output folders
+            subfolders[:] = [name for name in subfolders if os.path.abspath(os.path.join(folder, name)) != output_root]
+            found.update(os.path.abspath(os.path.join(folder, name))
+                         for name in files if os.path.splitext(name)[1].lower() in media_extensions)
+            if not recursive:
+                break
+    return sorted(found)
+
+async def _transcribe_async(audio_path, limiter, request_slots):
+    client = get_async_openai_client()
+
+    async def request(load_file):
+        # The upload is only loaded (a chunk extracted) once a request slot is free
+        async with request_slots:
+            file = await asyncio.to_thread(load_file)
+            await limiter.acquire()
+            response = await client.audio.transcriptions.create(**_request_options(file, RESPONSE_FORMAT))
+            return _response_text(response, RESPONSE_FORMAT)
+
+    if await asyncio.to_thread(should_chunk, audio_path):
+        chunks = await asyncio.to_thread(plan_chunks, audio_path)
+        # gather keeps the chunk order
+        parts = await asyncio.gather(*(request(functools.partial(extract_chunk, audio_path, index, start, duration))
+                                       for index, (start, duration) in enumerate(chunks)))
+        return stitch_transcripts(parts, [start for start, _ in chunks], RESPONSE_FORMAT)
+    # Read in a worker thread like the chunk extraction, so large files do not stall the event loop
+    return await request(lambda: (os.path.basename(audio_path), Path(audio_path).read_bytes()))
+
+async def _batch_one(input_path, limiter, request_slots, extract_slots, file_slots):
+    """Transcribes one file of a batch. Returns "skipped", "cached", "transcribed" or "failed"."""
+    _, output_script_path = get_output_paths(input_path)
+    if os.path.exists(output_script_path):
+        return "skipped"
+    try:
+        cache_key = await asyncio.to_thread(
+            transcription_cache.cache_key, input_path, TRANSCRIPTION_MODEL, RESPONSE_FORMAT,
+            TRANSCRIPTION_LANGUAGE, extraction_signature()
+        )
+        transcribed_text = transcription_cache.get(cache_key)
+        status = "cached"
+        if transcribed_text is None:
+            async with file_slots:
+                async with extract_slots:
+                    audio_path = await asyncio.to_thread(prepare_media, input_path)
+                if not audio_path:
+                    return "failed"
+                transcribed_text = await _transcribe_async(audio_path, limiter, request_slots)
+            transcription_cache.put(cache_key, transcribed_text)
+            status = "transcribed"
+        elif not await asyncio.to_thread(prepare_media, input_path, False):
+            return "failed"
+        with open(output_script_path, "w", encoding="utf-8") as f:
+            f.write(transcribed_text)
+        print(f"[{status}] {input_path} -> {output_script_path}")
+        return status
+    except Exception as e:
+        print(f"[failed] {input_path}: {e}")
+        return "failed"
+
+async def transcribe_batch_async(input_paths, requests_per_minute=BATCH_REQUESTS_PER_MINUTE):
+    """Transcribes many files concurrently under the request rate limit. Returns {status: count}."""
+    # Outputs are named after the file name, so a second file with the same name would collide
+    by_output = {}
+    for path in input_paths:
+        by_output.setdefault(get_output_paths(path)[1], []).append(path)
+    duplicates = [path for paths in by_output.values() for path in paths[1:]]
+    for path in duplicates:
+        print(f"[failed] {path}: another input has the same file name")
+    input_paths = [paths[0] for paths in by_output.values()]
+
+    limiter = TokenBucket(requests_per_minute / 60, BATCH_BURST)
+    request_slots = asyncio.Semaphore(BATCH_MAX_CONCURRENT_REQUESTS)
+    extract_slots = asyncio.Semaphore(BATCH_EXTRACT_WORKERS)
+    file_slots = asyncio.Semaphore(BATCH_MAX_CONCURRENT_FILES)
+    results = await asyncio.gather(*(_batch_one(path, limiter, request_slots, extract_slots, file_slots)
+                                     for path in input_paths))
+    counts = {status: results.count(status) for status in ("transcribed", "cached", "skipped", "failed")}
+    counts["failed"] += len(duplicates)
+    return counts
+
+def transcribe_batch(paths, recursive=False, requests_per_minute=BATCH_REQUESTS_PER_MINUTE):
+    """Batch entry point: transcribes every media file in paths (files and folders). Returns {status: count}."""
+    input_paths = find_media_files(paths, recursive)
+    print(f"Found {len(input_paths)} media file(s); transcribing at up to {requests_per_minute} requests/minute...")
+    started = time.time()
+    counts = asyncio.run(transcribe_batch_async(input_paths, requests_per_minute))
+    print(f"Batch finished in {time.time() - started:.1f}s: " + ", ".join(f"{n} {status}" for status, n in counts.items()))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe audio/video files with OpenAI (file dialog without arguments).")
+    parser.add_argument("--batch", nargs="+", metavar="PATH", help="Transcribe all media in these folders/files")
+    parser.add_argument("--recursive", action="store_true", help="Include subfolders in batch mode")
+    parser.add_argument("--rpm", type=int, default=BATCH_REQUESTS_PER_MINUTE, help="Request rate limit in batch mode")
+    args = parser.parse_args()
+
+    if not OPENAI_API_KEY:
+        print("Error: OPENAI_API_KEY not found in environment variables.")
+        sys.exit(1)
+
+    if args.batch:
+        counts = transcribe_batch(args.batch, args.recursive, args.rpm)
+        sys.exit(1 if counts["failed"] else 0)
+
+    input_file_path = select_media_file()
+    if not input_file_path:
+        return # Exit if no file was selected
+    process_media_file(input_file_path)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,10 @@
 import os
 import shutil
-from pathlib import Path
-import openai
-import requests
-import tkinter as tk
-from tkinter import filedialog
+import subprocess
 from dotenv import load_dotenv
 
+from chunked_tts import synthesize_elevenlabs, synthesize_openai
+
 # Load environment variables
 load_dotenv()
 
@@ -16,8 +14,25 @@ OPENAI_TTS_VOICE_ID = os.getenv("OPEN_AI_TTS_VOICE_ID")
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID")
 
+# TTS models and voice settings
+OPENAI_TTS_MODEL = "gpt-4o-mini-tts" # or "tts-1"
+ELEVENLABS_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.8}
+
+_openai_client = None
+
+# OpenAI client shared by all requests; openai is imported on first use rather than at startup
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        import openai
+        _openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
 # Function to open file dialog and select a text file
 def select_text_file():
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     text_file_path = filedialog.askopenfilename(initialdir=os.getcwd(), title="Select Text File", 
@@ -25,7 +40,10 @@ def select_text_file():
     if not text_file_path:
         print("No text file selected.")
         return None, None, None
-    
+    return prepare_output_folder(text_file_path)
+
+# Function to create the output folder for a text file and copy the script into it
+def prepare_output_folder(text_file_path):
     # Get the base name of the txt file without extension
     text_file_name = os.path.splitext(os.path.basename(text_file_path))[0]
     
@@ -57,20 +75,15 @@ def generate_audio_with_openai(input_text_file, output_audio_file, voice):
     with open(input_text_file, "r", encoding="utf-8") as f:
         text = f.read()
 
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    client = get_openai_client()
     print(f"Generating audio using OpenAI with voice '{voice}'...")
 
-    # Generate speech using OpenAI's TTS API
-    response = client.audio.speech.create(
-        # model="tts-1",
-        model="gpt-4o-mini-tts",
-        voice=voice,
-        input=text,
-    )
-
-    # Stream the generated audio to the output file
-    speech_file_path = Path(output_audio_file)
-    response.stream_to_file(speech_file_path)
+    # Chunked, streamed and cached (see chunked_tts); a short script is a single chunk
+    try:
+        synthesize_openai(client, text, output_audio_file, voice, OPENAI_TTS_MODEL)
+    except ValueError as e:
+        print(f"Error: {e} ({input_text_file})")
+        return None
 
     print(f"Generated audio saved as '{output_audio_file}'")
     return output_audio_file
@@ -83,23 +96,26 @@ def generate_audio_with_elevenlabs(text_file, output_audio_file, voice_id=ELEVEN
     with open(text_file, "r", encoding="utf-8") as f:
         text = f.read()
 
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-    headers = {"xi-api-key": ELEVENLABS_API_KEY, "Content-Type": "application/json"}
-    data = {"text": text, "voice_settings": {"stability": 0.5, "similarity_boost": 0.8}}
-
     print(f"Generating audio using ElevenLabs API with voice ID '{voice_id}'...")
-    response = requests.post(url, json=data, headers=headers)
-    
-    if response.status_code != 200:
-        print(f"Error from ElevenLabs API: {response.text}")
+    try:
+        synthesize_elevenlabs(text, output_audio_file, voice_id, ELEVENLABS_API_KEY, ELEVENLABS_VOICE_SETTINGS)
+    except ValueError as e:
+        print(f"Error: {e} ({text_file})")
+        return None
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print(f"Error from ElevenLabs API: {e}")
         return None
-        
-    with open(output_audio_file, "wb") as f:
-        f.write(response.content)
 
     print(f"Generated audio saved as '{output_audio_file}'")
     return output_audio_file
 
+# Function to generate the audio for one text file without any dialogs (used by batch jobs)
+def text_to_speech(text_file_path, provider="openai", voice=None):
+    folder_path, script_path, output_audio_path = prepare_output_folder(text_file_path)
+    if provider == "elevenlabs":
+        return generate_audio_with_elevenlabs(script_path, output_audio_path, voice_id=voice or ELEVENLABS_VOICE_ID)
+    return generate_audio_with_openai(script_path, output_audio_path, voice=voice or OPENAI_TTS_VOICE_ID)
+
 # Main function
 def main():
     folder_path, script_path, output_audio_path = select_text_file()
@@ -1,13 +1,17 @@
 import os
-import shutil
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import openai
-import requests
-import tkinter as tk
-from tkinter import filedialog
 import subprocess
 from dotenv import load_dotenv
 
+from chunked_transcription import transcribe_file
+from chunked_tts import synthesize_elevenlabs, synthesize_openai
+from original_media import reference_original
+from stage_runner import Stage, run_stages
+import transcription_cache
+from transcription_audio import extract_transcription_audio, extraction_signature
+
 # Load environment variables
 load_dotenv()
 
@@ -17,12 +21,38 @@ ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID")
 OPENAI_TTS_VOICE_ID = os.getenv("OPEN_AI_TTS_VOICE_ID")
 
+# Translation settings. Long transcripts are split at paragraph/sentence boundaries into chunks of about
+# TRANSLATION_CHUNK_TOKENS, which are translated in parallel. Each request also gets the end of the
+# preceding text (TRANSLATION_CONTEXT_TOKENS) as context, so names and terms stay consistent across chunks.
+TRANSLATION_MODEL = "gpt-4o-mini"
+TARGET_LANGUAGE = "English"
+TRANSLATION_CHUNK_TOKENS = 1500
+TRANSLATION_CONTEXT_TOKENS = 150
+TRANSLATION_WORKERS = 4
+TRANSCRIPTION_MODEL = "gpt-4o-mini-transcribe" # or "whisper-1" / "gpt-4o-transcribe"
+OPENAI_TTS_MODEL = "gpt-4o-mini-tts" # or "tts-1"
+ELEVENLABS_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.8}
+
+_openai_client = None
+_encoding = None
+
+# One OpenAI client for transcription, translation and TTS (created, and openai imported, on first use)
+def get_openai_client():
+    global _openai_client
+    if _openai_client is None:
+        import openai
+        _openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
 # import torch
 # print(torch.cuda.is_available())  # Should return True
 # print(torch.cuda.get_device_name(0))
 
 # Function to open a file dialog and select an input file (audio or video)
 def select_input_file():
+    import tkinter as tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     file_path = filedialog.askopenfilename(
@@ -38,7 +68,10 @@ def select_input_file():
     if not file_path:
         print("No file selected.")
         return None, None, None
+    return prepare_input(file_path)
 
+# Function to determine the file type and create the output folder for an input file
+def prepare_input(file_path):
     file_dir, file_name_ext = os.path.split(file_path)
     file_name, file_ext = os.path.splitext(file_name_ext)
     file_ext = file_ext.lower()
@@ -64,15 +97,24 @@ def select_input_file():
     return file_path, file_type, output_folder_path
 
 
-# Function to transcribe audio using Open AI
-def transcribe_audio(audio_path, output_text_file):
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    print("Transcribing using OpenAI...")
-
-    with open(audio_path, "rb") as audio_file:
-        # response = client.audio.transcriptions.create(model="whisper-1", file=audio_file, response_format="text")
-        # response = client.audio.transcriptions.create(model="gpt-4o-transcribe", file=audio_file, response_format="text")
-        response = client.audio.transcriptions.create(model="gpt-4o-mini-transcribe", file=audio_file, response_format="text")
+# Function to transcribe audio using Open AI, in parallel chunks for long media (see chunked_transcription).
+# Results are cached by the content of source_path (the original input; audio_path by default), shared
+# with 01_audio2text (see transcription_cache).
+def transcribe_audio(audio_path, output_text_file, source_path=None):
+    model = TRANSCRIPTION_MODEL
+    cache_key = transcription_cache.cache_key(
+        source_path or audio_path, model, "text", extraction=extraction_signature() if source_path else None
+    )
+    response = transcription_cache.get(cache_key)
+    if response is not None:
+        print(f"Using cached transcription of '{source_path or audio_path}'")
+    else:
+        client = get_openai_client()
+        print("Transcribing using OpenAI...")
+        response = transcribe_file(
+            audio_path, lambda file: client.audio.transcriptions.create(model=model, file=file, response_format="text")
+        )
+        transcription_cache.put(cache_key, response)
 
     with open(output_text_file, "w", encoding="utf-8") as f:
         f.write(response)
@@ -80,147 +122,218 @@ def transcribe_audio(audio_path, output_text_file):
     print(f"Transcription saved as '{output_text_file}'")
 
 
-# Function to translate text using Open AI
+# Function to count the tokens of a text (tiktoken if installed, otherwise an estimate of ~4 characters per token)
+def count_tokens(text):
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            _encoding = False
+    return len(_encoding.encode(text)) if _encoding else len(text) // 4 + 1
+
+# Function to split text into chunks of at most max_tokens, preferring paragraph, then sentence, then word
+# boundaries. Returns a list of (chunk text, whether the chunk ends a paragraph).
+def split_for_translation(text, max_tokens):
+    chunks = []
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        pieces = []
+        for sentence in re.split(r"(?<=[.!?…。！？])[\"'”’)]*\s+", paragraph):
+            if count_tokens(sentence) <= max_tokens:
+                pieces.append(sentence)
+                continue
+            # Sentences longer than a chunk (e.g. unpunctuated transcripts) are cut between words
+            current = []
+            for word in sentence.split(" "):
+                if current and count_tokens(" ".join(current + [word])) > max_tokens:
+                    pieces.append(" ".join(current))
+                    current = []
+                current.append(word)
+            if current:
+                pieces.append(" ".join(current))
+
+        current = ""
+        for piece in pieces:
+            if current and count_tokens(f"{current} {piece}") > max_tokens:
+                chunks.append((current, False))
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+        chunks.append((current, True))
+    return chunks
+
+# Function to get the end of a text, at most max_tokens long and starting at a word boundary
+def text_tail(text, max_tokens):
+    words = text.split(" ")
+    tail = []
+    while words and count_tokens(" ".join([words[-1]] + tail)) <= max_tokens:
+        tail.insert(0, words.pop())
+    return " ".join(tail)
+
+# Function to translate one chunk, with the text before it as context. A reply cut off at the output
+# limit is not accepted: the chunk is halved at a sentence (or word) boundary and both halves translated.
+def translate_chunk(chunk, context):
+    system_prompt = f"You are a professional translator. Translate the following text into {TARGET_LANGUAGE}."
+    if context:
+        system_prompt += (" The text continues a longer transcript. Reply with the translation of the text only."
+                          f"\n\nPreceding text, for context only (do not translate it):\n{context}")
+    response = get_openai_client().chat.completions.create(
+        model=TRANSLATION_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": chunk}
+        ],
+        temperature=0.0
+    )
+    choice = response.choices[0]
+    if choice.finish_reason != "length":
+        return choice.message.content.strip()
+
+    sentences = re.split(r"(?<=[.!?…。！？])\s+", chunk)
+    parts = sentences if len(sentences) > 1 else chunk.split(" ")
+    if len(parts) < 2:
+        raise RuntimeError("Translation was truncated and the text cannot be split further")
+    middle = len(parts) // 2
+    first, second = " ".join(parts[:middle]), " ".join(parts[middle:])
+    return f"{translate_chunk(first, context)} {translate_chunk(second, text_tail(first, TRANSLATION_CONTEXT_TOKENS))}"
+
+# Function to translate text using Open AI. Long texts are translated chunk by chunk in parallel and
+# reassembled in order (paragraph breaks are kept between chunks that end a paragraph).
 def translate_text(input_text_file, output_text_file):
     with open(input_text_file, "r", encoding="utf-8") as f:
         original_text = f.read()
 
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
-    print("Translating text using Open AI gpt-4o-mini...")
+    chunks = split_for_translation(original_text, TRANSLATION_CHUNK_TOKENS)
+    contexts = [""] + [text_tail(chunk, TRANSLATION_CONTEXT_TOKENS) for chunk, _ in chunks[:-1]]
+    print(f"Translating text using Open AI {TRANSLATION_MODEL} ({len(chunks)} chunk(s))...")
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system",
-             "content": "You are a professional translator. Translate the following text into English."},
-            {"role": "user", "content": original_text}
-        ],
-        temperature=0.0
-    )
-    translated_text = response.choices[0].message.content.strip()
+    with ThreadPoolExecutor(max_workers=TRANSLATION_WORKERS) as executor:
+        translations = list(executor.map(translate_chunk, [chunk for chunk, _ in chunks], contexts))
+
+    translated_text = ""
+    for translation, (_, paragraph_end) in zip(translations, chunks):
+        translated_text += translation + ("\n\n" if paragraph_end else " ")
+    translated_text = translated_text.strip()
 
     with open(output_text_file, "w", encoding="utf-8") as f:
         f.write(translated_text)
 
     print(f"Translation saved as '{output_text_file}'")
 
-# Function to generate audio using Open AI
+# Function to generate audio using Open AI (chunked, streamed and cached, see chunked_tts)
 def generate_audio_with_openai_tts(input_text_file, output_audio_file, voice):
     with open(input_text_file, "r", encoding="utf-8") as f:
         text = f.read()
 
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    client = get_openai_client()
     print("Generating English audio using OpenAI...")
-
-    # Generate speech using OpenAI's TTS API
-    response = client.audio.speech.create(
-        # model="tts-1",
-        model="gpt-4o-mini-tts",
-        voice=voice,
-        input=text,
-    )
-
-    # Define the path for the output audio file
-    speech_file_path = Path(output_audio_file)
-
-    # Stream the generated audio to the output file
-    response.stream_to_file(speech_file_path)
+    synthesize_openai(client, text, output_audio_file, voice, OPENAI_TTS_MODEL)
 
     print(f"Generated English audio saved as '{output_audio_file}'")
 
-# Function to generate audio using ElevenLabs API
+# Function to generate audio using ElevenLabs API (chunked, streamed and cached, see chunked_tts)
 def generate_audio_with_elevenlabs(text_file, output_audio_file):
     with open(text_file, "r", encoding="utf-8") as f:
         text = f.read()
 
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{ELEVENLABS_VOICE_ID}"
-    headers = {"xi-api-key": ELEVENLABS_API_KEY, "Content-Type": "application/json"}
-    data = {"text": text, "voice_settings": {"stability": 0.5, "similarity_boost": 0.8}}
-
     print("Generating English audio using ElevenLabs API...")
-    response = requests.post(url, json=data, headers=headers)
-    with open(output_audio_file, "wb") as f:
-        f.write(response.content)
+    synthesize_elevenlabs(text, output_audio_file, ELEVENLABS_VOICE_ID, ELEVENLABS_API_KEY, ELEVENLABS_VOICE_SETTINGS)
 
     print(f"Generated English audio saved as '{output_audio_file}'")
 
 
-# Main function
-def main():
-    input_file_path, file_type, output_folder_path = select_input_file()
-    if not input_file_path:
-        return
-
+# Function to run the whole transcribe -> translate -> TTS pipeline for one prepared input file.
+# The steps run as stages (see stage_runner): muting the video runs alongside the rest, and stages whose
+# inputs and settings are unchanged since the last run are skipped. Returns the output folder, or None
+# if a step failed.
+def translate_media(input_file_path, file_type, output_folder_path):
+    input_file_path = str(input_file_path)
     # Define output file paths
-    audio_org_path = output_folder_path / "audio_org.mp3"
-    script_org_path = output_folder_path / "script_org.txt"
-    script_trans_path = output_folder_path / "script_trans.txt"
-    audio_trans_path = output_folder_path / "audio_trans.mp3"
-
-    if file_type == 'video':
-        print(f"Processing video file: {input_file_path}")
-        video_org_path = output_folder_path / "video_org.mp4"
-        video_org_muted_path = output_folder_path / "video_org_muted.mp4"
-        
-        # Copy original video
-        print(f"Copying video to {video_org_path}")
-        shutil.copy(input_file_path, video_org_path)
-
-        # Create muted video
-        print(f"Creating muted video {video_org_muted_path}")
-        try:
-             subprocess.run(['ffmpeg', '-i', str(input_file_path), '-an', '-c:v', 'copy', '-y', str(video_org_muted_path)],
-                           check=True, capture_output=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error creating muted video with ffmpeg: {e}")
-            print(f"Stderr: {e.stderr.decode()}")
-            # Decide if we should stop or continue if muting fails
-            # return # Uncomment to stop if muting fails
-        except FileNotFoundError:
-            print("Error: ffmpeg not found. Please ensure ffmpeg is installed and in your system's PATH.")
-            return
+    script_org_path = str(output_folder_path / "script_org.txt")
+    script_trans_path = str(output_folder_path / "script_trans.txt")
+    audio_trans_path = str(output_folder_path / "audio_trans.mp3")
 
-        # Extract audio from video
-        print(f"Extracting audio to {audio_org_path}")
-        try:
-            subprocess.run(['ffmpeg', '-i', str(input_file_path), '-vn', '-acodec', 'libmp3lame', '-y', str(audio_org_path)],
-                           check=True, capture_output=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error extracting audio with ffmpeg: {e}")
-            print(f"Stderr: {e.stderr.decode()}")
-            return
-        except FileNotFoundError:
-            print("Error: ffmpeg not found. Please ensure ffmpeg is installed and in your system's PATH.")
-            return
-            
-        audio_path_for_transcription = audio_org_path
-
-    elif file_type == 'audio':
-        print(f"Processing audio file: {input_file_path}")
-        # Copy original audio
-        print(f"Copying audio to {audio_org_path}")
-        shutil.copy(input_file_path, audio_org_path)
-        audio_path_for_transcription = audio_org_path
-        
-    else:
+    if file_type not in ('video', 'audio'):
         # This case should ideally not be reached due to checks in select_input_file
         print("Invalid file type determined.")
-        return
-
-    # Transcribe
-    transcribe_audio(str(audio_path_for_transcription), str(script_org_path))
-    
-    # Translate
-    translate_text(str(script_org_path), str(script_trans_path))
-    
-    # Generate Translated Audio
-    generate_audio_with_openai_tts(str(script_trans_path), str(audio_trans_path), voice=OPENAI_TTS_VOICE_ID)
-    
-    # Or use ElevenLabs:
-    # generate_audio_with_elevenlabs(str(script_trans_path), str(audio_trans_path))
+        return None
+    print(f"Processing {file_type} file: {input_file_path}")
+
+    # Reference the original (link or manifest, no copy unless configured; see original_media)
+    try:
+        org_path = reference_original(input_file_path, output_folder_path, f"{file_type}_org")
+    except OSError as e:
+        print(f"Error referencing original {file_type}: {e}")
+        return None
+    print(f"Original {file_type} referenced as {org_path}")
+
+    def mute():
+        # Same container as the source, so the stream copy fits and the name does not lie about the format
+        video_org_muted_path = str(output_folder_path / ("video_org_muted" + Path(input_file_path).suffix.lower()))
+        print(f"Creating muted video {video_org_muted_path}")
+        subprocess.run(['ffmpeg', '-i', input_file_path, '-an', '-c:v', 'copy', '-y', video_org_muted_path],
+                       check=True, capture_output=True)
+        return video_org_muted_path
+
+    def extract():
+        if file_type == 'video':
+            # 16 kHz mono Opus or a stream copy, see transcription_audio
+            print(f"Extracting audio for transcription to {output_folder_path}")
+            return str(extract_transcription_audio(input_file_path, output_folder_path / "audio_org"))
+        # Uploaded as is when already compact, otherwise converted to the transcription profile
+        return str(extract_transcription_audio(input_file_path, output_folder_path / "audio_upload", reuse_input=True))
+
+    def transcribe(audio_path):
+        transcribe_audio(audio_path, script_org_path, source_path=input_file_path)
+        return script_org_path
+
+    def translate(script_path):
+        translate_text(script_path, script_trans_path)
+        return script_trans_path
+
+    def speak(script_path):
+        generate_audio_with_openai_tts(script_path, audio_trans_path, voice=OPENAI_TTS_VOICE_ID)
+        # Or use ElevenLabs (and params={"provider": "elevenlabs", "voice": ELEVENLABS_VOICE_ID} below):
+        # generate_audio_with_elevenlabs(script_path, audio_trans_path)
+        return audio_trans_path
+
+    # Muting only needs the input, so it runs alongside extraction and everything after it
+    stages = [Stage("mute", mute, inputs=[input_file_path])] if file_type == 'video' else []
+    stages += [
+        Stage("extract", extract, inputs=[input_file_path], params=extraction_signature()),
+        Stage("transcribe", transcribe, deps=["extract"], params=TRANSCRIPTION_MODEL),
+        Stage("translate", translate, deps=["transcribe"],
+              params=[TRANSLATION_MODEL, TARGET_LANGUAGE, TRANSLATION_CHUNK_TOKENS, TRANSLATION_CONTEXT_TOKENS]),
+        Stage("tts", speak, deps=["translate"], params={"provider": "openai", "model": OPENAI_TTS_MODEL, "voice": OPENAI_TTS_VOICE_ID}),
+    ]
+
+    _, failures = run_stages(stages, output_folder_path)
+    for name, e in failures.items():
+        if isinstance(e, FileNotFoundError) and name in ("mute", "extract"):
+            print("Error: ffmpeg not found. Please ensure ffmpeg is installed and in your system's PATH.")
+        else:
+            print(f"Error in stage '{name}': {e}")
+        if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+            print(f"Stderr: {e.stderr.decode()}")
+    # A failed mute does not affect the translation
+    if set(failures) - {"mute"}:
+        return None
 
     print("\nProcessing complete.")
     print(f"Output files are located in: {output_folder_path}")
+    return output_folder_path
+
+
+# Main function
+def main():
+    input_file_path, file_type, output_folder_path = select_input_file()
+    if not input_file_path:
+        return
+    translate_media(input_file_path, file_type, output_folder_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+"""Chunked transcription of long media, shared by 01_audio2text and 03_video2translated.
+
+Long files are split at silences and the chunks are transcribed concurrently, so a long file costs
+roughly one chunk's latency and never hits the upload size limit. Nothing is held for the whole
+file: the silence search streams the decoded audio through ffmpeg and keeps only one RMS value per
+RMS_FRAME_MS, and each chunk is extracted with ffmpeg -ss/-t right before its request is sent, so
+memory is bounded by the chunks in flight. The callers pass their own request function (model,
+response format, sync or async client); timestamps of the chunk transcripts are shifted back by each
+chunk's offset when they are stitched together.
+"""
+import io
+import json
+import os
+import re
+import subprocess
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+# "auto" = chunk files longer than CHUNK_MIN_DURATION or larger than UPLOAD_LIMIT_BYTES; "always"; "never"
+CHUNKED_TRANSCRIPTION = "auto"
+UPLOAD_LIMIT_BYTES = 25 * 1024 * 1024
+CHUNK_MIN_DURATION = 600 # seconds
+TARGET_CHUNK_SECONDS = 300
+# Split points are searched for this many seconds on either side of each target boundary
+SPLIT_SEARCH_SECONDS = 30
+CHUNK_SAMPLE_RATE = 16000 # Mono 16-bit PCM: 32 KB/s, so a chunk stays far below the upload limit
+RMS_FRAME_MS = 20
+# Pauses are found on RMS smoothed over this window, preferring real pauses over a single quiet frame
+SILENCE_WINDOW_MS = 300
+TRANSCRIBE_WORKERS = 8
+# Decoded PCM read per step of the silence search
+_READ_SECONDS = 10
+
+
+def get_media_duration(path):
+    """Duration in seconds from ffprobe, or None if it cannot be determined."""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+            capture_output=True, text=True, check=True
+        )
+        return float(result.stdout.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def should_chunk(audio_path):
+    """Decides whether audio_path is transcribed in chunks (see CHUNKED_TRANSCRIPTION)."""
+    if CHUNKED_TRANSCRIPTION != "auto":
+        return CHUNKED_TRANSCRIPTION == "always"
+    if os.path.getsize(audio_path) > UPLOAD_LIMIT_BYTES:
+        return True
+    duration = get_media_duration(audio_path)
+    return duration is not None and duration > CHUNK_MIN_DURATION
+
+
+def frame_rms(audio_path, sample_rate=CHUNK_SAMPLE_RATE):
+    """Streams the audio through ffmpeg (mono 16-bit PCM) and returns (RMS per RMS_FRAME_MS frame, duration in seconds).
+
+    Raises subprocess.CalledProcessError if ffmpeg fails.
+    """
+    import numpy as np
+    frame = sample_rate * RMS_FRAME_MS // 1000
+    frame_bytes = frame * 2
+    cmd = ['ffmpeg', '-v', 'error', '-i', audio_path, '-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', '-']
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    values = []
+    total_bytes = 0
+    pending = b""
+    try:
+        for block in iter(lambda: process.stdout.read(_READ_SECONDS * sample_rate * 2), b""):
+            total_bytes += len(block)
+            data = pending + block
+            usable = len(data) - len(data) % frame_bytes
+            frames = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32).reshape(-1, frame)
+            values.append(np.sqrt(np.mean(frames * frames, axis=1)))
+            pending = data[usable:]
+    finally:
+        # With -v error stderr stays small, so reading it after stdout cannot deadlock
+        stderr = process.stderr.read()
+        returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+    rms = np.concatenate(values) if values else np.zeros(0, dtype=np.float32)
+    return rms, total_bytes / 2 / sample_rate
+
+
+def find_split_points(rms, target_seconds=TARGET_CHUNK_SECONDS, search_seconds=SPLIT_SEARCH_SECONDS):
+    """Times (seconds) at which to cut, each placed in the quietest stretch near a multiple of target_seconds."""
+    import numpy as np
+    num_frames = len(rms)
+    if num_frames == 0:
+        return []
+    window = max(1, SILENCE_WINDOW_MS // RMS_FRAME_MS)
+    smoothed = np.convolve(rms, np.ones(window, dtype=np.float32) / window, mode="same")
+
+    frames_per_second = 1000 / RMS_FRAME_MS
+    target = int(target_seconds * frames_per_second)
+    search = int(search_seconds * frames_per_second)
+    splits = []
+    previous = 0
+    # Stop once the rest fits into one chunk; a tiny last chunk would only add a request
+    while num_frames - previous > target + search:
+        low = max(previous + target - search, previous + 1)
+        high = min(previous + target + search, num_frames - 1)
+        split = low + int(np.argmin(smoothed[low:high]))
+        splits.append(split / frames_per_second)
+        previous = split
+    return splits
+
+
+def plan_chunks(audio_path):
+    """Finds the split points of the audio. Returns a list of (start, duration) in seconds."""
+    rms, duration = frame_rms(audio_path)
+    bounds = [0.0] + find_split_points(rms) + [duration]
+    return [(start, end - start) for start, end in zip(bounds, bounds[1:])]
+
+
+def extract_chunk(audio_path, index, start, duration, sample_rate=CHUNK_SAMPLE_RATE):
+    """Decodes one chunk to a mono WAV. Returns (filename, WAV bytes) as accepted by the transcription API."""
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-ss', f"{start:.3f}", '-t', f"{duration:.3f}", '-i', audio_path,
+         '-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', '-'],
+        capture_output=True, check=True
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(result.stdout)
+    return f"chunk_{index:04d}.wav", buffer.getvalue()
+
+
+def _shift_timestamp(match, offset, separator):
+    hours, minutes, seconds, millis = (int(group) for group in match.groups())
+    total = max(0, round((hours * 3600 + minutes * 60 + seconds) * 1000 + millis + offset * 1000))
+    return f"{total // 3600000:02d}:{total // 60000 % 60:02d}:{total // 1000 % 60:02d}{separator}{total % 1000:03d}"
+
+
+def stitch_transcripts(parts, offsets, response_format="text"):
+    """Joins per-chunk transcripts in order, shifting timestamps by each chunk's start offset (seconds)."""
+    if response_format == "verbose_json":
+        merged = {"text": "", "segments": [], "words": []}
+        for part, offset in zip(parts, offsets):
+            data = json.loads(part)
+            merged["text"] = " ".join(filter(None, [merged["text"], data.get("text", "").strip()]))
+            for key in ("segments", "words"):
+                for item in data.get(key) or []:
+                    item["start"] = item["start"] + offset
+                    item["end"] = item["end"] + offset
+                    merged[key].append(item)
+        merged["duration"] = offsets[-1] + json.loads(parts[-1]).get("duration", 0) if parts else 0
+        return json.dumps(merged, ensure_ascii=False, indent=1)
+    if response_format in ("srt", "vtt"):
+        separator = "," if response_format == "srt" else "."
+        pattern = re.compile(r"(\d{2}):(\d{2}):(\d{2})[,.](\d{3})")
+        cues = []
+        for part, offset in zip(parts, offsets):
+            for block in re.split(r"\n\s*\n", part.strip()):
+                lines = [line for line in block.splitlines() if line.strip()]
+                if response_format == "srt" and lines and lines[0].strip().isdigit():
+                    lines = lines[1:] # Cue numbers are reassigned below
+                if not lines or lines[0].startswith("WEBVTT") or "-->" not in lines[0]:
+                    continue
+                lines[0] = pattern.sub(lambda m: _shift_timestamp(m, offset, separator), lines[0])
+                cues.append("\n".join(lines))
+        if response_format == "srt":
+            return "\n\n".join(f"{i}\n{cue}" for i, cue in enumerate(cues, start=1)) + "\n"
+        return "WEBVTT\n\n" + "\n\n".join(cues) + "\n"
+    return "\n".join(part.strip() for part in parts)
+
+
+def transcribe_chunked(audio_path, request, response_format="text", max_workers=TRANSCRIBE_WORKERS):
+    """Splits the audio at silences and transcribes the chunks concurrently with request((filename, bytes)).
+
+    Each worker extracts its chunk right before sending it. Returns the stitched transcript.
+    """
+    chunks = plan_chunks(audio_path)
+    print(f"Transcribing audio in {len(chunks)} chunk(s) with {min(max_workers, len(chunks))} parallel request(s)...")
+
+    def transcribe_one(index):
+        start, duration = chunks[index]
+        return request(extract_chunk(audio_path, index, start, duration))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map keeps the chunk order regardless of which request finishes first
+        parts = list(executor.map(transcribe_one, range(len(chunks))))
+    return stitch_transcripts(parts, [start for start, _ in chunks], response_format)
+
+
+def transcribe_file(audio_path, request, response_format="text"):
+    """Transcribes audio_path with request(file), in chunks when should_chunk() says so. Returns the transcript."""
+    if should_chunk(audio_path):
+        return transcribe_chunked(audio_path, request, response_format)
+    with open(audio_path, "rb") as audio_file:
+        return request(audio_file)
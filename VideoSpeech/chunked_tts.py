@@ -0,0 +1,247 @@
+"""Chunked, streamed and cached speech synthesis, shared by 02_text2speech and 03_video2translated.
+
+The text is split at paragraph and sentence boundaries into chunks well below each provider's input
+limit, and the chunks are requested in parallel as raw PCM. Each response is streamed, and the
+chunks are fed in order to one ffmpeg encoder (and to ffplay if PLAY_WHILE_GENERATING) as soon as
+each is ready, so the audio is encoded once and memory is bounded by the chunks in flight. Every
+chunk is looked up in the TTS cache first (see tts_cache); chunk boundaries depend only on the
+sentences around them, so editing one sentence only requests the chunk(s) around it again.
+"""
+import hashlib
+import os
+import re
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import tts_cache
+
+# Input limit per request of each provider (characters)
+PROVIDER_MAX_CHARS = {"openai": 4096, "elevenlabs": 5000}
+# Maximum chunk size the text is split into (smaller chunks = more parallelism, more requests)
+TTS_CHUNK_CHARS = 1500
+# A chunk ends after a sentence whose hash is a multiple of this (about one sentence in this many),
+# so chunk boundaries only depend on the sentences around them (see split_text)
+CHUNK_ANCHOR_SENTENCES = 8
+TTS_WORKERS = 4
+# Chunks are requested as raw 16-bit mono PCM, joined without re-encoding and encoded once at the end
+PCM_SAMPLE_RATE = 24000
+# Each chunk's own leading/trailing silence is trimmed and replaced by these fixed gaps
+SENTENCE_GAP_MS = 250
+PARAGRAPH_GAP_MS = 700
+SILENCE_THRESHOLD = 300 # Sample amplitude (of 32767) below which audio counts as silence
+SILENCE_KEEP_MS = 40 # Kept on both sides of the speech so soft onsets and decays are not clipped
+# Size of the first chunk, kept small so the first audio arrives quickly
+FIRST_CHUNK_CHARS = 300
+# Responses are streamed and read in pieces of this size as they arrive
+STREAM_CHUNK_BYTES = 64 * 1024
+# Also pipe the audio to ffplay while it is being generated
+PLAY_WHILE_GENERATING = False
+ELEVENLABS_STREAM_URL = "https://api.elevenlabs.io/v1/text-to-speech/{voice_id}/stream"
+
+_http_session = None
+
+
+def is_anchor_sentence(sentence):
+    """Whether a chunk ends after this sentence, decided by the sentence's own text."""
+    digest = hashlib.blake2b(tts_cache.normalize_text(sentence).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % CHUNK_ANCHOR_SENTENCES == 0
+
+
+def split_text(text, max_chars, first_max_chars=None):
+    """Splits text into chunks of at most max_chars at paragraph and sentence boundaries.
+
+    Very long sentences are cut at words. Within a paragraph a chunk ends after an anchor sentence
+    (is_anchor_sentence) or when the next sentence would not fit, never at a fixed count from the
+    start, so editing one sentence only changes the chunk(s) around it. The first chunk only gets
+    more sentences while it stays within first_max_chars. Returns a list of (chunk text, whether
+    the chunk ends a paragraph).
+    """
+    chunks = []
+
+    def limit():
+        return first_max_chars if first_max_chars and not chunks else max_chars
+
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        pieces = []
+        for sentence in re.split(r"(?<=[.!?…。！？])[\"'”’)]*\s+", paragraph):
+            # Sentences longer than a chunk are cut at word boundaries (or hard-cut, for very long words)
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars + 1)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut].strip())
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+
+        current = ""
+        for i, piece in enumerate(pieces):
+            if current and len(current) + 1 + len(piece) > limit():
+                chunks.append((current, False))
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+            if i < len(pieces) - 1 and is_anchor_sentence(piece):
+                chunks.append((current, False))
+                current = ""
+        chunks.append((current, True))
+    return chunks
+
+
+def trim_silence(pcm):
+    """Cuts the leading and trailing silence off 16-bit PCM audio."""
+    import numpy as np
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    loud = np.flatnonzero(np.abs(samples.astype(np.int32)) > SILENCE_THRESHOLD)
+    if loud.size == 0:
+        return b""
+    keep = PCM_SAMPLE_RATE * SILENCE_KEEP_MS // 1000
+    return samples[max(0, loud[0] - keep):loud[-1] + 1 + keep].tobytes()
+
+
+def open_player(input_args):
+    """Starts ffplay reading audio from stdin (input_args describe the format), or returns None if unavailable."""
+    try:
+        return subprocess.Popen(['ffplay', '-nodisp', '-autoexit', '-loglevel', 'error'] + input_args + ['-i', '-'],
+                                stdin=subprocess.PIPE)
+    except FileNotFoundError:
+        print("ffplay not found; not playing while generating.")
+        return None
+
+
+def feed(streams, data):
+    """Writes audio data to a list of open binary streams. A player that was closed is dropped."""
+    for stream in list(streams):
+        try:
+            stream.write(data)
+        except (BrokenPipeError, OSError):
+            if stream is streams[0]:
+                raise # The output itself failed
+            streams.remove(stream)
+
+
+def close_player(player):
+    """Closes a player's input and waits for it to finish playing."""
+    if player:
+        try:
+            player.stdin.close()
+        except OSError:
+            pass
+        player.wait()
+
+
+def _remove_partial(output_audio_file):
+    try:
+        os.remove(output_audio_file)
+    except OSError:
+        pass # Not created yet
+
+
+def synthesize_in_chunks(text, output_audio_file, synthesize_pcm, max_chars, cache_params):
+    """Synthesizes text chunk by chunk in parallel with synthesize_pcm(chunk text) -> PCM, into output_audio_file.
+
+    The chunks are fed in order to a single ffmpeg encoder as soon as each one (and all before it)
+    is ready: the PCM is joined losslessly with fixed gaps (longer at paragraph ends) and encoded
+    only once, into the format of output_audio_file. Chunks already synthesized with the same
+    cache_params (provider, voice, model, settings) are read from the TTS cache instead of being
+    requested again. Returns the number of chunks. Raises ValueError if the text is empty; on any
+    failure the partly written output_audio_file is removed.
+    """
+    # A short first chunk gets the first audio out quickly
+    chunks = split_text(text, max_chars, first_max_chars=FIRST_CHUNK_CHARS)
+    if not chunks:
+        raise ValueError("The text is empty, there is nothing to synthesize")
+    print(f"Synthesizing {len(chunks)} chunk(s) with up to {TTS_WORKERS} parallel request(s)...")
+
+    cache_hits = []
+    def synthesize_cached(chunk):
+        key = tts_cache.cache_key(chunk, sample_rate=PCM_SAMPLE_RATE, **cache_params)
+        pcm = tts_cache.get(key)
+        if pcm is not None:
+            cache_hits.append(key)
+            return pcm
+        pcm = synthesize_pcm(chunk)
+        tts_cache.put(key, pcm)
+        return pcm
+
+    pcm_args = ['-f', 's16le', '-ar', str(PCM_SAMPLE_RATE), '-ac', '1']
+    encode_cmd = ['ffmpeg', '-v', 'error'] + pcm_args + ['-i', '-', '-y', str(output_audio_file)]
+    encoder = subprocess.Popen(encode_cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    player = open_player(pcm_args) if PLAY_WHILE_GENERATING else None
+    streams = [encoder.stdin] + ([player.stdin] if player else [])
+    executor = ThreadPoolExecutor(max_workers=TTS_WORKERS)
+    try:
+        # Only a window of chunks is requested ahead of the one being written, which bounds the audio held in memory
+        pending = deque()
+        for i, (chunk, paragraph_end) in enumerate(chunks):
+            while len(pending) < TTS_WORKERS * 2 and i + len(pending) < len(chunks):
+                pending.append(executor.submit(synthesize_cached, chunks[i + len(pending)][0]))
+            pcm = trim_silence(pending.popleft().result())
+            if i > 0:
+                gap_ms = PARAGRAPH_GAP_MS if chunks[i - 1][1] else SENTENCE_GAP_MS
+                feed(streams, b"\x00\x00" * (PCM_SAMPLE_RATE * gap_ms // 1000))
+            feed(streams, pcm)
+    except BaseException:
+        executor.shutdown(wait=False, cancel_futures=True)
+        encoder.kill()
+        encoder.wait()
+        if player:
+            player.kill()
+        _remove_partial(output_audio_file)
+        raise
+    executor.shutdown()
+    encoder.stdin.close()
+    stderr = encoder.stderr.read()
+    if encoder.wait() != 0:
+        _remove_partial(output_audio_file)
+        raise subprocess.CalledProcessError(encoder.returncode, encode_cmd, stderr=stderr)
+    close_player(player)
+    if cache_hits:
+        print(f"Reused {len(cache_hits)} of {len(chunks)} chunk(s) from the TTS cache.")
+    return len(chunks)
+
+
+def get_http_session():
+    """The HTTP session shared by all ElevenLabs requests (keeps connections open between chunks)."""
+    global _http_session
+    if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _http_session = requests.Session()
+        _http_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=TTS_WORKERS))
+    return _http_session
+
+
+def synthesize_openai(client, text, output_audio_file, voice, model):
+    """Synthesizes text with the OpenAI TTS API into output_audio_file. Returns the number of chunks."""
+    def synthesize_pcm(chunk):
+        with client.audio.speech.with_streaming_response.create(
+            model=model, voice=voice, input=chunk, response_format="pcm"
+        ) as response:
+            return b"".join(response.iter_bytes(STREAM_CHUNK_BYTES))
+    max_chars = min(TTS_CHUNK_CHARS, PROVIDER_MAX_CHARS["openai"])
+    cache_params = {"provider": "openai", "voice": voice, "model": model}
+    return synthesize_in_chunks(text, output_audio_file, synthesize_pcm, max_chars, cache_params)
+
+
+def synthesize_elevenlabs(text, output_audio_file, voice_id, api_key, voice_settings):
+    """Synthesizes text with the ElevenLabs streaming API into output_audio_file. Returns the number of chunks.
+
+    Raises RuntimeError with the API's message if a request fails.
+    """
+    url = ELEVENLABS_STREAM_URL.format(voice_id=voice_id)
+    headers = {"xi-api-key": api_key, "Content-Type": "application/json"}
+    session = get_http_session()
+
+    def synthesize_pcm(chunk):
+        with session.post(url, params={"output_format": f"pcm_{PCM_SAMPLE_RATE}"},
+                          json={"text": chunk, "voice_settings": voice_settings}, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                raise RuntimeError(response.text)
+            return b"".join(response.iter_content(STREAM_CHUNK_BYTES))
+    max_chars = min(TTS_CHUNK_CHARS, PROVIDER_MAX_CHARS["elevenlabs"])
+    cache_params = {"provider": "elevenlabs", "voice": voice_id, "model": None, "settings": voice_settings}
+    return synthesize_in_chunks(text, output_audio_file, synthesize_pcm, max_chars, cache_params)
@@ -0,0 +1,77 @@
+"""References to the original input media inside the OUTPUT folders.
+
+Copying a multi-GB source video into OUTPUT/... is a full sequential read and write before any
+real work starts. The original is instead referenced by the cheapest means available: a reflink
+(copy-on-write clone, btrfs/XFS/APFS), a hardlink (same filesystem), a symlink, or finally a small
+JSON manifest pointing at the source. A real copy is only made when asked for. The reference keeps
+the source's extension, so a .mkv input is not presented as .mp4.
+"""
+import json
+import os
+import shutil
+
+# "auto" = reflink, then hardlink, then symlink, then manifest; or one of
+# "reflink", "hardlink", "symlink", "manifest", "copy" (a real, independent copy)
+ORIGINAL_MEDIA_MODE = "auto"
+MANIFEST_SUFFIX = ".source.json"
+
+# ioctl request number of FICLONE from <linux/fs.h>
+_FICLONE = 0x40049409
+_AUTO_ORDER = ("reflink", "hardlink", "symlink", "manifest")
+
+
+def _reflink(src_path, dest_path):
+    import fcntl # POSIX only; ImportError on Windows counts as "unsupported"
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        fcntl.ioctl(dest.fileno(), _FICLONE, src.fileno())
+
+
+def _write_manifest(src_path, manifest_path):
+    st = os.stat(src_path)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.abspath(src_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}, f, indent=1)
+
+
+def _create(method, src_path, dest_path):
+    if method == "reflink":
+        _reflink(src_path, dest_path)
+    elif method == "hardlink":
+        os.link(src_path, dest_path)
+    elif method == "symlink":
+        os.symlink(os.path.abspath(src_path), dest_path)
+    elif method == "copy":
+        shutil.copy2(src_path, dest_path)
+    else:
+        raise ValueError(f"Unknown original media mode: {method}")
+
+
+def reference_original(src_path, output_dir, base_name, mode=ORIGINAL_MEDIA_MODE):
+    """Places a reference to src_path in output_dir as base_name + the source's extension.
+
+    Returns the path that was created (the manifest path in "manifest" mode). Raises OSError if no
+    method of the mode succeeded.
+    """
+    src_path = os.fspath(src_path)
+    extension = os.path.splitext(src_path)[1].lower()
+    dest_path = os.path.join(output_dir, base_name + extension)
+    if mode != "copy" and os.path.exists(dest_path) and os.path.samefile(src_path, dest_path):
+        return dest_path # Already linked by a previous run (renaming a hardlink onto itself would be a no-op)
+    last_error = None
+    for method in (_AUTO_ORDER if mode == "auto" else (mode,)):
+        if method == "manifest":
+            manifest_path = os.path.join(output_dir, base_name + extension + MANIFEST_SUFFIX)
+            _write_manifest(src_path, manifest_path)
+            return manifest_path
+        # Create under a temporary name and replace, so a rerun overwrites the previous output
+        tmp_path = dest_path + ".tmp"
+        try:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            _create(method, src_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+            return dest_path
+        except (OSError, ImportError) as e:
+            last_error = e
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+    raise OSError(f"Could not reference {src_path} in {output_dir} ({mode}): {last_error}")
@@ -0,0 +1,122 @@
+"""Runs a pipeline as a DAG of stages, concurrently and skipping stages whose inputs are unchanged.
+
+Each stage is a function of the results of the stages it depends on, returning the path (or list
+of paths) it produced, or None. Results are normalized to a str, a list of str or None, the form in
+which they are stored, so dependents get the same types whether a stage ran or was skipped. A stage's signature is a hash of its name, its parameters, the
+content of its input files and the content of its dependencies' outputs. The signature and output
+hashes of every completed stage are stored in a state file in the output folder; on a re-run a
+stage is skipped when its signature matches and its outputs are still there unmodified, so e.g. a
+new TTS voice only re-runs the TTS stage. Stages are started as soon as their dependencies are done,
+so independent stages (muting the video, extracting the audio) run at the same time. A failed stage
+only stops the stages that depend on it; everything completed is kept for the next run.
+
+File hashes are transcription_cache.content_hash, so each file is only read again after it changed.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from transcription_cache import content_hash
+
+STATE_FILENAME = ".stages.json"
+STAGE_WORKERS = 3
+
+# deps: names of the stages whose results are passed to func, in order; inputs: files read by the
+# stage that no stage produces; params: anything else the output depends on (must be JSON-serializable)
+Stage = namedtuple("Stage", "name func deps inputs params", defaults=((), (), None))
+
+
+def _output_paths(result):
+    if result is None:
+        return []
+    return [os.fspath(result)] if isinstance(result, (str, os.PathLike)) else [os.fspath(p) for p in result]
+
+
+def _normalize_result(result):
+    # A single path becomes a str, any other collection of paths a list of str
+    if result is None or isinstance(result, (str, os.PathLike)):
+        return None if result is None else os.fspath(result)
+    return _output_paths(result)
+
+
+def _output_hashes(result):
+    return [[path, content_hash(path)] for path in _output_paths(result)]
+
+
+def _signature(stage, dep_outputs):
+    parts = {
+        "name": stage.name,
+        "params": stage.params,
+        "inputs": [content_hash(path) for path in stage.inputs],
+        "deps": [[output_hash for _, output_hash in outputs] for outputs in dep_outputs],
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _is_current(record, signature):
+    if not record or record["signature"] != signature:
+        return False
+    try:
+        return all(content_hash(path) == output_hash for path, output_hash in record["outputs"])
+    except OSError:
+        return False # An output was deleted
+
+
+def run_stages(stages, state_dir, max_workers=STAGE_WORKERS):
+    """Runs stages (a list of Stage, dependencies listed before dependents) with state kept in state_dir.
+
+    Returns (results, failures): the result of each completed stage by name (normalized to a str, a
+    list of str or None), and the exception of each failed stage by name. Stages depending on a failed stage are neither run nor reported.
+    """
+    state_path = os.path.join(state_dir, STATE_FILENAME)
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state_lock = threading.Lock()
+    # Output hashes of the completed stages, what dependents' signatures are made of
+    outputs = {}
+
+    def run(stage, dep_results):
+        signature = _signature(stage, [outputs[dep] for dep in stage.deps])
+        record = state.get(stage.name)
+        if _is_current(record, signature):
+            print(f"Stage '{stage.name}' is up to date, skipping.")
+            result = record["result"]
+        else:
+            result = _normalize_result(stage.func(*dep_results))
+            record = {"signature": signature, "outputs": _output_hashes(result), "result": result}
+            with state_lock:
+                state[stage.name] = record
+                tmp_path = f"{state_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(state, f, indent=1)
+                os.replace(tmp_path, state_path)
+        outputs[stage.name] = record["outputs"]
+        return result
+
+    results, failures = {}, {}
+    waiting = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while waiting or running:
+            for stage in list(waiting):
+                if any(dep in failures for dep in stage.deps):
+                    waiting.remove(stage) # Blocked by a failed dependency
+                elif all(dep in results for dep in stage.deps):
+                    waiting.remove(stage)
+                    running[executor.submit(run, stage, [results[dep] for dep in stage.deps])] = stage.name
+            if not running:
+                break # Only stages with unknown dependencies are left
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    failures[name] = e
+    return results, failures
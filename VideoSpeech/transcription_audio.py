@@ -0,0 +1,83 @@
+"""Audio extraction profile for speech recognition uploads.
+
+Speech models only need 16 kHz mono, so instead of re-encoding the full track to stereo MP3 the
+audio is encoded to low-bitrate Opus (a speech codec; roughly 10 MB per hour at 24 kbit/s), or
+stream-copied without re-encoding when the source track is already in an accepted, compact format.
+Leading and trailing silence can optionally be trimmed before upload.
+"""
+import json
+import os
+import subprocess
+
+# "auto" = stream copy when the source track is acceptable (see below), Opus otherwise; "opus" = always re-encode
+EXTRACTION_PROFILE = "auto"
+OPUS_BITRATE = "24k"
+SAMPLE_RATE = 16000
+# Source codecs the transcription API accepts as-is, with the container they are copied into
+COPYABLE_CODECS = {"opus": ".ogg", "vorbis": ".ogg", "aac": ".m4a", "mp3": ".mp3"}
+# Tracks above this bitrate are re-encoded anyway; the smaller upload outweighs the encode time
+COPY_MAX_BITRATE = 96000
+# Trim leading/trailing silence before upload. Shifts transcript timestamps by the trimmed lead-in,
+# and the trailing trim buffers the (16 kHz mono) track in memory.
+TRIM_SILENCE = False
+SILENCE_THRESHOLD = "-50dB"
+SILENCE_MIN_SECONDS = 0.5
+
+
+def extraction_signature():
+    """The settings that change the extracted audio (part of the transcription cache key)."""
+    return f"{EXTRACTION_PROFILE}:{SAMPLE_RATE}:{OPUS_BITRATE}:{COPY_MAX_BITRATE}:{TRIM_SILENCE}:{SILENCE_THRESHOLD}:{SILENCE_MIN_SECONDS}"
+
+
+def probe_audio_stream(path):
+    """Returns the first audio stream's ffprobe dict, or None if the file has no audio."""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'a:0', '-show_entries',
+         'stream=codec_name,sample_rate,channels,bit_rate', '-of', 'json', path],
+        capture_output=True, text=True, check=True
+    )
+    streams = json.loads(result.stdout).get("streams") or []
+    return streams[0] if streams else None
+
+
+def _trim_filter():
+    silence = f"start_periods=1:start_threshold={SILENCE_THRESHOLD}:start_silence={SILENCE_MIN_SECONDS}"
+    # silenceremove only trims the start; reversing twice applies it to the end as well.
+    # Downmix/resample first so areverse buffers the small 16 kHz mono track.
+    return (f"aformat=sample_rates={SAMPLE_RATE}:channel_layouts=mono,"
+            f"silenceremove={silence},areverse,silenceremove={silence},areverse")
+
+
+def build_extraction_command(input_path, output_base, stream):
+    """Returns (ffmpeg command, output path). output_base is the output path without extension."""
+    codec = stream.get("codec_name")
+    bit_rate = int(stream.get("bit_rate") or 0)
+    if (EXTRACTION_PROFILE == "auto" and not TRIM_SILENCE and codec in COPYABLE_CODECS
+            and 0 < bit_rate <= COPY_MAX_BITRATE):
+        output_path = output_base + COPYABLE_CODECS[codec]
+        return ['ffmpeg', '-v', 'error', '-i', input_path, '-map', '0:a:0', '-vn', '-c:a', 'copy', '-y', output_path], output_path
+
+    output_path = output_base + ".ogg"
+    cmd = ['ffmpeg', '-v', 'error', '-i', input_path, '-map', '0:a:0', '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE)]
+    if TRIM_SILENCE:
+        cmd += ['-af', _trim_filter()]
+    cmd += ['-c:a', 'libopus', '-b:a', OPUS_BITRATE, '-application', 'voip', '-y', output_path]
+    return cmd, output_path
+
+
+def extract_transcription_audio(input_path, output_base, reuse_input=False):
+    """Writes the upload audio of a video or audio file to output_base + extension. Returns its path.
+
+    With reuse_input, an audio file that would only be stream-copied into the same container is
+    returned as is. Raises ValueError if the input has no audio track, FileNotFoundError if ffmpeg
+    is missing and subprocess.CalledProcessError if ffprobe/ffmpeg fail.
+    """
+    input_path = os.fspath(input_path)
+    stream = probe_audio_stream(input_path)
+    if stream is None:
+        raise ValueError(f"No audio track found in '{input_path}'")
+    cmd, output_path = build_extraction_command(input_path, os.fspath(output_base), stream)
+    if reuse_input and "copy" in cmd and os.path.splitext(input_path)[1].lower() == os.path.splitext(output_path)[1]:
+        return input_path
+    subprocess.run(cmd, check=True, capture_output=True)
+    return output_path
@@ -0,0 +1,161 @@
+"""Local cache of transcription results, shared by 01_audio2text and 03_video2translated.
+
+Entries are keyed by (content hash of the input media, model, response_format, language, audio
+extraction settings), so re-running a file, or running the same clip under another name, returns
+the stored transcript without calling the API. The content hash of each file is remembered by
+(path, size, mtime), so a multi-GB video is only hashed once. That index is loaded once per process
+and new hashes are appended to it as single JSON lines; it is compacted (superseded lines and
+deleted files dropped) whenever it has doubled since the last compaction, so a batch of n files
+costs O(n) index work. The cache is bounded in size; the least recently used entries are evicted
+first (each hit refreshes the entry's mtime).
+"""
+import hashlib
+import json
+import os
+import threading
+
+CACHE_DIR = os.getenv("TRANSCRIPTION_CACHE_DIR", os.path.join("OUTPUT", ".transcription_cache"))
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Set to False to always call the API (entries are still not written)
+CACHE_ENABLED = True
+HASH_INDEX_FILENAME = "content_hashes.jsonl"
+# The index is not compacted below this many lines
+HASH_INDEX_COMPACT_MIN_LINES = 1000
+ENTRY_SUFFIX = ".txt"
+
+_HASH_CHUNK_SIZE = 4 * 1024 ** 2
+_lock = threading.Lock()
+# In-memory hash index ({absolute path: record}) and its line counts, loaded on first use
+_hash_index = None
+_hash_index_lines = 0
+_hash_index_compacted_lines = 0
+
+
+def _hash_index_path():
+    return os.path.join(CACHE_DIR, HASH_INDEX_FILENAME)
+
+
+def _read_hash_index():
+    """Reads the index file. Returns ({absolute path: record}, number of lines); later lines win."""
+    index = {}
+    lines = 0
+    try:
+        with open(_hash_index_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    index[record.pop("path")] = record
+                except (ValueError, KeyError, AttributeError):
+                    continue # A line cut short by a crash
+                lines += 1
+    except OSError:
+        pass
+    return index, lines
+
+
+def _ensure_hash_index():
+    # Call with _lock held
+    global _hash_index, _hash_index_lines, _hash_index_compacted_lines
+    if _hash_index is None:
+        _hash_index, _hash_index_lines = _read_hash_index()
+        _hash_index_compacted_lines = _hash_index_lines
+    return _hash_index
+
+
+def _add_hash_record(abs_path, record):
+    """Adds a record to the in-memory index and appends it to the index file (compacting now and then)."""
+    global _hash_index_lines
+    with _lock:
+        index = _ensure_hash_index()
+        index[abs_path] = record
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # One write on an O_APPEND file: lines appended by parallel processes do not interleave
+        fd = os.open(_hash_index_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, (json.dumps(dict(record, path=abs_path)) + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+        _hash_index_lines += 1
+        if _hash_index_lines >= max(HASH_INDEX_COMPACT_MIN_LINES, 2 * _hash_index_compacted_lines):
+            _compact_hash_index()
+
+
+def _compact_hash_index():
+    # Call with _lock held. Re-reads the file first to keep the lines other processes appended.
+    global _hash_index, _hash_index_lines, _hash_index_compacted_lines
+    index, _ = _read_hash_index()
+    index.update(_hash_index)
+    # Forget files that no longer exist, so the index does not grow forever
+    index = {path: record for path, record in index.items() if os.path.exists(path)}
+    _write_atomic(_hash_index_path(), "".join(json.dumps(dict(record, path=path)) + "\n" for path, record in index.items()))
+    _hash_index = index
+    _hash_index_lines = _hash_index_compacted_lines = len(index)
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def content_hash(path):
+    """BLAKE2b hex digest of the file contents, reusing the stored digest while size and mtime are unchanged."""
+    abs_path = os.path.abspath(path)
+    st = os.stat(abs_path)
+    with _lock:
+        record = _ensure_hash_index().get(abs_path)
+    if record and record["size"] == st.st_size and record["mtime_ns"] == st.st_mtime_ns:
+        return record["hash"]
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(abs_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    _add_hash_record(abs_path, {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest.hexdigest()})
+    return digest.hexdigest()
+
+
+def cache_key(media_path, model, response_format, language=None, extraction=None):
+    """Cache key of a transcription of media_path with the given request parameters."""
+    parts = [content_hash(media_path), model, response_format, language or "", extraction or ""]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def get(key):
+    """Returns the cached transcript for key (refreshing its LRU position), or None."""
+    if not CACHE_ENABLED:
+        return None
+    entry_path = os.path.join(CACHE_DIR, key + ENTRY_SUFFIX)
+    try:
+        with open(entry_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        os.utime(entry_path)
+        return text
+    except OSError:
+        return None
+
+
+def put(key, text):
+    """Stores a transcript and evicts least recently used entries beyond CACHE_MAX_BYTES."""
+    if not CACHE_ENABLED:
+        return
+    with _lock:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _write_atomic(os.path.join(CACHE_DIR, key + ENTRY_SUFFIX), text)
+        _evict()
+
+
+def _evict():
+    with os.scandir(CACHE_DIR) as entries:
+        files = [(e.stat().st_mtime_ns, e.stat().st_size, e.path)
+                 for e in entries if e.is_file() and e.name.endswith(ENTRY_SUFFIX)]
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
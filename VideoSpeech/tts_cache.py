@@ -0,0 +1,77 @@
+"""Local cache of synthesized speech chunks, used by chunked_tts (02_text2speech and 03_video2translated).
+
+Scripts are synthesized in chunks (see split_text in chunked_tts). Each chunk's raw PCM is
+stored under a key of (normalized chunk text, provider, voice, model, provider settings, sample
+rate), so re-running a script after editing one sentence only requests the chunks that changed;
+the others are read back from disk. The cache is bounded in size; the least recently used entries
+are evicted first (each hit refreshes the entry's mtime).
+"""
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+
+CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join("OUTPUT", ".tts_cache"))
+# Raw 24 kHz PCM is about 2.9 MB per minute of speech
+CACHE_MAX_BYTES = 500 * 1024 * 1024
+# Set to False to always call the API (entries are still not written)
+CACHE_ENABLED = True
+ENTRY_SUFFIX = ".pcm"
+
+_lock = threading.Lock()
+
+
+def normalize_text(text):
+    """The chunk text as it is keyed: Unicode NFC with whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text, provider, voice, model, settings=None, sample_rate=None):
+    """Cache key of the speech of text with the given request parameters."""
+    parts = [normalize_text(text), provider, voice or "", model or "",
+             json.dumps(settings or {}, sort_keys=True), str(sample_rate or "")]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def get(key):
+    """Returns the cached PCM for key (refreshing its LRU position), or None."""
+    if not CACHE_ENABLED:
+        return None
+    entry_path = os.path.join(CACHE_DIR, key + ENTRY_SUFFIX)
+    try:
+        with open(entry_path, "rb") as f:
+            data = f.read()
+        os.utime(entry_path)
+        return data
+    except OSError:
+        return None
+
+
+def put(key, data):
+    """Stores the PCM of a chunk and evicts least recently used entries beyond CACHE_MAX_BYTES."""
+    if not CACHE_ENABLED:
+        return
+    with _lock:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        entry_path = os.path.join(CACHE_DIR, key + ENTRY_SUFFIX)
+        tmp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, entry_path)
+        _evict()
+
+
+def _evict():
+    with os.scandir(CACHE_DIR) as entries:
+        files = [(e.stat().st_mtime_ns, e.stat().st_size, e.path)
+                 for e in entries if e.is_file() and e.name.endswith(ENTRY_SUFFIX)]
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
@@ -1,78 +1,203 @@
+import json
 import os
 import random
-import shutil
-from tkinter import Tk, filedialog
+
+# Journal written into the folder before the first rename; its presence means a shuffle was interrupted
+JOURNAL_NAME = ".shuffle_journal"
+TEMP_PREFIX = ".shuffle_tmp_"
+# Progress entries between fsyncs of the journal (and the folder)
+FSYNC_EVERY = 1000
+
+
+def list_files(folder_path):
+    """Regular files in the folder (one directory read; hidden files such as the journal are skipped)."""
+    with os.scandir(folder_path) as entries:
+        return [e.name for e in entries if not e.name.startswith(".") and e.is_file()]
+
+
+def plan_renames(mapping):
+    """Orders the renames of {old name: new name} so no file is ever overwritten.
+
+    Chains (a -> b -> c where c is free) are renamed from the free end backwards. Cycles
+    (a -> b -> a) need one temporary name: a cycle of k files costs k + 1 renames, every other
+    file exactly one, which is the minimum. Returns a list of (old name, new name).
+    """
+    pending = {old: new for old, new in mapping.items() if old != new}
+    source_of = {new: old for old, new in pending.items()}
+    ops = []
+    done = set()
+
+    # Chains end at a name that is not itself waiting to be renamed
+    for old, new in pending.items():
+        if new in pending:
+            continue
+        current, target = old, new
+        while True:
+            ops.append((current, target))
+            done.add(current)
+            if current not in source_of:
+                break
+            current, target = source_of[current], current
+
+    # What is left are cycles
+    temp_index = 0
+    for start in pending:
+        if start in done:
+            continue
+        temp_name = f"{TEMP_PREFIX}{temp_index}"
+        temp_index += 1
+        ops.append((start, temp_name))
+        done.add(start)
+        current = start
+        while source_of[current] != start:
+            previous = source_of[current]
+            ops.append((previous, current))
+            done.add(previous)
+            current = previous
+        ops.append((temp_name, current))
+    return ops
+
+
+def _fsync_dir(folder_path):
+    if os.name != "nt":
+        fd = os.open(folder_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _safe_rename(folder_path, old, new):
+    """Renames inside the folder, refusing to overwrite (os.rename replaces silently on POSIX)."""
+    new_path = os.path.join(folder_path, new)
+    if os.path.lexists(new_path):
+        raise FileExistsError(f"Refusing to overwrite {new_path}")
+    os.rename(os.path.join(folder_path, old), new_path)
+
+
+def _apply(folder_path, ops, journal_fd, first_index=0):
+    """Executes ops[first_index:], appending the index of every completed rename to the journal."""
+    for i in range(first_index, len(ops)):
+        _safe_rename(folder_path, *ops[i])
+        os.write(journal_fd, f"{i}\n".encode())
+        if (i + 1) % FSYNC_EVERY == 0:
+            _fsync_dir(folder_path)
+            os.fsync(journal_fd)
+
+
+def read_journal(folder_path):
+    """Returns (ops, number of completed ops) of an interrupted shuffle, or None when there is none."""
+    journal_path = os.path.join(folder_path, JOURNAL_NAME)
+    if not os.path.exists(journal_path):
+        return None
+    with open(journal_path, "r", encoding="utf-8") as f:
+        try:
+            ops = [tuple(op) for op in json.loads(f.readline())["ops"]]
+        except ValueError:
+            return [], 0 # Died while writing the plan, before the first rename
+        completed = 0
+        undoing = False
+        for line in f:
+            line = line.strip()
+            if line.isdigit():
+                completed = int(line) + 1 # "<i>": ops[i] done
+                undoing = False
+            elif line.startswith("u") and line[1:].isdigit():
+                completed = int(line[1:]) # "u<i>": ops[i] undone during a rollback
+                undoing = True
+
+    def exists(name):
+        return os.path.lexists(os.path.join(folder_path, name))
+
+    # A rename may have happened right before the process died, without its journal entry
+    if undoing:
+        while completed > 0 and exists(ops[completed - 1][0]) and not exists(ops[completed - 1][1]):
+            completed -= 1
+    else:
+        while completed < len(ops) and not exists(ops[completed][0]) and exists(ops[completed][1]):
+            completed += 1
+    return ops, completed
+
+
+def shuffle_in_place(folder_path, seed=None):
+    """Renames the files to 001.ext, 002.ext, ... in random order, directly inside the folder.
+
+    The rename plan is journaled first, so an interrupted run can be finished or undone with
+    recover(). Returns the number of files.
+    """
+    files = list_files(folder_path)
+    random.Random(seed).shuffle(files)
+    mapping = {name: f"{i:03d}{os.path.splitext(name)[1]}" for i, name in enumerate(files, start=1)}
+    ops = plan_renames(mapping)
+
+    journal_path = os.path.join(folder_path, JOURNAL_NAME)
+    journal_fd = os.open(journal_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+    try:
+        os.write(journal_fd, (json.dumps({"ops": ops}) + "\n").encode())
+        os.fsync(journal_fd)
+        _fsync_dir(folder_path)
+        _apply(folder_path, ops, journal_fd)
+        _fsync_dir(folder_path)
+    finally:
+        os.close(journal_fd)
+    os.remove(journal_path)
+    print(f"Renamed {len(files)} files with {len(ops)} renames.")
+    return len(files)
+
+
+def recover(folder_path, roll_forward=True):
+    """Finishes (roll_forward=True) or undoes an interrupted shuffle recorded in the folder's journal."""
+    ops, completed = read_journal(folder_path)
+    journal_path = os.path.join(folder_path, JOURNAL_NAME)
+    journal_fd = os.open(journal_path, os.O_WRONLY | os.O_APPEND)
+    try:
+        if roll_forward:
+            _apply(folder_path, ops, journal_fd, completed)
+            print(f"Finished interrupted shuffle ({len(ops) - completed} remaining renames).")
+        else:
+            # Reverse the completed renames in reverse order, journaling each one, so an interrupted
+            # rollback can itself be finished or undone
+            for i in range(completed - 1, -1, -1):
+                old, new = ops[i]
+                _safe_rename(folder_path, new, old)
+                os.write(journal_fd, f"u{i}\n".encode())
+            print(f"Undid interrupted shuffle ({completed} renames reverted).")
+        _fsync_dir(folder_path)
+    finally:
+        os.close(journal_fd)
+    os.remove(journal_path)
+
 
 def randomize_and_rename_files():
-    # Initialize tkinter
+    # Initialize tkinter (imported here: run_jobs imports this module for headless batch jobs)
+    from tkinter import Tk, filedialog, messagebox
     root = Tk()
     root.withdraw()  # Hide the main window
-    
+
     # Ask user to select a folder
     folder_path = filedialog.askdirectory(title="Select folder to randomize and rename files")
     if not folder_path:
         print("No folder selected. Exiting.")
         return
-    
-    # Get all files in the folder
-    try:
-        files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-    except Exception as e:
-        print(f"Error reading folder: {e}")
-        return
-    
-    if not files:
-        print("No files found in selected folder.")
-        return
-    
-    # Create temp directory
-    temp_dir = os.path.join(folder_path, "temp_rename")
+
     try:
-        os.makedirs(temp_dir, exist_ok=True)
-    except Exception as e:
-        print(f"Error creating temp directory: {e}")
-        return
-    
-    # Move all files to temp directory first
-    for filename in files:
-        try:
-            shutil.move(
-                os.path.join(folder_path, filename),
-                os.path.join(temp_dir, filename)
+        if read_journal(folder_path) is not None:
+            answer = messagebox.askyesnocancel(
+                "Interrupted Shuffle",
+                "A previous shuffle of this folder was interrupted.\n\n"
+                "Yes: finish it\nNo: undo it (restore the original names)\nCancel: leave the folder as it is"
             )
-        except Exception as e:
-            print(f"Error moving {filename} to temp directory: {e}")
+            if answer is not None:
+                recover(folder_path, roll_forward=answer)
             return
-    
-    # Shuffle the files randomly
-    random.shuffle(files)
-    
-    # Rename files with sequential numbers and move back
-    for i, filename in enumerate(files, start=1):
-        # Get file extension
-        name, ext = os.path.splitext(filename)
-        
-        # Create new filename with 3-digit number
-        new_name = f"{i:03d}{ext}"
-        
-        # Construct paths
-        old_path = os.path.join(temp_dir, filename)
-        new_path = os.path.join(folder_path, new_name)
-        
-        # Rename the file
-        try:
-            shutil.move(old_path, new_path)
-            print(f"Renamed: {filename} → {new_name}")
-        except Exception as e:
-            print(f"Error renaming {filename}: {e}")
-    
-    # Remove temp directory
-    try:
-        os.rmdir(temp_dir)
+
+        if not list_files(folder_path):
+            print("No files found in selected folder.")
+            return
+        shuffle_in_place(folder_path)
     except Exception as e:
-        print(f"Warning: Could not remove temp directory: {e}")
-    
-    print(f"Successfully renamed {len(files)} files.")
+        print(f"Error shuffling folder: {e}")
+        print(f"The rename journal in the folder ({JOURNAL_NAME}) allows finishing or undoing it; run the script again.")
 
 if __name__ == "__main__":
-    randomize_and_rename_files()
\ No newline at end of file
+    randomize_and_rename_files()
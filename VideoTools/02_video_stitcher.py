@@ -1,12 +1,31 @@
-import tkinter as tk
-from tkinter import filedialog
+# tkinter is imported where it is used: run_jobs imports this module for headless batch jobs
+import logging
 import os
+import sys
 import re
+import shutil
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# The helpers shared with VideoClipper (mediacommon/) live at the repo root
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_DIR not in sys.path:
+    sys.path.append(_REPO_DIR)
+from mediacommon.ffmpeg_progress import run_ffmpeg, format_snapshot
+from mediacommon.stream_compat import prepare_clips_for_concat, cleanup_normalized
+from mediacommon.smart_trim import probe_media, smart_trim
+
+# Probe all clips before the `-c copy` concat and re-encode only those that differ from the majority profile
+NORMALIZE_BEFORE_CONCAT = True
+# Smart-trim clips longer than this many seconds to their first N seconds before stitching (None = no trimming).
+# Only the GOP at the cut point is re-encoded; the rest of each clip is stream-copied.
+TRIM_CLIPS_TO = None
 
 def select_folder():
     """Opens a dialog to select a folder."""
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()  # Hide the main window
     folder_path = filedialog.askdirectory(title="Select Folder Containing Videos")
@@ -37,7 +56,46 @@ def get_next_output_filename(target_dir):
     # Use the original target_dir path provided by the user
     return os.path.join(target_dir, f"{next_num:03d}_output.mp4")
 
-def stitch_videos_ffmpeg(folder_path, output_filename):
+def get_total_duration(video_files):
+    """Sums the container durations of the clips (header reads only). Returns None if any clip can't be probed."""
+    def probe(path):
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=nw=1:nk=1', path],
+            capture_output=True, text=True
+        )
+        return float(result.stdout.strip())
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return sum(executor.map(probe, video_files))
+    except (ValueError, OSError):
+        return None
+
+
+def trim_clips(video_files, max_duration, work_dir):
+    """Smart-trims every clip longer than max_duration seconds. Returns the new clip list, or None on failure."""
+    os.makedirs(work_dir, exist_ok=True)
+
+    def trim_one(index_and_path):
+        index, path = index_and_path
+        media_info = probe_media(path)
+        if media_info[0] <= max_duration:
+            return path
+        trimmed_path = os.path.join(work_dir, f"{index:05d}_{os.path.splitext(os.path.basename(path))[0]}.mp4")
+        if not smart_trim(path, trimmed_path, 0.0, max_duration, media_info=media_info):
+            raise RuntimeError(f"Could not trim {path}")
+        print(f"Trimmed {os.path.basename(path)} to {max_duration}s")
+        return trimmed_path
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 1) // 2)) as executor:
+            return list(executor.map(trim_one, enumerate(video_files)))
+    except Exception as e:
+        print(f"Error while trimming clips: {e}")
+        return None
+
+
+def stitch_videos_ffmpeg(folder_path, output_filename, normalize=NORMALIZE_BEFORE_CONCAT, trim_to=TRIM_CLIPS_TO):
     """Finds video files, creates a list file, and uses ffmpeg to concatenate."""
     video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.ts') # Added .ts common for segments
     video_files = []
@@ -54,11 +112,7 @@ def stitch_videos_ffmpeg(folder_path, output_filename):
 
     for filename in file_list:
         if filename.lower().endswith(video_extensions):
-            full_path = os.path.join(absolute_folder_path, filename)
-            # Ffmpeg concat demuxer requires specific formatting in the list file
-            # Need to escape special characters if any in filenames for the list file
-            escaped_path = full_path.replace("'", "'\\''")
-            video_files.append(f"file '{escaped_path}'")
+            video_files.append(os.path.join(absolute_folder_path, filename))
 
 
     if not video_files:
@@ -66,17 +120,36 @@ def stitch_videos_ffmpeg(folder_path, output_filename):
         return False
 
     print(f"Found {len(video_files)} video files to stitch:")
-    for vf_line in video_files:
-         # Extract filename for printing
-         match = re.search(r"file '(.*?)'", vf_line)
-         if match:
-             print(f"- {os.path.basename(match.group(1))}")
+    for video_path in video_files:
+         print(f"- {os.path.basename(video_path)}")
 
 
-    # Create a temporary file to list the videos for ffmpeg's concat demuxer
-    list_file_content = "\n".join(video_files)
     temp_list_file = None
+    normalized_dir = None
+    trimmed_dir = None
     try:
+        if trim_to:
+            print(f"\nTrimming clips longer than {trim_to}s...")
+            trimmed_dir = os.path.join(os.path.dirname(os.path.abspath(output_filename)), "_trimmed")
+            video_files = trim_clips(video_files, trim_to, trimmed_dir)
+            if video_files is None:
+                return False
+
+        # Pre-flight: re-encode only the clips whose streams differ from the majority profile
+        if normalize:
+            print("\nChecking stream compatibility...")
+            video_files, normalized_dir = prepare_clips_for_concat(video_files, os.path.dirname(os.path.abspath(output_filename)))
+            if video_files is None:
+                print("Error: some clips could not be probed or normalized for concatenation.")
+                return False
+
+        # Ffmpeg concat demuxer requires specific formatting in the list file
+        # Need to escape special characters if any in filenames for the list file
+        list_file_content = "\n".join(
+            "file '{}'".format(path.replace("'", "'\\''")) for path in video_files
+        )
+
+        # Create a temporary file to list the videos for ffmpeg's concat demuxer
         # Using NamedTemporaryFile to ensure it's cleaned up
         with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt', encoding='utf-8') as temp_f:
             temp_list_file = temp_f.name
@@ -101,18 +174,21 @@ def stitch_videos_ffmpeg(folder_path, output_filename):
         print(f"\nExecuting ffmpeg command:")
         print(" ".join(command)) # Print the command for clarity
 
-        # Execute the command
-        result = subprocess.run(command, capture_output=True, text=True, check=False) # check=False to handle errors manually
+        # Execute the command, showing live progress parsed from ffmpeg's -progress output
+        total_duration = get_total_duration(video_files)
+        returncode, stderr_tail = run_ffmpeg(
+            command, label=os.path.basename(output_filename), total_duration=total_duration,
+            on_progress=lambda snapshot: print(f"\r{format_snapshot(snapshot):<79}", end="", flush=True)
+        )
+        print()
 
-        if result.returncode == 0:
+        if returncode == 0:
             print(f"\nSuccessfully stitched videos to: {output_filename}")
             return True
         else:
-            print(f"\nError during ffmpeg execution (return code: {result.returncode}):")
-            print("ffmpeg stdout:")
-            print(result.stdout)
-            print("ffmpeg stderr:")
-            print(result.stderr)
+            print(f"\nError during ffmpeg execution (return code: {returncode}):")
+            print("ffmpeg stderr (last lines):")
+            print(stderr_tail)
             return False
 
     except FileNotFoundError:
@@ -122,6 +198,9 @@ def stitch_videos_ffmpeg(folder_path, output_filename):
         print(f"\nAn unexpected error occurred: {e}")
         return False
     finally:
+        cleanup_normalized(normalized_dir)
+        if trimmed_dir:
+            shutil.rmtree(trimmed_dir, ignore_errors=True)
         # Clean up the temporary list file
         if temp_list_file and os.path.exists(temp_list_file):
             try:
@@ -132,6 +211,7 @@ def stitch_videos_ffmpeg(folder_path, output_filename):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     input_folder = select_folder()
     if input_folder:
         print(f"Selected folder: {input_folder}")
@@ -0,0 +1,299 @@
+"""Reproducible benchmark for the FFmpeg code paths.
+
+Generates synthetic inputs locally (Pillow images at several resolutions, lavfi testsrc/sine clips
+with mixed codecs), times the real tool functions on them and writes the results as JSON so runs
+can be compared for regressions. Runs offline on a CPU-only machine; only ffmpeg/ffprobe and the
+tools' own requirements are needed.
+
+Examples:
+    python benchmarks/ffmpeg_bench.py --output results.json
+    python benchmarks/ffmpeg_bench.py --set media_organizer.VIDEO_PRESET=ultrafast --compare results.json
+    python benchmarks/ffmpeg_bench.py --only kenburns --workers 1 2 4
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Put the tool folders (and the repo root, for mediacommon) on the path at import time so spawned pool
+# workers (Windows) can import them too
+for _tool_dir in ("VideoClipper", "VideoTools", "VideoSpeech"):
+    sys.path.insert(0, os.path.join(REPO_DIR, _tool_dir))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+# Image sizes (width, height) used for the Ken Burns benchmark
+IMAGE_SIZES = [(640, 480), (1920, 1080), (1080, 1920), (4000, 3000)]
+# Clip variants for the concat/stitch benchmarks: (name, duration, size, fps, video codec, audio codec or None)
+CLIP_VARIANTS = [
+    ("h264_aac_1080p", 6, "1920x1080", 25, "libx264", "aac"),
+    ("h264_aac_1080p_b", 6, "1920x1080", 25, "libx264", "aac"),
+    ("h264_aac_1080p_c", 6, "1920x1080", 25, "libx264", "aac"),
+    ("h264_noaudio_1080p", 6, "1920x1080", 25, "libx264", None),
+    ("h264_aac_720p_30fps", 6, "1280x720", 30, "libx264", "aac"),
+    ("mpeg4_mp3_480p", 6, "854x480", 25, "mpeg4", "libmp3lame"),
+]
+LONG_AUDIO_SECONDS = 120
+
+
+def load_module(name, relative_path):
+    """Imports a tool script by path (the script folders are not packages and some names start with digits)."""
+    path = os.path.join(REPO_DIR, relative_path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_quiet(cmd):
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def generate_images(folder, count_per_size):
+    """Creates gradient/noise test images with Pillow. Returns the list of paths."""
+    from PIL import Image, ImageDraw
+
+    paths = []
+    for width, height in IMAGE_SIZES:
+        for i in range(count_per_size):
+            image = Image.radial_gradient("L").resize((width, height)).convert("RGB")
+            draw = ImageDraw.Draw(image)
+            for k in range(0, width, max(1, width // 16)):
+                draw.line([(k, 0), (width - k, height)], fill=((k * 7 + i * 40) % 256, 120, 200), width=3)
+            path = os.path.join(folder, f"img_{width}x{height}_{i}.jpg")
+            image.save(path, quality=90)
+            paths.append(path)
+    return paths
+
+
+def generate_clips(folder):
+    """Creates the mixed-codec test clips with lavfi sources. Returns the list of paths."""
+    paths = []
+    for name, duration, size, fps, vcodec, acodec in CLIP_VARIANTS:
+        path = os.path.join(folder, f"{name}.mp4")
+        cmd = ['ffmpeg', '-y', '-f', 'lavfi', '-i', f"testsrc2=size={size}:rate={fps}:duration={duration}"]
+        if acodec:
+            cmd += ['-f', 'lavfi', '-i', f"sine=frequency=440:sample_rate=48000:duration={duration}"]
+        cmd += ['-c:v', vcodec, '-pix_fmt', 'yuv420p']
+        if vcodec == 'libx264':
+            cmd += ['-preset', 'ultrafast', '-g', str(fps * 2)]
+        if acodec:
+            cmd += ['-c:a', acodec]
+        cmd.append(path)
+        run_quiet(cmd)
+        paths.append(path)
+    return paths
+
+
+def generate_long_video(folder):
+    """Creates a low-resolution clip with a long audio track for the extraction benchmark."""
+    path = os.path.join(folder, "long_talk.mp4")
+    run_quiet([
+        'ffmpeg', '-y',
+        '-f', 'lavfi', '-i', f"testsrc2=size=320x240:rate=10:duration={LONG_AUDIO_SECONDS}",
+        '-f', 'lavfi', '-i', f"sine=frequency=220:sample_rate=44100:duration={LONG_AUDIO_SECONDS}",
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac', path
+    ])
+    return path
+
+
+def time_call(fn, repeat):
+    """Runs fn `repeat` times and returns timing statistics plus whether every run succeeded."""
+    timings = []
+    ok = True
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        ok = ok and result is not False
+    return {
+        "runs": timings,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "ok": ok,
+    }
+
+
+def bench_kenburns(work_dir, images, repeat, worker_counts):
+    """Times create_video_with_ffmpeg_kenburns for each image size, and the pooled batch for each worker count."""
+    organizer = sys.modules["media_organizer"]
+    results = {}
+    out_dir = os.path.join(work_dir, "kenburns")
+    os.makedirs(out_dir, exist_ok=True)
+
+    for width, height in IMAGE_SIZES:
+        image = next(p for p in images if f"_{width}x{height}_" in os.path.basename(p))
+        output = os.path.join(out_dir, f"single_{width}x{height}.mp4")
+        results[f"single_{width}x{height}"] = time_call(
+            lambda: organizer.create_video_with_ffmpeg_kenburns(image, output), repeat)
+
+    tasks = [(img, os.path.join(out_dir, f"pool_{i}.mp4")) for i, img in enumerate(images)]
+    for workers in worker_counts:
+        def run_pool():
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return all(success for _, success in executor.map(organizer.process_image_to_video, tasks))
+        stats = time_call(run_pool, repeat)
+        stats["images_per_second"] = len(tasks) / stats["median"]
+        results[f"pool_{len(tasks)}_images_{workers}_workers"] = stats
+    return results
+
+
+def bench_concat(work_dir, clips, repeat):
+    """Times concatenate_videos on matching clips (pure stream copy) and on mixed clips (with normalization)."""
+    combiner = sys.modules["video_combiner"]
+    matching = [c for c in clips if os.path.basename(c).startswith("h264_aac_1080p")]
+    results = {
+        "matching_copy": time_call(
+            lambda: combiner.concatenate_videos(matching, os.path.join(work_dir, "concat_matching.mp4")), repeat),
+        "mixed_normalized": time_call(
+            lambda: combiner.concatenate_videos(clips, os.path.join(work_dir, "concat_mixed.mp4")), repeat),
+    }
+    return results
+
+
+def bench_stitch(work_dir, clips, repeat):
+    """Times stitch_videos_ffmpeg over a folder of mixed clips."""
+    stitcher = sys.modules["video_stitcher"]
+    folder = os.path.join(work_dir, "stitch_input")
+    os.makedirs(folder, exist_ok=True)
+    for clip in clips:
+        shutil.copy(clip, folder)
+    output = os.path.join(work_dir, "stitched.mp4")
+
+    def run():
+        if os.path.exists(output):
+            os.remove(output) # The stitcher does not pass -y to ffmpeg
+        return stitcher.stitch_videos_ffmpeg(folder, output)
+    return {"mixed_folder": time_call(run, repeat)}
+
+
+def bench_extract_audio(work_dir, long_video, repeat):
+    """Times extract_audio_from_video on the long test clip."""
+    audio2text = sys.modules["audio2text"]
+    output = os.path.join(work_dir, "extracted.mp3")
+    stats = time_call(lambda: audio2text.extract_audio_from_video(long_video, output), repeat)
+    stats["output_bytes"] = os.path.getsize(output) if os.path.exists(output) else None
+    return {"long_video": stats}
+
+
+def environment_info():
+    """Captures what is needed to compare results across machines and commits."""
+    def first_line(cmd):
+        try:
+            return subprocess.run(cmd, capture_output=True, text=True, cwd=REPO_DIR).stdout.splitlines()[0]
+        except (OSError, IndexError):
+            return None
+    return {
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": first_line(['ffmpeg', '-version']),
+        "git_commit": first_line(['git', 'rev-parse', '--short', 'HEAD']),
+    }
+
+
+def apply_overrides(overrides):
+    """Applies --set module.NAME=value overrides (values are parsed as JSON when possible)."""
+    applied = {}
+    for override in overrides:
+        target, _, raw_value = override.partition("=")
+        module_name, _, attr = target.rpartition(".")
+        try:
+            value = json.loads(raw_value)
+        except ValueError:
+            value = raw_value
+        setattr(sys.modules[module_name], attr, value)
+        applied[target] = value
+    return applied
+
+
+def compare(results, baseline_path):
+    """Prints the median change of every benchmark against a previous results file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\nComparison against {baseline_path} (median seconds):")
+    for group, benches in results.items():
+        for name, stats in benches.items():
+            old = baseline.get(group, {}).get(name)
+            if not old:
+                print(f"  {group}/{name}: {stats['median']:.3f}s (new)")
+                continue
+            change = (stats["median"] - old["median"]) / old["median"] * 100
+            print(f"  {group}/{name}: {old['median']:.3f}s -> {stats['median']:.3f}s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json", help="JSON file for the results")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (the median is reported)")
+    parser.add_argument("--images-per-size", type=int, default=2, help="Test images generated per resolution")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, max(1, (os.cpu_count() or 2) - 1)],
+                        help="Process pool sizes for the pooled Ken Burns benchmark")
+    parser.add_argument("--only", nargs="+", choices=["kenburns", "concat", "stitch", "extract_audio"],
+                        help="Run only these benchmark groups")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="MODULE.NAME=VALUE",
+                        help="Override a tool setting, e.g. media_organizer.ZOOM_SPEED=0.002")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="Compare medians against an earlier results file")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated media and outputs")
+    args = parser.parse_args()
+
+    # The tools are imported for real; a dummy key satisfies the transcription script's startup check
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark-offline")
+    load_module("media_organizer", "VideoClipper/media_organizer.py")
+    load_module("video_combiner", "VideoClipper/video_combiner.py")
+    load_module("video_stitcher", "VideoTools/02_video_stitcher.py")
+    load_module("audio2text", "VideoSpeech/01_audio2text.py")
+    applied = apply_overrides(args.overrides)
+
+    groups = args.only or ["kenburns", "concat", "stitch", "extract_audio"]
+    work_dir = tempfile.mkdtemp(prefix="ffmpeg_bench_")
+    print(f"Generating synthetic media in {work_dir} ...")
+    try:
+        results = {}
+        if "kenburns" in groups:
+            images = generate_images(work_dir, args.images_per_size)
+            results["kenburns"] = bench_kenburns(work_dir, images, args.repeat, args.workers)
+        if "concat" in groups or "stitch" in groups:
+            clips_dir = os.path.join(work_dir, "clips")
+            os.makedirs(clips_dir)
+            clips = generate_clips(clips_dir)
+            if "concat" in groups:
+                results["concat"] = bench_concat(work_dir, clips, args.repeat)
+            if "stitch" in groups:
+                results["stitch"] = bench_stitch(work_dir, clips, args.repeat)
+        if "extract_audio" in groups:
+            results["extract_audio"] = bench_extract_audio(work_dir, generate_long_video(work_dir), args.repeat)
+    finally:
+        if args.keep:
+            print(f"Kept benchmark media in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {"environment": environment_info(), "overrides": applied, "repeat": args.repeat, "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for group, benches in results.items():
+        for name, stats in benches.items():
+            status = "" if stats["ok"] else "  (FAILED)"
+            print(f"{group}/{name}: median {stats['median']:.3f}s{status}")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Startup budget check for the tool scripts.
+
+Imports every entry point in a fresh interpreter with `python -X importtime` (without running its
+main()), measures how long the import takes and fails when a script exceeds its budget. The
+heaviest top-level imports are listed so a regression (e.g. an eager MoviePy or openai import)
+is easy to spot.
+
+Examples:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 150 --top 10
+    python benchmarks/import_budget.py --only VideoSpeech/01_audio2text.py --json budget.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points and their import budget in milliseconds (None = DEFAULT_BUDGET_MS)
+SCRIPTS = {
+    "VideoClipper/media_organizer.py": None,
+    "VideoClipper/video_combiner.py": None,
+    "VideoClipper/compilation_builder.py": None,
+    "VideoClipper/segment_extractor.py": None,
+    "VideoClipper/watch_daemon.py": None,
+    "VideoClipper/preview_generator.py": None,
+    "VideoTools/01_shuffle_files.py": None,
+    "VideoTools/02_video_stitcher.py": None,
+    "VideoSpeech/01_audio2text.py": None,
+    "VideoSpeech/02_text2speech.py": None,
+    "VideoSpeech/03_video2translated.py": None,
+    "xMediaScraper/script1.py": None,
+    "xMediaScraper/script2.py": None,
+    "run_jobs.py": None,
+}
+DEFAULT_BUDGET_MS = 250
+
+# Runs inside the child interpreter: imports the script as a non-__main__ module and prints its import time
+_CHILD_CODE = """
+import importlib.util, os, sys, time
+path = sys.argv[1]
+sys.path.insert(0, os.path.dirname(path))
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("budget_target", path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print(f"IMPORT_MS {(time.perf_counter() - started) * 1000:.1f}")
+"""
+
+
+def parse_importtime(stderr):
+    """Returns [(cumulative ms, module)] for the top-level imports in -X importtime output, heaviest first."""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = (part for part in line[len("import time:"):].split("|"))
+        if not name.startswith("  "): # nested imports are indented by two spaces per level
+            top_level.append((int(cumulative) / 1000, name.strip()))
+    return sorted(top_level, reverse=True)
+
+
+def baseline_modules():
+    """Modules imported by interpreter startup and the child harness itself (excluded from the listing)."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import importlib.util, os, sys, time"],
+        capture_output=True, text=True
+    )
+    return {name for _, name in parse_importtime(completed.stderr)}
+
+
+def check_script(relative_path, budget_ms, top, exclude=()):
+    """Imports one script in a fresh interpreter. Returns a result dict."""
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "import-budget-check") # keep key checks from failing an import
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD_CODE, os.path.join(REPO_DIR, relative_path)],
+        capture_output=True, text=True, env=env, cwd=REPO_DIR
+    )
+    result = {"script": relative_path, "budget_ms": budget_ms, "import_ms": None, "heaviest": []}
+    marker = [line for line in completed.stdout.splitlines() if line.startswith("IMPORT_MS ")]
+    if completed.returncode != 0 or not marker:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        result["status"] = "error"
+        result["error"] = errors[-1] if errors else f"exit code {completed.returncode}"
+        return result
+    result["import_ms"] = float(marker[-1].split()[1])
+    result["heaviest"] = [{"module": name, "ms": round(ms, 1)}
+                          for ms, name in parse_importtime(completed.stderr) if name not in exclude][:top]
+    result["status"] = "ok" if result["import_ms"] <= budget_ms else "over"
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of every tool script against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Budget for scripts without their own entry in SCRIPTS")
+    parser.add_argument("--only", nargs="+", metavar="SCRIPT", help="Check only these scripts (paths as in SCRIPTS)")
+    parser.add_argument("--top", type=int, default=5, help="Number of heaviest imports listed per script")
+    parser.add_argument("--allow-missing", action="store_true",
+                        help="Do not fail on scripts whose dependencies are not installed")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    scripts = args.only or list(SCRIPTS)
+    exclude = baseline_modules()
+    results = []
+    failed = False
+    for relative_path in scripts:
+        budget_ms = SCRIPTS.get(relative_path) or args.budget_ms
+        result = check_script(relative_path, budget_ms, args.top, exclude)
+        results.append(result)
+        if result["status"] == "error":
+            missing = "ModuleNotFoundError" in result["error"]
+            failed = failed or not (missing and args.allow_missing)
+            print(f"ERROR {relative_path}: {result['error']}")
+            continue
+        failed = failed or result["status"] == "over"
+        print(f"{result['status'].upper():5} {relative_path}: {result['import_ms']:.0f} ms (budget {budget_ms:.0f} ms)")
+        for entry in result["heaviest"]:
+            print(f"        {entry['ms']:8.1f} ms  {entry['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""FFmpeg helpers shared by VideoClipper and VideoTools (progress reporting, concat pre-flight, smart trimming)."""
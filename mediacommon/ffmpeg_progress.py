@@ -0,0 +1,195 @@
+"""Run FFmpeg with live progress, ETA and throughput reporting.
+
+FFmpeg is started with `-progress pipe:1 -nostats`, which makes it print machine-readable
+key=value blocks on stdout (one block per update, terminated by progress=continue/end). The blocks
+are parsed incrementally and turned into snapshots with frames, fps, speed, out_time and an ETA.
+Snapshots go to the logger (throttled), an optional callback (e.g. a Tk progress window) and an
+optional JSON-lines metrics file. stderr is drained on a background thread into a bounded buffer,
+so only its tail is kept for error reporting.
+"""
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress log lines / metrics records per job
+PROGRESS_LOG_INTERVAL = 5.0
+# JSON-lines file receiving progress snapshots and job summaries (None = disabled). Enabled with the
+# FFMPEG_METRICS_FILE environment variable or enable_metrics(), which worker processes inherit.
+FFMPEG_METRICS_FILE = os.getenv("FFMPEG_METRICS_FILE") or None
+# Number of stderr lines kept for error reporting
+STDERR_TAIL_LINES = 40
+# Niceness of FFmpeg processes started with low_priority=True (POSIX; below-normal priority class on Windows)
+LOW_PRIORITY_NICENESS = 10
+
+_CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+_metrics_lock = threading.Lock()
+
+
+class FFmpegCancelled(Exception):
+    """Raised by an on_progress callback to cancel a render (run_ffmpeg kills FFmpeg and re-raises it)."""
+
+
+def _parse_float(value):
+    """Parses FFmpeg progress numbers such as '24.5', '1.23x' or 'N/A'."""
+    try:
+        return float(value.rstrip("x"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def build_snapshot(fields, total_duration, started):
+    """Turns one parsed -progress block into a snapshot dict."""
+    # out_time_ms is (despite its name) also in microseconds; older FFmpeg builds only print that one
+    out_time_us = _parse_float(fields.get("out_time_us") or fields.get("out_time_ms"))
+    out_time = out_time_us / 1_000_000 if out_time_us is not None else None
+    speed = _parse_float(fields.get("speed"))
+    elapsed = time.time() - started
+    snapshot = {
+        "frame": int(fields["frame"]) if fields.get("frame", "").isdigit() else None,
+        "fps": _parse_float(fields.get("fps")),
+        "speed": speed,
+        "out_time": out_time,
+        "total_size": int(fields["total_size"]) if fields.get("total_size", "").isdigit() else None,
+        "elapsed": round(elapsed, 2),
+        "percent": None,
+        "eta": None,
+        "done": fields.get("progress") == "end",
+    }
+    if total_duration and out_time is not None:
+        snapshot["percent"] = min(100.0, out_time / total_duration * 100)
+        remaining = max(0.0, total_duration - out_time)
+        if speed:
+            snapshot["eta"] = remaining / speed
+        elif out_time > 0:
+            snapshot["eta"] = remaining * elapsed / out_time
+    return snapshot
+
+
+def format_snapshot(snapshot):
+    """Human readable one-line summary of a snapshot."""
+    parts = []
+    if snapshot["percent"] is not None:
+        parts.append(f"{snapshot['percent']:.1f}%")
+    if snapshot["out_time"] is not None:
+        parts.append(f"out_time={snapshot['out_time']:.1f}s")
+    if snapshot["frame"] is not None:
+        parts.append(f"frame={snapshot['frame']}")
+    if snapshot["fps"] is not None:
+        parts.append(f"fps={snapshot['fps']:.1f}")
+    if snapshot["speed"] is not None:
+        parts.append(f"speed={snapshot['speed']:.2f}x")
+    if snapshot["eta"] is not None:
+        parts.append(f"ETA {snapshot['eta']:.0f}s")
+    return " ".join(parts) or "starting..."
+
+
+def enable_metrics(path):
+    """Writes the metrics of this process, and of worker processes started afterwards, to path."""
+    global FFMPEG_METRICS_FILE
+    FFMPEG_METRICS_FILE = os.path.abspath(path)
+    os.environ["FFMPEG_METRICS_FILE"] = FFMPEG_METRICS_FILE
+
+
+def _write_metrics(metrics_path, record):
+    """Appends one JSON record to the metrics file.
+
+    Each record is a single write to a file opened with O_APPEND, so records appended by parallel
+    worker processes do not interleave.
+    """
+    data = (json.dumps(record) + "\n").encode("utf-8")
+    with _metrics_lock:
+        fd = os.open(metrics_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def run_ffmpeg(cmd, label=None, total_duration=None, on_progress=None, metrics_path=None,
+               low_priority=False, stdin=None):
+    """Runs an FFmpeg command while parsing its -progress output.
+
+    cmd is a normal FFmpeg argument list starting with 'ffmpeg'; the progress options are inserted
+    automatically. total_duration (seconds of output) enables percent and ETA. on_progress is called
+    with every snapshot from the calling thread; if it raises (e.g. FFmpegCancelled), FFmpeg is killed
+    and the exception propagates. metrics_path defaults to FFMPEG_METRICS_FILE. low_priority runs FFmpeg below normal
+    CPU priority (background work). stdin (a file descriptor or file object, e.g. the read end of a
+    pipe for `-i -`) defaults to no input. Returns (return code, stderr tail as text).
+    """
+    label = label or os.path.basename(cmd[-1])
+    metrics_path = metrics_path or FFMPEG_METRICS_FILE
+    full_cmd = [cmd[0], '-progress', 'pipe:1', '-nostats'] + list(cmd[1:])
+    started = time.time()
+    creation_flags = _CREATION_FLAGS
+    if low_priority and os.name == 'nt':
+        creation_flags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
+    process = subprocess.Popen(
+        full_cmd,
+        stdin=subprocess.DEVNULL if stdin is None else stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        creationflags=creation_flags
+    )
+    if low_priority and hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, process.pid, LOW_PRIORITY_NICENESS)
+        except OSError as e:
+            logger.debug(f"Could not lower the priority of {label}: {e}")
+
+    # Drain stderr concurrently so FFmpeg never blocks on a full pipe, keeping only the tail
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stderr_thread = threading.Thread(
+        target=lambda: stderr_tail.extend(line.decode(errors="ignore").rstrip() for line in process.stderr),
+        daemon=True
+    )
+    stderr_thread.start()
+
+    fields = {}
+    last_report = 0.0
+    snapshot = None
+    try:
+        for raw_line in process.stdout:
+            key, _, value = raw_line.decode(errors="ignore").strip().partition("=")
+            if not key:
+                continue
+            fields[key] = value.strip()
+            if key != "progress":
+                continue
+
+            snapshot = build_snapshot(fields, total_duration, started)
+            fields = {}
+            if on_progress:
+                on_progress(snapshot)
+            now = time.time()
+            if snapshot["done"] or now - last_report >= PROGRESS_LOG_INTERVAL:
+                last_report = now
+                logger.info(f"[{label}] {format_snapshot(snapshot)}")
+                if metrics_path:
+                    _write_metrics(metrics_path, dict(snapshot, job=label, type="progress", time=now))
+    except BaseException:
+        # E.g. on_progress raised: do not leave FFmpeg running
+        process.kill()
+        raise
+    finally:
+        returncode = process.wait()
+        stderr_thread.join()
+    elapsed = time.time() - started
+
+    if metrics_path:
+        summary = {
+            "type": "summary", "job": label, "time": time.time(), "returncode": returncode,
+            "elapsed": round(elapsed, 2),
+            "out_time": snapshot["out_time"] if snapshot else None,
+            "frames": snapshot["frame"] if snapshot else None,
+        }
+        if summary["out_time"] and elapsed > 0:
+            summary["realtime_factor"] = round(summary["out_time"] / elapsed, 3)
+        _write_metrics(metrics_path, summary)
+
+    return returncode, "\n".join(stderr_tail)
@@ -0,0 +1,256 @@
+"""Keyframe-aware smart trimming.
+
+A cut [start, end) is split at the first keyframe after `start` and the last keyframe before `end`:
+the interior between those keyframes is stream-copied, and only the partial GOPs at the two edges
+are re-encoded with the source's codec, profile, level, pixel format and colour parameters. The
+encoded edges are probed and, if their stream parameters do not match the source (or the codec
+cannot be matched at all), the whole cut is re-encoded instead, so the output never mixes
+incompatible parameter sets in one track. The video parts are written as MPEG-TS (parameter sets
+in-band) and joined with the concat demuxer. Audio is not cut at packet boundaries: the exact
+[start, end) range is decoded and re-encoded once (cheap next to video) and muxed with the joined
+video.
+"""
+import bisect
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from .ffmpeg_progress import run_ffmpeg
+from .stream_compat import VIDEO_ENCODERS, AUDIO_ENCODERS
+
+logger = logging.getLogger(__name__)
+
+EDGE_PRESET = "veryfast"
+EDGE_CRF = 18
+# Edges shorter than this (seconds) are not worth a separate re-encode; the cut snaps to the keyframe
+KEYFRAME_SNAP_TOLERANCE = 0.05
+# Codecs whose edges can be encoded with parameters matching the source (others are re-encoded whole)
+MATCHABLE_CODECS = ("h264",)
+H264_PROFILES = ("baseline", "main", "high")
+# Stream fields an encoded edge must share with the source to be joined with the copied interior
+EDGE_MATCH_FIELDS = ("codec_name", "profile", "level", "width", "height", "pix_fmt")
+
+_CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+
+
+def _run(cmd):
+    """Runs an ffprobe command and returns its stdout, raising RuntimeError with the stderr tail on failure."""
+    result = subprocess.run(cmd, capture_output=True, creationflags=_CREATION_FLAGS)
+    if result.returncode != 0:
+        raise RuntimeError(f"{cmd[0]} failed ({result.returncode}): {result.stderr.decode(errors='ignore')[-2000:]}")
+    return result.stdout.decode(errors='ignore')
+
+
+def _run_ffmpeg(cmd, label):
+    """Runs an FFmpeg command with progress reporting, raising RuntimeError with the stderr tail on failure."""
+    returncode, stderr_tail = run_ffmpeg(cmd, label=label)
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr_tail}")
+
+
+def get_keyframe_times(path):
+    """Returns the sorted keyframe timestamps of the first video stream (reads packet headers only, no decoding)."""
+    output = _run([
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', path
+    ])
+    keyframes = []
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+
+def probe_media(path):
+    """Returns (duration, video stream dict, audio stream dict or None) for the encode parameters of the edges."""
+    info = json.loads(_run([
+        'ffprobe', '-v', 'error', '-show_format', '-show_streams', '-of', 'json', path
+    ]))
+    video = next((s for s in info["streams"] if s.get("codec_type") == "video"), None)
+    audio = next((s for s in info["streams"] if s.get("codec_type") == "audio"), None)
+    if video is None:
+        raise RuntimeError(f"No video stream found in {path}")
+    return float(info["format"]["duration"]), video, audio
+
+
+def _edge_encode_args(video):
+    """Video encoder arguments that reproduce the source stream parameters, so edges and copied interior concat cleanly."""
+    args = [
+        '-c:v', VIDEO_ENCODERS.get(video.get("codec_name"), 'libx264'),
+        '-preset', EDGE_PRESET,
+        '-crf', str(EDGE_CRF),
+        '-pix_fmt', video.get("pix_fmt", "yuv420p"),
+        '-r', video.get("r_frame_rate", "25/1"),
+    ]
+    for field, option in (("color_space", "-colorspace"), ("color_primaries", "-color_primaries"),
+                          ("color_transfer", "-color_trc"), ("color_range", "-color_range")):
+        if video.get(field) not in (None, "unknown"):
+            args += [option, video[field]]
+    if video.get("codec_name") == "h264":
+        profile = (video.get("profile") or "").lower().replace("constrained ", "")
+        if profile in H264_PROFILES:
+            args += ['-profile:v', profile]
+        if video.get("level"):
+            args += ['-level:v', f"{video['level'] / 10:.1f}"]
+        if video.get("refs"):
+            args += ['-refs', str(video["refs"])]
+        if not video.get("has_b_frames"):
+            args += ['-bf', '0']
+    return args
+
+
+def _audio_encode_args(audio):
+    return [
+        '-c:a', AUDIO_ENCODERS.get(audio.get("codec_name"), 'aac'),
+        '-ar', str(audio.get("sample_rate", 48000)),
+        '-ac', str(audio.get("channels", 2)),
+    ]
+
+
+def can_match_edges(video):
+    """True if edges of this video stream can be encoded with parameters matching the source."""
+    if video.get("codec_name") not in MATCHABLE_CODECS:
+        return False
+    return (video.get("profile") or "").lower().replace("constrained ", "") in H264_PROFILES
+
+
+def edge_matches_source(edge_path, video):
+    """True if the encoded edge's video stream has the source's codec, profile, level, size and pixel format."""
+    info = json.loads(_run([
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_streams', '-of', 'json', edge_path
+    ]))
+    edge = (info.get("streams") or [{}])[0]
+    mismatched = [field for field in EDGE_MATCH_FIELDS if edge.get(field) != video.get(field)]
+    if mismatched:
+        logger.info(f"Encoded edge differs from the source in {', '.join(mismatched)}")
+    return not mismatched
+
+
+def plan_cut(keyframes, start, end):
+    """Splits [start, end) into (kind, start, end) parts where kind is 'encode' or 'copy'."""
+    first = bisect.bisect_left(keyframes, start - KEYFRAME_SNAP_TOLERANCE)
+    last = bisect.bisect_right(keyframes, end + KEYFRAME_SNAP_TOLERANCE) - 1
+    if first >= len(keyframes) or last < 0 or keyframes[first] >= keyframes[last]:
+        # No complete GOP inside the cut, re-encode all of it
+        return [("encode", start, end)]
+
+    k_in, k_out = keyframes[first], keyframes[last]
+    parts = []
+    if k_in - start > KEYFRAME_SNAP_TOLERANCE:
+        parts.append(("encode", start, k_in))
+    # Otherwise the cut simply snaps to the keyframe
+    if end - k_out <= KEYFRAME_SNAP_TOLERANCE:
+        k_out = end
+    parts.append(("copy", k_in, k_out))
+    if end - k_out > KEYFRAME_SNAP_TOLERANCE:
+        parts.append(("encode", k_out, end))
+    return parts
+
+
+def _trim_video(input_path, work_dir, parts, video, label):
+    """Writes the video parts of a cut and returns the FFmpeg input arguments joining them, or None if an
+    encoded edge of a multi-part cut does not match the source stream."""
+    part_paths = []
+    for i, (kind, part_start, part_end) in enumerate(parts):
+        part_path = os.path.join(work_dir, f"part_{i}.ts")
+        # Seeking before -i on a keyframe makes the copied part start exactly on that keyframe
+        cmd = ['ffmpeg', '-y', '-ss', f"{part_start:.6f}", '-i', input_path, '-t', f"{part_end - part_start:.6f}",
+               '-map', '0:v:0', '-an']
+        cmd += ['-c:v', 'copy'] if kind == "copy" else _edge_encode_args(video)
+        cmd += ['-avoid_negative_ts', 'make_zero', '-f', 'mpegts', part_path]
+        _run_ffmpeg(cmd, f"trim {label} part {i} ({kind})")
+        if kind == "encode" and len(parts) > 1 and not edge_matches_source(part_path, video):
+            return None
+        part_paths.append(part_path)
+    if len(part_paths) == 1:
+        return ['-i', part_paths[0]]
+
+    list_path = os.path.join(work_dir, "parts.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for part_path in part_paths:
+            f.write("file '{}'\n".format(part_path.replace("\\", "/").replace("'", "'\\''")))
+    return ['-f', 'concat', '-safe', '0', '-i', list_path]
+
+
+def smart_trim(input_path, output_path, start, end, keyframes=None, media_info=None):
+    """Cuts [start, end) seconds of input_path into output_path, re-encoding only the boundary GOPs.
+
+    keyframes and media_info (from get_keyframe_times / probe_media) can be passed in when cutting
+    several segments from the same file. Returns True on success.
+    """
+    try:
+        if keyframes is None:
+            keyframes = get_keyframe_times(input_path)
+        if media_info is None:
+            media_info = probe_media(input_path)
+        duration, video, audio = media_info
+        end = min(end, duration)
+        if end - start <= 0:
+            logger.error(f"Empty cut {start:.2f}-{end:.2f}s for {input_path}")
+            return False
+
+        parts = plan_cut(keyframes, start, end)
+        if len(parts) > 1 and any(kind == "encode" for kind, _, _ in parts) and not can_match_edges(video):
+            logger.info(f"Cannot match {video.get('codec_name')} {video.get('profile')} edges; re-encoding the whole cut")
+            parts = [("encode", start, end)]
+        logger.info(f"Trimming {os.path.basename(input_path)} {start:.2f}-{end:.2f}s: "
+                    + ", ".join(f"{kind} {a:.2f}-{b:.2f}" for kind, a, b in parts))
+
+        work_dir = tempfile.mkdtemp(prefix="smart_trim_", dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            video_path = _trim_video(input_path, work_dir, parts, video, os.path.basename(output_path))
+            if video_path is None:
+                logger.info("Edges do not match the source stream; re-encoding the whole cut")
+                video_path = _trim_video(input_path, work_dir, [("encode", start, end)], video, os.path.basename(output_path))
+
+            cmd = ['ffmpeg', '-y'] + video_path
+            if audio is not None:
+                # Decoding from the exact start and stopping at the exact length cuts audio to the sample
+                cmd += ['-ss', f"{start:.6f}", '-t', f"{end - start:.6f}", '-i', input_path,
+                        '-map', '0:v:0', '-map', '1:a:0', '-c:v', 'copy'] + _audio_encode_args(audio)
+            else:
+                cmd += ['-map', '0:v:0', '-c:v', 'copy']
+            cmd += ['-movflags', '+faststart', output_path]
+            _run_ffmpeg(cmd, f"trim {os.path.basename(output_path)}")
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        logger.info(f"Created trimmed clip: {output_path}")
+        return True
+    except Exception as e:
+        logger.error(f"Smart trim failed for {input_path} ({start:.2f}-{end:.2f}s): {e}")
+        return False
+
+
+def extract_segments(input_path, output_dir, segment_length, max_segments=None, min_length=None):
+    """Carves consecutive segment_length-second clips out of input_path into output_dir.
+
+    Keyframes and stream parameters are probed once for the whole file. A trailing remainder shorter
+    than min_length (default: segment_length) is dropped. Returns ({output path: duration} of the
+    clips that were written, [(start, end) of the clips that could not be cut]); a failed cut does
+    not stop the following ones.
+    """
+    keyframes = get_keyframe_times(input_path)
+    media_info = probe_media(input_path)
+    duration = media_info[0]
+    min_length = segment_length if min_length is None else min_length
+
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    created = {}
+    failed = []
+    start = 0.0
+    index = 1
+    while duration - start >= min_length and (max_segments is None or index <= max_segments):
+        end = min(start + segment_length, duration)
+        output_path = os.path.join(output_dir, f"{base_name}_{segment_length}s_{index:03d}.mp4")
+        if smart_trim(input_path, output_path, start, end, keyframes, media_info):
+            created[output_path] = end - start
+        else:
+            failed.append((start, end))
+        start = end
+        index += 1
+    return created, failed
@@ -0,0 +1,223 @@
+"""Stream-compatibility pre-flight for FFmpeg concat-demuxer joins.
+
+The concat demuxer with `-c copy` only works when every input has the same codecs, resolution,
+pixel format, frame rate, timebase and audio layout. This module probes all inputs, groups them
+by stream signature, picks the most common signature as the target profile and re-encodes (in
+parallel) only the clips that differ from it. Clips that merely lack an audio track get a silent
+track added while their video is still stream-copied.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .ffmpeg_progress import run_ffmpeg
+
+logger = logging.getLogger(__name__)
+
+# Number of parallel normalization jobs (0 = auto: half the CPU cores, each x264 job is multithreaded)
+NORMALIZE_WORKERS = 0
+NORMALIZE_PRESET = "veryfast"
+NORMALIZE_CRF = 20
+NORMALIZED_SUBDIR = "_normalized"
+
+# FFmpeg encoders used when a clip has to be re-encoded to the target codec
+VIDEO_ENCODERS = {"h264": "libx264", "hevc": "libx265", "mpeg4": "mpeg4", "vp9": "libvpx-vp9", "av1": "libaom-av1"}
+AUDIO_ENCODERS = {"aac": "aac", "mp3": "libmp3lame", "opus": "libopus", "vorbis": "libvorbis", "ac3": "ac3"}
+
+VideoSignature = namedtuple("VideoSignature", "codec width height pix_fmt frame_rate time_base")
+AudioSignature = namedtuple("AudioSignature", "codec sample_rate channels")
+StreamSignature = namedtuple("StreamSignature", "video audio")
+
+_CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+
+
+def probe_streams(path):
+    """Returns the StreamSignature of the first video/audio stream of a file, or None if probing fails."""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'stream=codec_type,codec_name,width,height,pix_fmt,r_frame_rate,time_base,sample_rate,channels',
+        '-of', 'json',
+        path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True, creationflags=_CREATION_FLAGS)
+        streams = json.loads(result.stdout).get("streams", [])
+    except (subprocess.CalledProcessError, ValueError) as e:
+        logger.error(f"ffprobe failed for {path}: {e}")
+        return None
+
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if video is None:
+        logger.error(f"No video stream found in {path}")
+        return None
+
+    video_sig = VideoSignature(
+        video.get("codec_name"), video.get("width"), video.get("height"),
+        video.get("pix_fmt"), video.get("r_frame_rate"), video.get("time_base"),
+    )
+    audio_sig = None
+    if audio is not None:
+        audio_sig = AudioSignature(audio.get("codec_name"), audio.get("sample_rate"), audio.get("channels"))
+    return StreamSignature(video_sig, audio_sig)
+
+
+def signature_from_json(data):
+    """Rebuilds a StreamSignature from its JSON form (nested lists, as json.dump writes the namedtuples)."""
+    video, audio = data
+    return StreamSignature(VideoSignature(*video), AudioSignature(*audio) if audio is not None else None)
+
+
+def probe_all(paths, max_workers=None):
+    """Probes all paths in parallel. Returns a dict path -> StreamSignature (None for failures)."""
+    signatures = {}
+    with ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) * 4)) as executor:
+        future_to_path = {executor.submit(probe_streams, path): path for path in paths}
+        for future in as_completed(future_to_path):
+            signatures[future_to_path[future]] = future.result()
+    return signatures
+
+
+def choose_target_signature(signatures):
+    """Picks the target profile: the most common full (video, audio) signature, so the largest group of
+    identical clips is stream-copied as-is. If any clip has audio, only clips with audio are candidates
+    (clips without audio then just get a silent track)."""
+    valid = [sig for sig in signatures if sig is not None]
+    if not valid:
+        return None
+    candidates = [sig for sig in valid if sig.audio is not None] or valid
+    return Counter(candidates).most_common(1)[0][0]
+
+
+def _video_matches(video, target_video):
+    """True if the video stream can be stream-copied to the target (a differing timebase is fixed by remuxing)."""
+    return video._replace(time_base=target_video.time_base) == target_video
+
+
+def build_normalize_command(input_path, output_path, signature, target):
+    """Builds the FFmpeg command converting one clip to the target profile, copying whatever already matches."""
+    cmd = ['ffmpeg', '-y', '-i', input_path]
+    add_silence = target.audio is not None and signature.audio is None
+    if add_silence:
+        layout = "mono" if target.audio.channels == 1 else "stereo"
+        cmd += ['-f', 'lavfi', '-i', f"anullsrc=channel_layout={layout}:sample_rate={target.audio.sample_rate}"]
+
+    cmd += ['-map', '0:v:0']
+    if target.audio is not None:
+        cmd += ['-map', '1:a:0' if add_silence else '0:a:0']
+
+    tv = target.video
+    if _video_matches(signature.video, tv):
+        cmd += ['-c:v', 'copy']
+    else:
+        cmd += [
+            '-vf', (f"scale={tv.width}:{tv.height}:force_original_aspect_ratio=decrease,"
+                    f"pad={tv.width}:{tv.height}:(ow-iw)/2:(oh-ih)/2:color=black,setsar=1,"
+                    f"fps={tv.frame_rate},format={tv.pix_fmt}"),
+            '-c:v', VIDEO_ENCODERS.get(tv.codec, 'libx264'),
+            '-preset', NORMALIZE_PRESET,
+            '-crf', str(NORMALIZE_CRF),
+        ]
+    # Match the target timebase so the demuxer does not have to rescale timestamps between files
+    # (for a clip that only differs in timebase this makes the whole job a stream-copy remux)
+    if tv.time_base and tv.time_base.startswith("1/"):
+        cmd += ['-video_track_timescale', tv.time_base[2:]]
+
+    if target.audio is not None:
+        if signature.audio == target.audio:
+            cmd += ['-c:a', 'copy']
+        else:
+            cmd += [
+                '-c:a', AUDIO_ENCODERS.get(target.audio.codec, 'aac'),
+                '-ar', str(target.audio.sample_rate),
+                '-ac', str(target.audio.channels),
+            ]
+        if add_silence:
+            cmd += ['-shortest']
+
+    cmd += ['-movflags', '+faststart', output_path]
+    return cmd
+
+
+def normalize_clip(input_path, output_path, signature, target):
+    """Runs the normalization command for one clip. Returns True on success."""
+    cmd = build_normalize_command(input_path, output_path, signature, target)
+    logger.debug(f"Normalizing {input_path}: {' '.join(cmd)}")
+    returncode, stderr_tail = run_ffmpeg(cmd, label=f"normalize {os.path.basename(input_path)}")
+    if returncode != 0:
+        logger.error(f"Normalization failed for {input_path} (return code {returncode}):\n{stderr_tail}")
+        return False
+    return True
+
+
+def prepare_clips_for_concat(video_files, work_dir, max_workers=NORMALIZE_WORKERS, signatures=None):
+    """Makes a list of clips safe for a `-c copy` concat.
+
+    Returns (clip list to concatenate, normalized dir or None). Clips matching the target profile are
+    returned unchanged; the others are replaced by normalized copies inside work_dir/_normalized,
+    which the caller should remove with cleanup_normalized() once the concat is done.
+    signatures ({path: StreamSignature}) can hold already known signatures; only the other clips are probed.
+    Returns (None, None) if a clip cannot be probed or normalized.
+    """
+    known = signatures or {}
+    signatures = {path: known[path] for path in video_files if known.get(path) is not None}
+    signatures.update(probe_all([path for path in video_files if path not in signatures]))
+    unprobed = [path for path, sig in signatures.items() if sig is None]
+    if unprobed:
+        logger.error(f"Could not probe {len(unprobed)} clip(s), e.g. {unprobed[0]}")
+        return None, None
+
+    target = choose_target_signature(signatures.values())
+    groups = Counter(signatures.values())
+    logger.info(f"Found {len(groups)} distinct stream signature(s) across {len(video_files)} clips. Target: {target}")
+
+    to_normalize = [path for path in video_files if signatures[path] != target]
+    if not to_normalize:
+        logger.info("All clips match the target profile; stream copy is safe.")
+        return list(video_files), None
+    remux_only = sum(1 for path in to_normalize
+                     if _video_matches(signatures[path].video, target.video) and signatures[path].audio == target.audio)
+    if remux_only:
+        logger.info(f"{remux_only} clip(s) only differ in timebase and are remuxed without re-encoding.")
+
+    normalized_dir = os.path.join(work_dir, NORMALIZED_SUBDIR)
+    os.makedirs(normalized_dir, exist_ok=True)
+    if max_workers <= 0:
+        max_workers = max(1, multiprocessing.cpu_count() // 2)
+    logger.info(f"Normalizing {len(to_normalize)} clip(s) with {max_workers} parallel job(s)...")
+
+    replacements = {}
+    failed = False
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_path = {}
+        for i, path in enumerate(to_normalize):
+            # Index prefix keeps outputs unique even if two inputs share a base name
+            base_name = os.path.splitext(os.path.basename(path))[0]
+            output_path = os.path.join(normalized_dir, f"{i:05d}_{base_name}.mp4")
+            future = executor.submit(normalize_clip, path, output_path, signatures[path], target)
+            future_to_path[future] = (path, output_path)
+        for future in as_completed(future_to_path):
+            path, output_path = future_to_path[future]
+            if not future.result():
+                failed = True
+                executor.shutdown(cancel_futures=True)
+                break
+            replacements[path] = output_path
+
+    if failed:
+        cleanup_normalized(normalized_dir)
+        return None, None
+
+    logger.info(f"Normalized {len(replacements)} clip(s); {len(video_files) - len(replacements)} clip(s) will be stream-copied as-is.")
+    return [replacements.get(path, path) for path in video_files], normalized_dir
+
+
+def cleanup_normalized(normalized_dir):
+    """Removes the temporary normalized clips."""
+    if normalized_dir and os.path.isdir(normalized_dir):
+        shutil.rmtree(normalized_dir, ignore_errors=True)
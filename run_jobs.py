@@ -0,0 +1,463 @@
+"""Headless batch runner for all tools.
+
+Runs jobs described as JSON objects without any Tk dialog, many jobs per process, with shared
+worker pools (one Ken Burns render pool for all organize jobs, one OpenAI client per VideoSpeech
+tool) and one JSON line per finished job as result.
+
+Job specs:
+    - a JSON file with one job object, a list of jobs or {"jobs": [...]}
+    - a YAML file (.yaml/.yml, needs PyYAML) with the same structure
+    - "-": JSON lines on stdin, one job per line; jobs start as soon as they are read
+
+Every job is {"tool": <name>, "id": <optional id>, ...parameters}:
+    organize    source, project, [render_mode "clips"|"slideshow"], [seed], [previews]
+    combine     project_folder, [seed] or manifest (rebuild a saved .playlist.json, output next to it)
+    compile     project_folder, runtime ("10min", "1:30:00" or seconds), [seed], [normalize]
+    segments    project_folder, segment_length (10|20|30), [max_segments]
+    previews    project_folder
+    shuffle     folder, [seed], [recover "forward"|"back" for an interrupted shuffle]
+    stitch      folder, [output], [normalize], [trim_to]
+    transcribe  input
+    tts         text_file, [provider "openai"|"elevenlabs"], [voice]
+    translate   input
+
+Results go to stdout (or --output) as JSON lines:
+    {"id": ..., "tool": ..., "status": "ok"|"error", "elapsed": seconds, "result": {...}, "error": "..."}
+Logs and the tools' console output go to stderr and --log-file. The exit code is 1 if any job failed.
+VideoSpeech outputs are written below OUTPUT/ in the current directory, as in interactive use.
+
+Examples:
+    python run_jobs.py jobs.json --jobs 4 --output results.jsonl
+    producer | python run_jobs.py - --render-workers 6
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Put the tool folders (and the repo root, for mediacommon) on the path at import time so spawned
+# render workers can import them too
+for _tool_dir in ("VideoSpeech", "VideoTools", "VideoClipper"):
+    sys.path.insert(0, os.path.join(REPO_DIR, _tool_dir))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+# Scripts whose file names are not importable module names
+SCRIPT_MODULES = {
+    "shuffle_files": "VideoTools/01_shuffle_files.py",
+    "video_stitcher": "VideoTools/02_video_stitcher.py",
+    "audio2text": "VideoSpeech/01_audio2text.py",
+    "text2speech": "VideoSpeech/02_text2speech.py",
+    "video2translated": "VideoSpeech/03_video2translated.py",
+}
+DEFAULT_CONCURRENT_JOBS = 2
+LOG_FILE = "run_jobs.log"
+
+logger = logging.getLogger("run_jobs")
+
+
+class JobError(Exception):
+    """A job that ran but did not succeed; result holds what it produced anyway."""
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+class SharedResources:
+    """Tool modules and worker pools shared by all jobs of one run (created on first use)."""
+
+    def __init__(self, render_workers, mp_context=None):
+        self.render_workers = render_workers
+        self.mp_context = mp_context
+        self._modules = {}
+        self._render_pool = None
+        self._lock = threading.Lock()
+        self._folder_locks = {}
+
+    def module(self, name):
+        with self._lock:
+            if name not in self._modules:
+                if name in SCRIPT_MODULES:
+                    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_DIR, SCRIPT_MODULES[name]))
+                    module = importlib.util.module_from_spec(spec)
+                    sys.modules[name] = module
+                    spec.loader.exec_module(module)
+                else:
+                    module = importlib.import_module(name)
+                if name == "video_combiner":
+                    module.SHOW_DIALOGS = False
+                self._modules[name] = module
+            return self._modules[name]
+
+    def render_pool(self):
+        media_organizer = self.module("media_organizer")
+        with self._lock:
+            if self._render_pool is None:
+                self._render_pool = media_organizer.create_process_pool(self.render_workers, mp_context=self.mp_context)
+            return self._render_pool
+
+    def folder_lock(self, folder):
+        """Serializes jobs writing numbered outputs into the same folder."""
+        with self._lock:
+            return self._folder_locks.setdefault(os.path.abspath(folder), threading.Lock())
+
+    def shutdown(self):
+        if self._render_pool is not None:
+            self._render_pool.shutdown(wait=True)
+
+
+# --- Tool handlers: each takes (job, shared) and returns a JSON-serializable result dict ---
+
+def run_organize(job, shared):
+    media_organizer = shared.module("media_organizer")
+    duration_cache = shared.module("duration_cache")
+    source = os.path.abspath(job["source"])
+    project_folder, folders = media_organizer.create_project_folders(source, job["project"])
+    moved_images, clip_durations, placed, errors = media_organizer.organize_files(source, folders)
+
+    result = {"project_folder": project_folder, "placed": placed, "images": len(moved_images), "rendered": 0, "render_failures": 0}
+    render_mode = job.get("render_mode", media_organizer.IMAGE_RENDER_MODE)
+    if moved_images and render_mode == "slideshow":
+        images = list(moved_images)
+        random.Random(job.get("seed")).shuffle(images)
+        with shared.folder_lock(project_folder):
+            slideshow_path = media_organizer.get_next_slideshow_filename(project_folder)
+            if media_organizer.render_slideshow_compilation(images, slideshow_path):
+                result["rendered"], result["slideshow"] = 1, slideshow_path
+            else:
+                result["render_failures"] = 1
+    elif moved_images:
+        tasks = media_organizer.build_conversion_tasks(moved_images, folders["img_vids"])
+        max_in_flight = shared.render_workers * media_organizer.MAX_IN_FLIGHT_PER_PROCESS
+        for task, future in media_organizer.iter_bounded_results(
+                shared.render_pool(), media_organizer.process_image_to_video, tasks, max_in_flight):
+            try:
+                _, success = future.result()
+            except Exception as e:
+                logger.error(f"Render worker failed for {task[0]}: {e}")
+                success = False
+            if success:
+                result["rendered"] += 1
+                clip_durations[task[1]] = media_organizer.IMAGE_VIDEO_DURATION
+            else:
+                result["render_failures"] += 1
+
+    duration_cache.update_duration_cache(project_folder, clip_durations)
+    if job.get("previews", media_organizer.GENERATE_PREVIEWS):
+        rendered, cached, failures = shared.module("preview_generator").generate_project_previews(project_folder)
+        result["previews"] = {"rendered": rendered, "cached": cached, "failed": failures}
+        errors = errors or failures > 0
+    if errors or result["render_failures"]:
+        raise JobError("Some files could not be placed or rendered, or previews failed (see log)", result)
+    return result
+
+
+def _concat_playlist(shared, root_folder, playlist, seed, source_folder, total_duration, **concat_options):
+    """Concatenates the playlist into the next numbered output of root_folder and writes its manifest.
+
+    The manifest is only written once the output exists, so a rebuild never trusts a failed run's manifest.
+    """
+    video_combiner = shared.module("video_combiner")
+    with shared.folder_lock(root_folder):
+        output_path = video_combiner.get_next_output_filename(root_folder)
+        if not output_path:
+            raise JobError(f"Could not scan {root_folder} for existing outputs")
+        result = {"output": output_path, "manifest": None, "seed": seed, "clips": len(playlist)}
+        if not video_combiner.concatenate_videos(playlist, output_path, total_duration=total_duration, **concat_options):
+            raise JobError("Concatenation failed (see log)", result)
+        manifest_path = os.path.splitext(output_path)[0] + video_combiner.PLAYLIST_MANIFEST_EXTENSION
+        video_combiner.write_playlist_manifest(manifest_path, seed, playlist, source_folder)
+        result["manifest"] = manifest_path
+    return result
+
+
+def run_combine(job, shared):
+    video_combiner = shared.module("video_combiner")
+    if job.get("manifest"):
+        seed, playlist, source_folder = video_combiner.load_playlist_manifest(job["manifest"])
+        missing = [path for path in playlist if not os.path.isfile(path)]
+        if missing:
+            raise JobError(f"{len(missing)} clip(s) of the manifest are missing, e.g. {missing[0]}")
+        root_folder = os.path.dirname(os.path.abspath(job["manifest"]))
+        total_duration = video_combiner.get_playlist_duration(root_folder, playlist)
+        return _concat_playlist(shared, root_folder, playlist, seed, source_folder, total_duration)
+    root_folder = os.path.abspath(job["project_folder"])
+    target_folder = os.path.join(root_folder, video_combiner.TARGET_SUBFOLDER)
+    seed, playlist = video_combiner.build_shuffled_playlist(target_folder, job.get("seed"))
+    if not playlist:
+        raise JobError(f"No video files found in {target_folder}")
+    total_duration = video_combiner.get_playlist_duration(root_folder, playlist)
+    return _concat_playlist(shared, root_folder, playlist, seed, target_folder, total_duration)
+
+
+def run_compile(job, shared):
+    compilation_builder = shared.module("compilation_builder")
+    project_folder = os.path.abspath(job["project_folder"])
+    target_seconds = compilation_builder.parse_runtime(str(job["runtime"]))
+    bucket_durations = compilation_builder.collect_bucket_durations(project_folder, compilation_builder.BUCKET_MIX)
+    seed = job.get("seed", random.randrange(2**32))
+    playlist, total = compilation_builder.select_clips(bucket_durations, target_seconds, compilation_builder.BUCKET_MIX, seed)
+    if not playlist:
+        raise JobError("No clips with a known duration were found in the buckets")
+    normalize = job.get("normalize", compilation_builder.NORMALIZE_BEFORE_CONCAT)
+    signatures = compilation_builder.collect_stream_signatures(project_folder, playlist) if normalize else None
+    result = _concat_playlist(shared, project_folder, playlist, seed, project_folder, total,
+                              normalize=normalize, signatures=signatures)
+    result["duration"] = total
+    return result
+
+
+def run_segments(job, shared):
+    segment_extractor = shared.module("segment_extractor")
+    segment_length = int(job["segment_length"])
+    if segment_length not in segment_extractor.SEGMENT_BUCKETS:
+        raise JobError(f"Unsupported segment length {segment_length}; use one of {list(segment_extractor.SEGMENT_BUCKETS)}")
+    created, failures = segment_extractor.extract_project_segments(
+        os.path.abspath(job["project_folder"]), segment_length,
+        job.get("max_segments", segment_extractor.MAX_SEGMENTS_PER_VIDEO)
+    )
+    result = {"segments": created, "failed_videos": failures}
+    if failures:
+        raise JobError(f"{failures} video(s) failed", result)
+    return result
+
+
+def run_previews(job, shared):
+    preview_generator = shared.module("preview_generator")
+    rendered, cached, failures = preview_generator.generate_project_previews(os.path.abspath(job["project_folder"]))
+    result = {"rendered": rendered, "cached": cached, "failed": failures}
+    if failures:
+        raise JobError(f"{failures} preview(s) failed", result)
+    return result
+
+
+def run_shuffle(job, shared):
+    shuffle_files = shared.module("shuffle_files")
+    folder = os.path.abspath(job["folder"])
+    if shuffle_files.read_journal(folder) is not None:
+        if job.get("recover") not in ("forward", "back"):
+            raise JobError("The folder has an interrupted shuffle; pass recover 'forward' or 'back'")
+        shuffle_files.recover(folder, roll_forward=job["recover"] == "forward")
+        return {"recovered": job["recover"]}
+    return {"files": shuffle_files.shuffle_in_place(folder, job.get("seed"))}
+
+
+def run_stitch(job, shared):
+    video_stitcher = shared.module("video_stitcher")
+    folder = os.path.abspath(job["folder"])
+    output_dir = os.path.join(folder, "OUTPUT")
+    os.makedirs(output_dir, exist_ok=True)
+    with shared.folder_lock(output_dir):
+        output = job.get("output") or video_stitcher.get_next_output_filename(output_dir)
+        success = video_stitcher.stitch_videos_ffmpeg(
+            folder, output,
+            normalize=job.get("normalize", video_stitcher.NORMALIZE_BEFORE_CONCAT),
+            trim_to=job.get("trim_to", video_stitcher.TRIM_CLIPS_TO),
+        )
+    if not success:
+        raise JobError("Stitching failed", {"output": output})
+    return {"output": output}
+
+
+def run_transcribe(job, shared):
+    transcript = shared.module("audio2text").process_media_file(os.path.abspath(job["input"]))
+    if not transcript:
+        raise JobError("Transcription failed")
+    return {"transcript": os.path.abspath(transcript)}
+
+
+def run_tts(job, shared):
+    audio = shared.module("text2speech").text_to_speech(
+        os.path.abspath(job["text_file"]), job.get("provider", "openai"), job.get("voice")
+    )
+    if not audio:
+        raise JobError("Speech generation failed")
+    return {"audio": os.path.abspath(audio)}
+
+
+def run_translate(job, shared):
+    video2translated = shared.module("video2translated")
+    input_path, file_type, output_folder = video2translated.prepare_input(os.path.abspath(job["input"]))
+    if not file_type:
+        raise JobError(f"Unsupported input file: {job['input']}")
+    if not video2translated.translate_media(input_path, file_type, output_folder):
+        raise JobError("Translation pipeline failed", {"output_folder": os.path.abspath(output_folder)})
+    return {"output_folder": os.path.abspath(output_folder)}
+
+
+TOOLS = {
+    "organize": run_organize,
+    "combine": run_combine,
+    "compile": run_compile,
+    "segments": run_segments,
+    "previews": run_previews,
+    "shuffle": run_shuffle,
+    "stitch": run_stitch,
+    "transcribe": run_transcribe,
+    "tts": run_tts,
+    "translate": run_translate,
+}
+# Parameters each tool needs (see the module docstring); a tuple means one of its keys is enough
+REQUIRED_PARAMS = {
+    "organize": ("source", "project"),
+    "combine": (("project_folder", "manifest"),),
+    "compile": ("project_folder", "runtime"),
+    "segments": ("project_folder", "segment_length"),
+    "previews": ("project_folder",),
+    "shuffle": ("folder",),
+    "stitch": ("folder",),
+    "transcribe": ("input",),
+    "tts": ("text_file",),
+    "translate": ("input",),
+}
+
+
+# --- Job loading and execution ---
+
+def iter_json_lines(lines):
+    """Yields (job index, job dict or exception) for JSON lines; a bad line becomes that job's error."""
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except ValueError as e:
+            yield index, e
+        index += 1
+
+
+def iter_jobs(spec_path):
+    """Yields (job index, job dict or exception) from a JSON/YAML file or stdin JSON lines ("-")."""
+    if spec_path == "-":
+        yield from iter_json_lines(sys.stdin)
+        return
+
+    with open(spec_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if spec_path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("YAML job specs need PyYAML (pip install pyyaml); use JSON otherwise.")
+        spec = yaml.safe_load(text)
+    else:
+        try:
+            spec = json.loads(text)
+        except ValueError as e:
+            # Not a single JSON document: JSON lines if the first job is a one-line object
+            first_line = next((line.strip() for line in text.splitlines() if line.strip()), "")
+            if not (first_line.startswith("{") and first_line.endswith("}")):
+                raise SystemExit(f"Invalid job spec {spec_path}: {e}")
+            yield from iter_json_lines(text.splitlines())
+            return
+    if isinstance(spec, dict):
+        spec = spec.get("jobs", [spec])
+    yield from enumerate(spec)
+
+
+def missing_params(job):
+    """Returns the required parameters of the job's tool that the job does not set."""
+    missing = []
+    for required in REQUIRED_PARAMS.get(job.get("tool"), ()):
+        alternatives = required if isinstance(required, tuple) else (required,)
+        if all(job.get(key) is None for key in alternatives):
+            missing.append(" or ".join(alternatives))
+    return missing
+
+
+def run_job(index, job, shared):
+    """Runs one job and returns its result record."""
+    started = time.time()
+    if isinstance(job, Exception):
+        return {"id": index, "tool": None, "status": "error", "elapsed": 0.0, "error": f"Invalid job spec: {job}"}
+    if not isinstance(job, dict):
+        return {"id": index, "tool": None, "status": "error", "elapsed": 0.0, "error": f"Invalid job spec: {job!r} is not an object"}
+    job_id = job.get("id", index)
+    tool = job.get("tool")
+    record = {"id": job_id, "tool": tool, "status": "ok"}
+    try:
+        if tool not in TOOLS:
+            raise JobError(f"Unknown tool {tool!r}; available: {', '.join(TOOLS)}")
+        missing = missing_params(job)
+        if missing:
+            raise JobError(f"Missing job parameter(s): {', '.join(missing)}")
+        logger.info(f"job={job_id} tool={tool} started")
+        record["result"] = TOOLS[tool](job, shared)
+    except JobError as e:
+        record.update(status="error", error=str(e))
+        if e.result is not None:
+            record["result"] = e.result
+    except Exception as e:
+        logger.exception(f"job={job_id} tool={tool} crashed")
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["elapsed"] = round(time.time() - started, 2)
+    logger.info(f"job={job_id} tool={tool} status={record['status']} elapsed={record['elapsed']}s")
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run tool jobs headlessly from a JSON/YAML job spec or stdin JSON lines.")
+    parser.add_argument("spec", help="Job spec file (.json, .jsonl, .yaml) or - for JSON lines on stdin")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_CONCURRENT_JOBS, help="Jobs running concurrently")
+    parser.add_argument("--render-workers", type=int, default=max(1, multiprocessing.cpu_count() - 1),
+                        help="Processes in the shared Ken Burns render pool")
+    parser.add_argument("--output", help="Write the JSON-lines results to this file instead of stdout")
+    parser.add_argument("--log-file", default=LOG_FILE, help="Log file (the log is also written to stderr)")
+    parser.add_argument("--ffmpeg-metrics", metavar="PATH",
+                        help="Append FFmpeg progress/throughput records of all renders to this JSON-lines file")
+    args = parser.parse_args()
+    if args.ffmpeg_metrics:
+        # Before the render pool is created, so the workers inherit it
+        from mediacommon.ffmpeg_progress import enable_metrics
+        enable_metrics(args.ffmpeg_metrics)
+
+    # One log listener for this process and the render workers (see media_organizer.setup_logging).
+    # Jobs run on threads, so the render workers are spawned rather than forked.
+    import media_organizer
+    mp_context = multiprocessing.get_context("spawn")
+    log_listener = media_organizer.setup_logging(args.log_file, mp_context)
+
+    results_stream = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    shared = SharedResources(args.render_workers, mp_context)
+    failed = 0
+    # The tools print progress to stdout; keep stdout for the machine-readable results only
+    with contextlib.redirect_stdout(sys.stderr), ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        in_flight = set()
+
+        def emit(futures):
+            nonlocal failed
+            for future in futures:
+                record = future.result()
+                failed += record["status"] != "ok"
+                results_stream.write(json.dumps(record) + "\n")
+                results_stream.flush()
+
+        try:
+            for index, job in iter_jobs(args.spec):
+                # Bounded, so a long stdin stream is consumed at the pace the jobs finish
+                if len(in_flight) >= args.jobs * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    emit(done)
+                in_flight.add(executor.submit(run_job, index, job, shared))
+            emit(wait(in_flight).done)
+        finally:
+            shared.shutdown()
+            if args.output:
+                results_stream.close()
+            log_listener.stop()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Same import layout as run_jobs: the tool folders plus the repo root (for mediacommon)
+for _tool_dir in ("VideoSpeech", "VideoTools", "VideoClipper"):
+    sys.path.insert(0, os.path.join(REPO_DIR, _tool_dir))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+
+def load_script(name, relative_path):
+    """Imports a script whose file name is not a module name (e.g. VideoSpeech/02_text2speech.py)."""
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_DIR, relative_path))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+@pytest.fixture
+def script():
+    return load_script
@@ -0,0 +1,45 @@
+import numpy as np
+
+import chunked_transcription
+from chunked_transcription import find_split_points, stitch_transcripts, transcribe_file
+
+FRAMES_PER_SECOND = 1000 // chunked_transcription.RMS_FRAME_MS
+
+
+def test_splits_land_in_the_pause_near_each_target():
+    rms = np.full(700 * FRAMES_PER_SECOND, 1000.0, dtype=np.float32)
+    for pause in (290, 610):
+        rms[pause * FRAMES_PER_SECOND:(pause + 2) * FRAMES_PER_SECOND] = 0.0
+    splits = find_split_points(rms, target_seconds=300, search_seconds=30)
+    assert len(splits) == 2
+    assert 290 <= splits[0] <= 292
+    assert 610 <= splits[1] <= 612
+
+
+def test_short_audio_is_not_split():
+    assert find_split_points(np.ones(320 * FRAMES_PER_SECOND, dtype=np.float32), 300, 30) == []
+
+
+def test_srt_timestamps_are_shifted_and_renumbered():
+    part = "1\n00:00:01,000 --> 00:00:02,500\nHello\n\n2\n00:00:03,000 --> 00:00:04,000\nWorld\n"
+    stitched = stitch_transcripts([part, part], [0.0, 300.0], "srt")
+    assert "4\n00:05:03,000 --> 00:05:04,000\nWorld" in stitched
+    assert stitched.startswith("1\n00:00:01,000 --> 00:00:02,500\nHello")
+
+
+def test_chunks_are_extracted_lazily_and_stitched_in_order(tmp_path, monkeypatch):
+    audio = tmp_path / "audio.ogg"
+    audio.write_bytes(b"audio")
+    monkeypatch.setattr(chunked_transcription, "CHUNKED_TRANSCRIPTION", "always")
+    monkeypatch.setattr(chunked_transcription, "plan_chunks", lambda path: [(0.0, 290.0), (290.0, 310.0), (600.0, 50.0)])
+    monkeypatch.setattr(chunked_transcription, "extract_chunk",
+                        lambda path, index, start, duration: (f"chunk_{index:04d}.wav", f"{start}".encode()))
+    transcript = transcribe_file(str(audio), lambda file: f"text from {file[1].decode()}")
+    assert transcript == "text from 0.0\ntext from 290.0\ntext from 600.0"
+
+
+def test_short_files_are_uploaded_whole(tmp_path, monkeypatch):
+    audio = tmp_path / "audio.ogg"
+    audio.write_bytes(b"audio")
+    monkeypatch.setattr(chunked_transcription, "CHUNKED_TRANSCRIPTION", "never")
+    assert transcribe_file(str(audio), lambda file: file.read().decode()) == "audio"
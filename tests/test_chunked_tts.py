@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+import chunked_tts as tts
+
+
+def sentences(count, start=0):
+    return " ".join(f"Sentence number {i} says something short." for i in range(start, start + count))
+
+
+def test_chunks_fit_and_keep_paragraph_ends():
+    text = sentences(40) + "\n\n" + sentences(3, start=100)
+    chunks = tts.split_text(text, 200, first_max_chars=60)
+    assert all(len(chunk) <= 200 for chunk, _ in chunks)
+    assert len(chunks[0][0]) <= 60
+    assert [end for _, end in chunks].count(True) == 2
+    assert chunks[-1][0].endswith("Sentence number 102 says something short.")
+    assert " ".join(chunk for chunk, _ in chunks) == " ".join(text.split())
+
+
+def test_long_sentence_is_cut_at_words():
+    chunks = tts.split_text("word " * 100, 50)
+    assert all(len(chunk) <= 50 for chunk, _ in chunks)
+    assert " ".join(chunk for chunk, _ in chunks).split() == ["word"] * 100
+
+
+def test_editing_one_sentence_keeps_the_other_chunks():
+    text = sentences(60)
+    edited = text.replace("Sentence number 30 says something short.", "Sentence number 30 now says something much longer.")
+    before = tts.split_text(text, 1500, first_max_chars=300)
+    after = tts.split_text(edited, 1500, first_max_chars=300)
+    assert len(before) > 3
+    changed = set(after) - set(before)
+    assert len(changed) == 1 and "number 30 now" in next(iter(changed))[0]
+    assert set(before) - set(after) == {chunk for chunk in before if "number 30 " in chunk[0]}
+
+
+def test_short_text_is_one_chunk():
+    assert tts.split_text("  Hello   there.\n", 1500, first_max_chars=300) == [("Hello there.", True)]
+
+
+def test_empty_text_is_rejected_before_ffmpeg_starts(monkeypatch):
+    def no_ffmpeg(*args, **kwargs):
+        raise AssertionError("ffmpeg started")
+
+    monkeypatch.setattr(tts.subprocess, "Popen", no_ffmpeg)
+    with pytest.raises(ValueError):
+        tts.synthesize_in_chunks(" \n\n ", "out.mp3", None, 1500, {"provider": "x", "voice": "v", "model": "m"})
+
+
+def test_failed_chunk_removes_the_partial_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts.tts_cache, "CACHE_ENABLED", False)
+    output = tmp_path / "out.mp3"
+
+    class FakeEncoder:
+        # Stands in for ffmpeg: creates the output as soon as it starts
+        def __init__(self, cmd, **kwargs):
+            output.write_bytes(b"partial")
+            self.stdin = io.BytesIO()
+            self.stderr = io.BytesIO()
+
+        def kill(self):
+            pass
+
+        def wait(self):
+            return -9
+
+    def fail(chunk):
+        raise RuntimeError("API error")
+
+    monkeypatch.setattr(tts.subprocess, "Popen", FakeEncoder)
+    with pytest.raises(RuntimeError):
+        tts.synthesize_in_chunks("One sentence. Another one.", str(output), fail, 1500,
+                                 {"provider": "x", "voice": "v", "model": "m"})
+    assert not output.exists()
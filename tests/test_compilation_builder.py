@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from compilation_builder import fill_gap_subset_sum, parse_runtime, select_clips
+from duration_cache import get_cached_durations, get_cached_streams, update_duration_cache, update_stream_cache
+from mediacommon.stream_compat import AudioSignature, StreamSignature, VideoSignature, signature_from_json
+
+
+def test_subset_sum_finds_exact_fit():
+    candidates = [("a", 7.0), ("b", 5.0), ("c", 4.0), ("d", 3.0)]
+    chosen = fill_gap_subset_sum(candidates, 12.0)
+    assert sum(dict(candidates)[path] for path in chosen) == pytest.approx(12.0)
+
+
+def test_subset_sum_never_exceeds_gap():
+    rng = random.Random(1)
+    for _ in range(200):
+        candidates = [(str(i), round(rng.uniform(0.5, 30), 3)) for i in range(12)]
+        gap = rng.uniform(1, 60)
+        chosen = fill_gap_subset_sum(candidates, gap)
+        assert sum(dict(candidates)[path] for path in chosen) <= gap + 1e-9
+
+
+def test_subset_sum_rounds_durations_up():
+    # round(10.04 / 0.1) would count 10.04s as 10.0s and overshoot a 10.0s gap
+    assert fill_gap_subset_sum([("a", 10.04)], 10.0) == []
+    assert fill_gap_subset_sum([("a", 0.3)], 0.3) == ["a"]
+
+
+def test_select_clips_respects_target():
+    buckets = {
+        "01_IMAGES_VIDS": {f"img{i}": 7.0 for i in range(20)},
+        "02_VIDS_10s": {f"ten{i}": 10.0 for i in range(10)},
+        "03_VIDS_20s": {f"twenty{i}": 20.0 for i in range(5)},
+    }
+    playlist, total = select_clips(buckets, 100.0, seed=3)
+    assert total <= 100.0
+    assert 100.0 - total < 7.0 # Closer than the shortest clip
+    assert len(set(playlist)) == len(playlist)
+    assert select_clips(buckets, 100.0, seed=3) == (playlist, total)
+
+
+@pytest.mark.parametrize("text, seconds", [("90", 90), ("90s", 90), ("10min", 600), ("1h30m", 5400), ("1:30:00", 5400)])
+def test_parse_runtime(text, seconds):
+    assert parse_runtime(text) == seconds
+
+
+def test_stream_signatures_are_cached_with_durations(tmp_path):
+    bucket = tmp_path / "02_VIDS_10s"
+    bucket.mkdir()
+    clip = bucket / "a.mp4"
+    clip.write_bytes(b"x")
+    signature = StreamSignature(VideoSignature("h264", 1920, 1080, "yuv420p", "30/1", "1/15360"),
+                                AudioSignature("aac", "48000", 2))
+    update_duration_cache(str(tmp_path), {str(clip): 10.0})
+    update_stream_cache(str(tmp_path), {str(clip): signature})
+    cached = get_cached_streams(str(tmp_path), [str(clip)])
+    assert signature_from_json(cached[str(clip)]) == signature
+    # Re-caching the duration of an unchanged clip keeps its signature
+    update_duration_cache(str(tmp_path), {str(clip): 10.0})
+    assert get_cached_streams(str(tmp_path), [str(clip)]) == cached
+    assert get_cached_durations(str(tmp_path), "02_VIDS_10s") == {str(clip): 10.0}
+    clip.write_bytes(b"changed")
+    assert get_cached_streams(str(tmp_path), [str(clip)]) == {}
@@ -0,0 +1,49 @@
+import os
+
+import file_placement
+from file_placement import is_placed, load_placed_ledger, place_files, record_placed, save_placed_ledger
+
+
+def test_fsync_opens_files_writable(tmp_path, monkeypatch):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"data")
+    opened = []
+    real_open = os.open
+    monkeypatch.setattr(file_placement.os, "open", lambda p, flags, *a: opened.append(flags) or real_open(p, flags, *a))
+    file_placement._fsync_path(str(path))
+    assert opened[0] & os.O_RDWR
+
+
+def test_cross_device_copy_commits_and_removes_source(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_placement, "same_device", lambda src, dest: False)
+    src = tmp_path / "a.mp4"
+    src.write_bytes(b"x" * 1000)
+    dest = tmp_path / "out" / "a.mp4"
+    dest.parent.mkdir()
+    assert place_files([(str(src), str(dest))]) == {str(src): True}
+    assert dest.read_bytes() == b"x" * 1000
+    assert not src.exists()
+    assert not os.path.exists(str(dest) + file_placement.PART_SUFFIX)
+
+
+def test_hardlink_keeps_source(tmp_path):
+    src = tmp_path / "a.jpg"
+    src.write_bytes(b"image")
+    dest = tmp_path / "images" / "a.jpg"
+    dest.parent.mkdir()
+    assert place_files([(str(src), str(dest))], mode="hardlink") == {str(src): True}
+    assert src.exists() and dest.read_bytes() == b"image"
+
+
+def test_ledger_skips_unchanged_sources_only(tmp_path):
+    src = tmp_path / "a.jpg"
+    src.write_bytes(b"image")
+    ledger_path = str(tmp_path / file_placement.PLACED_LEDGER_FILENAME)
+    ledger = {}
+    record_placed(ledger, str(src))
+    save_placed_ledger(ledger_path, ledger)
+    ledger = load_placed_ledger(ledger_path)
+    assert is_placed(ledger, str(src))
+    assert not is_placed(ledger, str(tmp_path / "b.jpg"))
+    src.write_bytes(b"a new image with the same name")
+    assert not is_placed(ledger, str(src))
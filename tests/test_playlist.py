@@ -0,0 +1,21 @@
+import os
+
+from video_combiner import load_playlist_manifest, shuffle_files, write_playlist_manifest
+
+
+def test_shuffle_is_reproducible_for_a_seed():
+    files = [f"{i:03d}.mp4" for i in range(50)]
+    assert shuffle_files(files, 7) == shuffle_files(files, 7)
+    assert sorted(shuffle_files(files, 7)) == files
+
+
+def test_manifest_round_trip(tmp_path):
+    source = tmp_path / "01_IMAGES_VIDS"
+    source.mkdir()
+    playlist = [str(source / name) for name in ("b.mp4", "a.mp4", "c.mp4")]
+    manifest_path = tmp_path / "combined_video_001.playlist.json"
+    write_playlist_manifest(str(manifest_path), 1234, playlist, str(source))
+    seed, paths, source_folder = load_playlist_manifest(str(manifest_path))
+    assert seed == 1234
+    assert [os.path.normpath(p) for p in paths] == playlist
+    assert source_folder == str(source)
@@ -0,0 +1,35 @@
+import threading
+
+import preview_generator
+
+
+def make_project(tmp_path, count):
+    bucket = tmp_path / "02_VIDS_10s"
+    bucket.mkdir()
+    for i in range(count):
+        (bucket / f"clip{i}.mp4").write_bytes(f"clip {i}".encode())
+    return str(tmp_path)
+
+
+def test_progress_is_reported_per_clip(tmp_path, monkeypatch):
+    monkeypatch.setattr(preview_generator, "render_preview", lambda *args: "rendered")
+    progress = []
+    result = preview_generator.generate_project_previews(
+        make_project(tmp_path, 3), max_workers=2, on_progress=lambda done, total: progress.append((done, total))
+    )
+    assert result == (3, 0, 0)
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_cancel_skips_remaining_clips(tmp_path, monkeypatch):
+    cancel_event = threading.Event()
+
+    def render(*args):
+        cancel_event.set()
+        return "rendered"
+
+    monkeypatch.setattr(preview_generator, "render_preview", render)
+    rendered, cached, failures = preview_generator.generate_project_previews(
+        make_project(tmp_path, 5), max_workers=1, cancel_event=cancel_event
+    )
+    assert (rendered, cached, failures) == (1, 0, 0)
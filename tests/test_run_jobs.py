@@ -0,0 +1,99 @@
+import io
+import json
+
+import pytest
+
+
+@pytest.fixture
+def run_jobs(script):
+    return script("run_jobs", "run_jobs.py")
+
+
+def test_json_lines_file_reports_bad_lines_per_job(run_jobs, tmp_path):
+    spec = tmp_path / "jobs.jsonl"
+    spec.write_text('{"tool": "previews", "project_folder": "a"}\n\n{"tool": broken\n{"tool": "shuffle", "folder": "b"}\n')
+    jobs = list(run_jobs.iter_jobs(str(spec)))
+    assert [index for index, _ in jobs] == [0, 1, 2]
+    assert jobs[0][1]["project_folder"] == "a"
+    assert isinstance(jobs[1][1], ValueError)
+    assert jobs[2][1]["folder"] == "b"
+
+
+def test_stdin_json_lines(run_jobs, monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO('{"tool": "previews"}\nnot json\n'))
+    jobs = list(run_jobs.iter_jobs("-"))
+    assert jobs[0] == (0, {"tool": "previews"})
+    assert isinstance(jobs[1][1], ValueError)
+
+
+@pytest.mark.parametrize("spec", [
+    [{"tool": "previews"}, {"tool": "shuffle"}],
+    {"jobs": [{"tool": "previews"}, {"tool": "shuffle"}]},
+])
+def test_json_document_specs(run_jobs, tmp_path, spec):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps(spec, indent=2))
+    assert [job["tool"] for _, job in run_jobs.iter_jobs(str(path))] == ["previews", "shuffle"]
+
+
+def test_broken_json_document_is_rejected(run_jobs, tmp_path):
+    path = tmp_path / "jobs.json"
+    path.write_text('[\n  {"tool": "previews"},\n')
+    with pytest.raises(SystemExit):
+        list(run_jobs.iter_jobs(str(path)))
+
+
+def test_invalid_jobs_become_error_records(run_jobs):
+    assert run_jobs.run_job(3, ValueError("bad"), None)["status"] == "error"
+    assert run_jobs.run_job(4, 42, None)["status"] == "error"
+    record = run_jobs.run_job(5, {"tool": "nope"}, None)
+    assert record["status"] == "error" and "Unknown tool" in record["error"]
+
+
+@pytest.mark.parametrize("concat_succeeds", [False, True])
+def test_manifest_is_written_only_for_a_produced_output(run_jobs, tmp_path, monkeypatch, concat_succeeds):
+    shared = run_jobs.SharedResources(render_workers=1)
+    video_combiner = shared.module("video_combiner")
+    monkeypatch.setattr(video_combiner, "concatenate_videos", lambda *args, **kwargs: concat_succeeds)
+    playlist = [str(tmp_path / "clips" / "a.mp4")]
+    manifest = tmp_path / "combined_video_001.playlist.json"
+    if concat_succeeds:
+        result = run_jobs._concat_playlist(shared, str(tmp_path), playlist, 7, str(tmp_path / "clips"), None)
+        assert result["manifest"] == str(manifest) and manifest.exists()
+    else:
+        with pytest.raises(run_jobs.JobError):
+            run_jobs._concat_playlist(shared, str(tmp_path), playlist, 7, str(tmp_path / "clips"), None)
+        assert not manifest.exists()
+
+
+def test_tool_modules_do_not_load_tkinter(run_jobs):
+    import subprocess
+    import sys
+    # A fresh interpreter, since the test session may already have imported tkinter
+    code = (
+        "import sys\n"
+        "import run_jobs\n"
+        "shared = run_jobs.SharedResources(render_workers=1)\n"
+        "for name in ('video_combiner', 'compilation_builder', 'segment_extractor', 'preview_generator',\n"
+        "             'media_organizer', 'shuffle_files', 'video_stitcher'):\n"
+        "    shared.module(name)\n"
+        "print('tkinter' in sys.modules)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=run_jobs.REPO_DIR, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
+
+
+def test_missing_parameters_are_reported_before_running(run_jobs):
+    record = run_jobs.run_job(0, {"tool": "combine"}, shared=None)
+    assert record["status"] == "error"
+    assert record["error"] == "Missing job parameter(s): project_folder or manifest"
+
+
+def test_key_error_inside_a_tool_is_not_a_missing_parameter(run_jobs, monkeypatch, caplog):
+    def broken(job, shared):
+        return {}["internal"]
+
+    monkeypatch.setitem(run_jobs.TOOLS, "previews", broken)
+    record = run_jobs.run_job(0, {"tool": "previews", "project_folder": "p"}, shared=None)
+    assert record["error"] == "KeyError: 'internal'"
+    assert any(r.exc_info for r in caplog.records) # Logged with its traceback
@@ -0,0 +1,19 @@
+import os
+
+import segment_extractor
+
+
+def test_video_with_a_failed_cut_counts_as_failed(tmp_path, monkeypatch):
+    source = tmp_path / segment_extractor.SOURCE_SUBFOLDER
+    source.mkdir()
+    for name in ("good.mp4", "bad.mp4"):
+        (source / name).write_bytes(b"")
+
+    def fake_extract(path, output_dir, segment_length, max_segments):
+        if os.path.basename(path) == "bad.mp4":
+            return {}, [(0.0, 10.0)]
+        return {os.path.join(output_dir, "good_10s_001.mp4"): 10.0}, []
+
+    monkeypatch.setattr(segment_extractor, "extract_segments", fake_extract)
+    monkeypatch.setattr(segment_extractor, "update_duration_cache", lambda folder, created: None)
+    assert segment_extractor.extract_project_segments(str(tmp_path), 10) == (1, 1)
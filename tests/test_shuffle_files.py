@@ -0,0 +1,100 @@
+import os
+import random
+
+import pytest
+
+
+@pytest.fixture
+def shuffle(script):
+    return script("shuffle_files", "VideoTools/01_shuffle_files.py")
+
+
+def simulate(ops, names):
+    """Applies ops to a set of names, failing on any overwrite, like _safe_rename."""
+    names = set(names)
+    for old, new in ops:
+        assert old in names and new not in names, (old, new)
+        names.remove(old)
+        names.add(new)
+    return names
+
+
+def test_chains_and_cycles_use_minimum_renames(shuffle):
+    mapping = {"a": "b", "b": "c", "c": "new", "x": "y", "y": "x", "same": "same"}
+    ops = shuffle.plan_renames(mapping)
+    assert simulate(ops, mapping) == {"b", "c", "new", "x", "y", "same"}
+    # Five moved files, one cycle (one temporary name)
+    assert len(ops) == 6
+
+
+def test_random_permutations_never_overwrite(shuffle):
+    rng = random.Random(5)
+    for _ in range(50):
+        names = [f"{i:03d}.mp4" for i in range(1, rng.randint(2, 40))] + ["clip.mov", "photo.jpg"]
+        targets = list(names)
+        rng.shuffle(targets)
+        mapping = dict(zip(names, targets))
+        assert simulate(shuffle.plan_renames(mapping), names) == set(targets)
+
+
+def make_folder(tmp_path, count):
+    for i in range(count):
+        (tmp_path / f"{i + 1:03d}.mp4").write_text(f"clip {i}")
+    return {p.name: p.read_text() for p in tmp_path.iterdir()}
+
+
+def test_shuffle_renames_to_sequence(shuffle, tmp_path):
+    before = make_folder(tmp_path, 20)
+    shuffle.shuffle_in_place(str(tmp_path), seed=1)
+    after = {p.name: p.read_text() for p in tmp_path.iterdir()}
+    assert sorted(after) == sorted(before) # Same names, no journal left
+    assert sorted(after.values()) == sorted(before.values())
+    assert after != before
+
+
+def interrupt_after(shuffle, monkeypatch, renames):
+    real_rename = shuffle._safe_rename
+    calls = []
+
+    def failing_rename(*args):
+        if len(calls) == renames:
+            raise OSError("interrupted")
+        calls.append(args)
+        real_rename(*args)
+
+    monkeypatch.setattr(shuffle, "_safe_rename", failing_rename)
+
+
+def apply_ops(ops, contents):
+    contents = dict(contents)
+    for old, new in ops:
+        contents[new] = contents.pop(old)
+    return contents
+
+
+@pytest.mark.parametrize("roll_forward", [True, False])
+def test_recover_interrupted_shuffle(shuffle, tmp_path, monkeypatch, roll_forward):
+    before = make_folder(tmp_path, 20)
+    interrupt_after(shuffle, monkeypatch, 7)
+    with pytest.raises(OSError):
+        shuffle.shuffle_in_place(str(tmp_path), seed=1)
+    monkeypatch.undo()
+    ops, completed = shuffle.read_journal(str(tmp_path))
+    assert completed == 7
+
+    shuffle.recover(str(tmp_path), roll_forward=roll_forward)
+    after = {p.name: p.read_text() for p in tmp_path.iterdir()}
+    assert not os.path.exists(tmp_path / shuffle.JOURNAL_NAME)
+    assert after == (apply_ops(ops, before) if roll_forward else before)
+
+
+def test_rename_without_journal_entry_is_detected(shuffle, tmp_path, monkeypatch):
+    make_folder(tmp_path, 10)
+    interrupt_after(shuffle, monkeypatch, 4)
+    with pytest.raises(OSError):
+        shuffle.shuffle_in_place(str(tmp_path), seed=2)
+    monkeypatch.undo()
+    ops, completed = shuffle.read_journal(str(tmp_path))
+    # The process died right after the next rename, before journaling it
+    os.rename(tmp_path / ops[completed][0], tmp_path / ops[completed][1])
+    assert shuffle.read_journal(str(tmp_path)) == (ops, completed + 1)
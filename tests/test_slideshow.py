@@ -0,0 +1,98 @@
+import os
+import sys
+
+import pytest
+
+import media_organizer
+from media_organizer import build_slideshow_filter_script, build_transition_filter_script, plan_slideshow_batches
+
+
+def test_batches_are_bounded_and_keep_order():
+    images = [f"img{i}.jpg" for i in range(45)]
+    batches = plan_slideshow_batches(images, 20)
+    assert [len(batch) for batch in batches] == [15, 15, 15]
+    assert sum(batches, []) == images
+
+
+def test_batches_never_leave_a_single_image():
+    batches = plan_slideshow_batches([f"img{i}.jpg" for i in range(21)], 20)
+    assert min(len(batch) for batch in batches) >= 2
+
+
+def test_one_movie_source_per_image_of_a_batch():
+    script = build_slideshow_filter_script(["a.jpg", "b.jpg", "c.jpg"])
+    assert script.count("movie=") == 3
+    assert "concat=n=3" in script
+
+
+def test_trimmed_crossfade_offsets(monkeypatch):
+    monkeypatch.setattr(media_organizer, "IMAGE_VIDEO_DURATION", 7)
+    monkeypatch.setattr(media_organizer, "VIDEO_FPS", 25)
+    script = build_slideshow_filter_script(["a.jpg", "b.jpg"], crossfade=1.0, trim_head=True, trim_tail=True)
+    # The first image loses its first second, so the fade into the second image starts at 7 - 1 - 1 = 5s
+    assert "trim=start_frame=25:end_frame=175" in script
+    assert "offset=5.000" in script
+    assert "trim=start_frame=0:end_frame=150" in script
+    transition = build_transition_filter_script("a.jpg", "b.jpg", 1.0)
+    assert "trim=start_frame=150:end_frame=175" in transition and "trim=end_frame=25" in transition
+
+
+def test_cancelled_slideshow_reports_failure(monkeypatch):
+    import queue
+    import threading
+
+    cancel_event = threading.Event()
+
+    def fake_render(image_paths, output_path, on_progress=None):
+        on_progress({"percent": 10.0})
+        cancel_event.set()
+        on_progress({"percent": 20.0}) # Raises FFmpegCancelled, as run_ffmpeg would pass it on
+        raise AssertionError("not reached")
+
+    monkeypatch.setattr(media_organizer, "render_slideshow_compilation", fake_render)
+    results = queue.Queue()
+    media_organizer.run_slideshow_in_background(["a.jpg"], "out.mp4", results, cancel_event)
+    assert media_organizer.drain_queue(results) == [("progress", {"percent": 10.0}), ("done", False)]
+
+
+FAKE_FFMPEG = """#!{python}
+import os, shutil, sys
+args = sys.argv[1:]
+if args[-1] == "-": # A batch graph: 'renders' the name of its filter script as its frames
+    script = os.path.basename(args[args.index("-filter_complex_script") + 1])
+    if "{fail}" and script.startswith("{fail}"):
+        sys.exit(1)
+    sys.stdout.buffer.write(script.encode() + b"\\n")
+else: # The encoder: copies its input to the output
+    with open(args[-1], "wb") as out:
+        shutil.copyfileobj(sys.stdin.buffer, out)
+    print("progress=end", flush=True)
+"""
+
+
+def install_fake_ffmpeg(tmp_path, monkeypatch, fail=""):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    ffmpeg = bin_dir / "ffmpeg"
+    ffmpeg.write_text(FAKE_FFMPEG.format(python=sys.executable, fail=fail))
+    ffmpeg.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake ffmpeg is a script")
+def test_batches_are_piped_into_one_encode(tmp_path, monkeypatch):
+    install_fake_ffmpeg(tmp_path, monkeypatch)
+    output = tmp_path / "out.mp4"
+    images = [f"img{i}.jpg" for i in range(6)]
+    assert media_organizer.render_slideshow_compilation(images, str(output), crossfade=1.0, batch_size=2)
+    # Three batches and the two fades between them, in timeline order, in a single output
+    assert output.read_text().split() == [f"part_{i:04d}.filter.txt" for i in range(5)]
+    assert set(os.listdir(tmp_path)) == {"bin", "out.mp4"} # No part files
+
+
+@pytest.mark.skipif(os.name == "nt", reason="fake ffmpeg is a script")
+def test_failed_batch_fails_the_render(tmp_path, monkeypatch):
+    install_fake_ffmpeg(tmp_path, monkeypatch, fail="part_0001")
+    output = tmp_path / "out.mp4"
+    assert not media_organizer.render_slideshow_compilation([f"img{i}.jpg" for i in range(6)], str(output), batch_size=2)
+    assert not output.exists()
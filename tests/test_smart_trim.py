@@ -0,0 +1,42 @@
+from mediacommon.smart_trim import _edge_encode_args, can_match_edges, plan_cut
+
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0]
+
+
+def test_interior_is_copied_and_edges_encoded():
+    assert plan_cut(KEYFRAMES, 1.0, 7.0) == [("encode", 1.0, 2.0), ("copy", 2.0, 6.0), ("encode", 6.0, 7.0)]
+
+
+def test_cut_on_keyframes_is_copied():
+    assert plan_cut(KEYFRAMES, 2.0, 6.0) == [("copy", 2.0, 6.0)]
+
+
+def test_cut_inside_one_gop_is_encoded():
+    assert plan_cut(KEYFRAMES, 2.5, 3.5) == [("encode", 2.5, 3.5)]
+
+
+def test_only_plain_h264_profiles_can_be_matched():
+    assert can_match_edges({"codec_name": "h264", "profile": "High"})
+    assert can_match_edges({"codec_name": "h264", "profile": "Constrained Baseline"})
+    assert not can_match_edges({"codec_name": "h264", "profile": "High 10"})
+    assert not can_match_edges({"codec_name": "hevc", "profile": "Main"})
+
+
+def test_edge_arguments_follow_the_source():
+    args = _edge_encode_args({"codec_name": "h264", "profile": "Main", "level": 40, "pix_fmt": "yuv420p",
+                              "r_frame_rate": "30000/1001", "refs": 1, "has_b_frames": 0, "color_range": "tv"})
+    assert args[args.index('-profile:v') + 1] == "main"
+    assert args[args.index('-level:v') + 1] == "4.0"
+    assert args[args.index('-bf') + 1] == "0"
+    assert args[args.index('-color_range') + 1] == "tv"
+
+
+def test_failed_cuts_are_reported(tmp_path, monkeypatch):
+    import mediacommon.smart_trim as smart_trim
+
+    monkeypatch.setattr(smart_trim, "get_keyframe_times", lambda path: [0.0])
+    monkeypatch.setattr(smart_trim, "probe_media", lambda path: (35.0,))
+    monkeypatch.setattr(smart_trim, "smart_trim", lambda src, out, start, end, *args: start != 10.0)
+    created, failed = smart_trim.extract_segments("long.mp4", str(tmp_path), 10)
+    assert sorted(created.values()) == [10.0, 10.0]
+    assert failed == [(10.0, 20.0)]
@@ -0,0 +1,126 @@
+import json
+
+import pytest
+
+import stage_runner
+import transcription_cache
+from stage_runner import Stage, run_stages
+
+
+@pytest.fixture(autouse=True)
+def hash_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcription_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(transcription_cache, "_hash_index", None)
+    monkeypatch.setattr(transcription_cache, "_hash_index_lines", 0)
+    monkeypatch.setattr(transcription_cache, "_hash_index_compacted_lines", 0)
+
+
+def make_pipeline(tmp_path, calls, suffix="", params=None):
+    # suffix changes what read produces; it is also read's params, as a real stage would declare it
+    source = tmp_path / "input.txt"
+
+    def read():
+        calls.append("read")
+        out = tmp_path / "read.txt"
+        out.write_text(source.read_text() + suffix)
+        return str(out)
+
+    def shout(path):
+        calls.append("shout")
+        out = tmp_path / "shout.txt"
+        out.write_text(open(path).read().upper())
+        return str(out)
+
+    return [
+        Stage("read", read, inputs=[str(source)], params=suffix or None),
+        Stage("shout", shout, deps=["read"], params=params),
+    ]
+
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    (tmp_path / "input.txt").write_text("hello")
+    calls = []
+    results, failures = run_stages(make_pipeline(tmp_path, calls), tmp_path)
+    assert failures == {} and calls == ["read", "shout"]
+    calls.clear()
+    assert run_stages(make_pipeline(tmp_path, calls), tmp_path) == (results, {})
+    assert calls == []
+
+
+def test_changed_params_rerun_only_that_stage(tmp_path):
+    (tmp_path / "input.txt").write_text("hello")
+    calls = []
+    run_stages(make_pipeline(tmp_path, calls), tmp_path)
+    calls.clear()
+    run_stages(make_pipeline(tmp_path, calls, params="loud"), tmp_path)
+    assert calls == ["shout"]
+
+
+def test_changed_input_and_modified_output_rerun(tmp_path):
+    (tmp_path / "input.txt").write_text("hello")
+    calls = []
+    run_stages(make_pipeline(tmp_path, calls), tmp_path)
+    calls.clear()
+    (tmp_path / "input.txt").write_text("bye")
+    run_stages(make_pipeline(tmp_path, calls), tmp_path)
+    assert calls == ["read", "shout"]
+    assert (tmp_path / "shout.txt").read_text() == "BYE"
+
+    calls.clear()
+    (tmp_path / "shout.txt").write_text("edited by hand")
+    run_stages(make_pipeline(tmp_path, calls), tmp_path)
+    assert calls == ["shout"]
+    calls.clear()
+    (tmp_path / "shout.txt").unlink()
+    run_stages(make_pipeline(tmp_path, calls), tmp_path)
+    assert calls == ["shout"]
+
+
+def test_dependency_output_change_propagates(tmp_path):
+    (tmp_path / "input.txt").write_text("hello")
+    calls = []
+    run_stages(make_pipeline(tmp_path, calls), tmp_path)
+    calls.clear()
+    # shout's own settings are unchanged, but the output of read it depends on is not
+    run_stages(make_pipeline(tmp_path, calls, suffix="!"), tmp_path)
+    assert calls == ["read", "shout"]
+    assert (tmp_path / "shout.txt").read_text() == "HELLO!"
+
+
+def test_failure_blocks_dependents_and_keeps_the_rest(tmp_path):
+    ran = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    def independent():
+        ran.append("independent")
+
+    stages = [
+        Stage("fail", fail),
+        Stage("after", lambda _: ran.append("after"), deps=["fail"]),
+        Stage("independent", independent),
+    ]
+    results, failures = run_stages(stages, tmp_path)
+    assert list(failures) == ["fail"] and isinstance(failures["fail"], RuntimeError)
+    assert ran == ["independent"] and "after" not in results
+    with open(tmp_path / stage_runner.STATE_FILENAME, encoding="utf-8") as f:
+        assert set(json.load(f)) == {"independent"}
+
+
+def test_results_have_the_same_type_when_skipped(tmp_path):
+    out = tmp_path / "out.txt"
+    out.write_text("x")
+    seen = []
+
+    def stages(run):
+        return [
+            Stage("produce", lambda: (out, out)),
+            # New params every run: "use" runs again while "produce" is skipped
+            Stage("use", lambda paths: seen.append(paths), deps=["produce"], params=run),
+        ]
+
+    fresh, _ = run_stages(stages(1), tmp_path)
+    skipped, _ = run_stages(stages(2), tmp_path)
+    assert fresh["produce"] == skipped["produce"] == [str(out), str(out)]
+    assert seen == [[str(out), str(out)]] * 2
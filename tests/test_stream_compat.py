@@ -0,0 +1,57 @@
+from mediacommon.stream_compat import (
+    AudioSignature, StreamSignature, VideoSignature, build_normalize_command, choose_target_signature,
+)
+
+H264_1080 = VideoSignature("h264", 1920, 1080, "yuv420p", "25/1", "1/12800")
+H264_720 = VideoSignature("h264", 1280, 720, "yuv420p", "30/1", "1/15360")
+AAC_48K = AudioSignature("aac", "48000", 2)
+AAC_44K = AudioSignature("aac", "44100", 2)
+AAC_32K = AudioSignature("aac", "32000", 2)
+H264_540 = VideoSignature("h264", 960, 540, "yuv420p", "25/1", "1/12800")
+
+
+def test_target_is_an_existing_clip_signature():
+    # Most common video is 1080p and most common audio is 44.1k, but no clip has both
+    signatures = [
+        StreamSignature(H264_1080, AAC_48K),
+        StreamSignature(H264_1080, AAC_48K),
+        StreamSignature(H264_1080, AAC_32K),
+        StreamSignature(H264_720, AAC_44K),
+        StreamSignature(H264_540, AAC_44K),
+        StreamSignature(H264_540, AAC_44K),
+        StreamSignature(H264_540, AAC_44K),
+    ]
+    assert choose_target_signature(signatures) == StreamSignature(H264_540, AAC_44K)
+    signatures[-1] = StreamSignature(H264_1080, AAC_44K._replace(channels=1))
+    assert choose_target_signature(signatures) in signatures
+
+
+def test_clips_with_audio_are_preferred():
+    signatures = [StreamSignature(H264_1080, None)] * 3 + [StreamSignature(H264_1080, AAC_48K)]
+    assert choose_target_signature(signatures) == StreamSignature(H264_1080, AAC_48K)
+
+
+def test_no_valid_signatures():
+    assert choose_target_signature([None, None]) is None
+
+
+def test_timebase_only_mismatch_is_a_remux():
+    target = StreamSignature(H264_1080, AAC_48K)
+    clip = StreamSignature(H264_1080._replace(time_base="1/90000"), AAC_48K)
+    cmd = build_normalize_command("in.mp4", "out.mp4", clip, target)
+    assert cmd[cmd.index('-c:v') + 1] == 'copy'
+    assert cmd[cmd.index('-c:a') + 1] == 'copy'
+    assert cmd[cmd.index('-video_track_timescale') + 1] == "12800"
+
+
+def test_different_resolution_is_reencoded():
+    target = StreamSignature(H264_1080, AAC_48K)
+    cmd = build_normalize_command("in.mp4", "out.mp4", StreamSignature(H264_720, AAC_48K), target)
+    assert cmd[cmd.index('-c:v') + 1] == 'libx264'
+
+
+def test_missing_audio_gets_silence():
+    target = StreamSignature(H264_1080, AAC_48K)
+    cmd = build_normalize_command("in.mp4", "out.mp4", StreamSignature(H264_1080, None), target)
+    assert '1:a:0' in cmd and '-shortest' in cmd
+    assert cmd[cmd.index('-c:v') + 1] == 'copy'
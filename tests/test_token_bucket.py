@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import pytest
+
+
+@pytest.fixture
+def audio2text(script):
+    return script("audio2text", "VideoSpeech/01_audio2text.py")
+
+
+def test_burst_is_immediate_then_rate_limited(audio2text):
+    async def run():
+        bucket = audio2text.TokenBucket(rate=20, capacity=5)
+        started = time.monotonic()
+        times = []
+        for _ in range(9):
+            await bucket.acquire()
+            times.append(time.monotonic() - started)
+        return times
+
+    times = asyncio.run(run())
+    assert times[4] < 0.05 # The burst of 5 is not delayed
+    # The 4 requests after the burst need a new token each (1/20 s)
+    assert 0.15 <= times[8] < 0.4
+
+
+def test_concurrent_waiters_share_the_rate(audio2text):
+    async def run():
+        bucket = audio2text.TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(11)))
+        return time.monotonic() - started
+
+    assert 0.18 <= asyncio.run(run()) < 0.5
+
+
+def test_batch_reads_small_files_off_the_event_loop(audio2text, tmp_path, monkeypatch):
+    audio = tmp_path / "audio.ogg"
+    audio.write_bytes(b"speech")
+    sent = []
+
+    class FakeTranscriptions:
+        async def create(self, **options):
+            sent.append(options["file"])
+            return "transcript"
+
+    class FakeClient:
+        audio = type("Audio", (), {"transcriptions": FakeTranscriptions()})()
+
+    monkeypatch.setattr(audio2text, "get_async_openai_client", lambda: FakeClient())
+    monkeypatch.setattr(audio2text, "should_chunk", lambda path: False)
+
+    async def run():
+        bucket = audio2text.TokenBucket(rate=100, capacity=1)
+        return await audio2text._transcribe_async(str(audio), bucket, asyncio.Semaphore(1))
+
+    assert asyncio.run(run()) == "transcript"
+    assert sent == [("audio.ogg", b"speech")]
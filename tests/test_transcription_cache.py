@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+import transcription_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcription_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(transcription_cache, "_hash_index", None)
+    monkeypatch.setattr(transcription_cache, "_hash_index_lines", 0)
+    monkeypatch.setattr(transcription_cache, "_hash_index_compacted_lines", 0)
+    return transcription_cache
+
+
+def index_lines(cache):
+    with open(os.path.join(cache.CACHE_DIR, cache.HASH_INDEX_FILENAME), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_hash_is_reused_until_the_file_changes(cache, tmp_path, monkeypatch):
+    hashed = []
+    blake2b = cache.hashlib.blake2b
+    monkeypatch.setattr(cache.hashlib, "blake2b", lambda **kwargs: hashed.append(1) or blake2b(**kwargs))
+    media = tmp_path / "a.mp4"
+    media.write_bytes(b"one")
+    first = cache.content_hash(str(media))
+    assert cache.content_hash(str(media)) == first
+    assert len(hashed) == 1
+    media.write_bytes(b"two!")
+    assert cache.content_hash(str(media)) != first
+    assert len(hashed) == 2
+
+
+def test_new_hashes_are_appended_and_read_back(cache, tmp_path, monkeypatch):
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"{i}.mp4"
+        path.write_bytes(f"clip {i}".encode())
+        paths.append(str(path))
+        cache.content_hash(str(path))
+    assert [line["path"] for line in index_lines(cache)] == paths
+    # A new process loads the appended lines
+    monkeypatch.setattr(cache, "_hash_index", None)
+    assert set(cache._ensure_hash_index()) == set(paths)
+
+
+def test_compaction_drops_superseded_lines_and_deleted_files(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "HASH_INDEX_COMPACT_MIN_LINES", 4)
+    kept = tmp_path / "kept.mp4"
+    kept.write_bytes(b"kept")
+    gone = tmp_path / "gone.mp4"
+    gone.write_bytes(b"gone")
+    cache.content_hash(str(kept))
+    cache.content_hash(str(gone))
+    gone.unlink()
+    kept.write_bytes(b"changed")
+    cache.content_hash(str(kept))
+    other = tmp_path / "other.mp4"
+    other.write_bytes(b"other")
+    cache.content_hash(str(other)) # Fourth line: compaction
+    assert sorted(line["path"] for line in index_lines(cache)) == sorted([str(kept), str(other)])
@@ -13,16 +13,10 @@ logging.getLogger("twscrape").setLevel(logging.DEBUG)
 logging.getLogger("httpx").setLevel(logging.DEBUG)
 
 import certifi
-import httpx
-import aiofiles
 from dotenv import load_dotenv
 from datetime import datetime, timedelta, timezone
-from yt_dlp import YoutubeDL
-from twscrape import API
-from twscrape.logger import set_log_level
-
-import tkinter as tk
-from tkinter import filedialog
+# twscrape, yt_dlp, httpx, aiofiles and tkinter are imported where they are used,
+# so importing this module (job runners, import-time checks) stays fast and has no UI side effects
 
 # ──────────────────────────────────────────────────────────────────────────
 # Resolve the directory this script lives in (so we can find .env, JSON, DB)
@@ -39,11 +33,17 @@ load_dotenv(dotenv_path=dotenv_path)
 COOKIE = os.getenv("TWS_COOKIE")
 USER   = os.getenv("TWS_USERNAME", "cookie_user")
 
-# C) Ask user where to put the scraped media
-root = tk.Tk(); root.withdraw()
-BASE = pathlib.Path(filedialog.askdirectory(
-    title="Choose folder for downloads") or ".")
-BASE.mkdir(exist_ok=True)
+# C) Folder for the scraped media (asked for when the script runs)
+BASE = None
+
+def choose_base_folder():
+    global BASE
+    import tkinter as tk
+    from tkinter import filedialog
+    root = tk.Tk(); root.withdraw()
+    BASE = pathlib.Path(filedialog.askdirectory(
+        title="Choose folder for downloads") or ".")
+    BASE.mkdir(exist_ok=True)
 
 # D) Config constants
 SINCE = "2024-01-01"
@@ -54,6 +54,7 @@ slug = lambda s: re.sub(r"[^\w\-]+", "_", s)[:80]
 
 # E) Helpers
 async def download_img(url, path):
+    import aiofiles, httpx
     async with httpx.AsyncClient(timeout=30) as client:
         r = await client.get(url)
         r.raise_for_status()
@@ -61,6 +62,7 @@ async def download_img(url, path):
             await f.write(r.content)
 
 async def download_vid(url, pattern):
+    from yt_dlp import YoutubeDL
     loop = asyncio.get_running_loop()
     ydl_opts = {
         "quiet": True,
@@ -137,6 +139,8 @@ async def process_query(api, query):
 
 # G) Driver
 async def main():
+    from twscrape import API
+    from twscrape.logger import set_log_level
     set_log_level("INFO")
     db_path = SCRIPT_DIR / "accounts.db"
     api = API(str(db_path))
@@ -159,4 +163,5 @@ async def main():
     # await api.aclose()
 
 if __name__ == "__main__":
+    choose_base_folder()
     asyncio.run(main())
\ No newline at end of file
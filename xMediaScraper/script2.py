@@ -2,11 +2,9 @@
 # twitter_media_scraper.py   ⓒ2025
 
 import asyncio, itertools, json, logging, os, pathlib, re, sys
-import aiofiles, certifi, httpx
+import certifi
 from dotenv import load_dotenv
-from twscrape import API
-from twscrape.logger import set_log_level
-from yt_dlp import YoutubeDL
+# twscrape, yt_dlp, httpx, aiofiles and tkinter are imported on first use (fast startup, no UI at import)
 
 # ─────────────────────────  basic setup ─────────────────────────
 logging.basicConfig(
@@ -26,12 +24,16 @@ os.environ["SSL_CERT_FILE"]      = certifi.where()
 os.environ["REQUESTS_CA_BUNDLE"] = certifi.where()
 
 # ─────────────────────────  choose output folder ─────────────────────────
-import tkinter as tk
-from tkinter import filedialog, simpledialog, messagebox
-root = tk.Tk(); root.withdraw()
-BASE = pathlib.Path(filedialog.askdirectory(
-    title="Choose folder for downloads") or ".")
-BASE.mkdir(exist_ok=True)
+BASE = None
+
+def choose_base_folder():
+    global BASE
+    import tkinter as tk
+    from tkinter import filedialog
+    root = tk.Tk(); root.withdraw()
+    BASE = pathlib.Path(filedialog.askdirectory(
+        title="Choose folder for downloads") or ".")
+    BASE.mkdir(exist_ok=True)
 
 # ─────────────────────────  interactive inputs ─────────────────────────
 def ask_cli(prompt: str, default: str) -> str:
@@ -39,16 +41,22 @@ def ask_cli(prompt: str, default: str) -> str:
         val = input(prompt).strip()
         return val or default
     except EOFError:   # no console (double‑click run)
+        from tkinter import simpledialog
         return simpledialog.askstring("Input required", prompt, initialvalue=default) or default
 
-media_choice = ask_cli("Download images, videos, or both?  [i/v/b] ", "b").lower()[:1]
-tab_choice   = ask_cli("Search Top or Latest tab?          [top/latest] ", "top").lower()
-product      = "Top" if tab_choice.startswith("t") else "Latest"
+media_choice, product = "b", "Top"
+
+def ask_options():
+    global media_choice, product
+    media_choice = ask_cli("Download images, videos, or both?  [i/v/b] ", "b").lower()[:1]
+    tab_choice   = ask_cli("Search Top or Latest tab?          [top/latest] ", "top").lower()
+    product      = "Top" if tab_choice.startswith("t") else "Latest"
 
 # ─────────────────────────  constants & helpers ─────────────────────────
 IMG_MAX, VID_MAX = 20, 20
 
 async def download_img(url, path):
+    import aiofiles, httpx
     async with httpx.AsyncClient(timeout=30) as client:
         r = await client.get(url)
         r.raise_for_status()
@@ -56,6 +64,7 @@ async def download_img(url, path):
             await f.write(r.content)
 
 async def download_vid(url, pattern):
+    from yt_dlp import YoutubeDL
     loop = asyncio.get_running_loop()
     await loop.run_in_executor(None, lambda: YoutubeDL({
         "quiet": True,
@@ -116,6 +125,10 @@ async def grab(api, query, kind):
 
 # ─────────────────────────  main ─────────────────────────
 async def main():
+    from tkinter import messagebox
+    from twscrape import API
+    from twscrape.logger import set_log_level
+
     # read queries.json  (array of strings)
     try:
         with open(SCRIPT_DIR / "queries.json", encoding="utf-8") as f:
@@ -147,4 +160,6 @@ async def main():
         await asyncio.gather(*tasks)
 
 if __name__ == "__main__":
+    choose_base_folder()
+    ask_options()
     asyncio.run(main())